@@ -0,0 +1,444 @@
+"""
+Mesures de performance du pipeline Analytics MOS
+
+Usage (depuis le dossier backend) :
+    python benchmark.py precision --mode int8 [--texts verbatims.txt]
+    python benchmark.py rules [--texts verbatims.txt]
+    python benchmark.py cascade [--max-chars 200] [--texts verbatims.txt]
+    python benchmark.py ingest --file performance.xlsx
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+
+def read_texts(path):
+    """Un verbatim par ligne ; None si aucun fichier (jeu de référence intégré)"""
+    if not path:
+        return None
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_precision(args):
+    """Rapport d'accord d'une précision d'inférence par rapport au fp32"""
+    from src.modules.ai.sentiment_camembert import CamemBERTSentimentAnalyzer
+
+    analyzer = CamemBERTSentimentAnalyzer(precision=args.mode)
+    return analyzer.precision_agreement_report(read_texts(args.texts))
+
+
+def run_cascade(args):
+    """Accord et gain de temps du mode cascade (tri par mots-clés français) vs modèle seul"""
+    from src.modules.ai.sentiment_camembert import CamemBERTSentimentAnalyzer
+
+    thresholds = {'max_chars': args.max_chars, 'escalate_on_contrast': not args.no_contrast}
+    analyzer = CamemBERTSentimentAnalyzer(cache=None, mode='cascade', cascade_thresholds=thresholds)
+    return analyzer.cascade_agreement_report(read_texts(args.texts))
+
+
+def measure(func):
+    """Durée (s) puis pic mémoire Python (Mo) d'un appel, mesurés sur deux exécutions
+    (tracemalloc fausserait la mesure de temps)"""
+    start = time.time()
+    result = func()
+    elapsed = time.time() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, round(elapsed, 3), round(peak / 1024 ** 2, 1)
+
+
+def run_ingest(args):
+    """Lecture complète pd.read_excel vs lecture en flux des seules colonnes PERFORMANCE_COLS"""
+    import pandas as pd
+    from src.api.controllers.data_controller import PERFORMANCE_COLS
+    from src.api.services.ingestion import fix_column_encoding, read_header, read_excel_columns
+
+    full, full_seconds, full_peak = measure(lambda: pd.read_excel(args.file))
+
+    def projected_read():
+        raw_cols = read_header(args.file)
+        needed = [raw for raw, fixed in zip(raw_cols, fix_column_encoding(raw_cols)) if fixed in PERFORMANCE_COLS]
+        return read_excel_columns(args.file, columns=needed)
+
+    projected, projected_seconds, projected_peak = measure(projected_read)
+    return {
+        'rows': len(full),
+        'columns': full.shape[1],
+        'projected_columns': projected.shape[1],
+        'read_excel_seconds': full_seconds,
+        'read_excel_peak_mb': full_peak,
+        'projected_seconds': projected_seconds,
+        'projected_peak_mb': projected_peak,
+        'speedup': round(full_seconds / projected_seconds, 2) if projected_seconds else None,
+    }
+
+
+def run_parse(args):
+    """Lecture des deux classeurs en série vs en parallèle (cache des classeurs désactivé)"""
+    import os
+    os.environ['WORKBOOK_CACHE'] = '0'
+    from src.api.controllers.data_controller import PERFORMANCE_COLS
+    from src.api.services.ingestion import parse_workbooks
+
+    files = [args.performance, args.interview]
+    report = {}
+    for workers in (1, 2):
+        os.environ['INGESTION_WORKERS'] = str(workers)
+        start = time.time()
+        parsed = parse_workbooks(files, PERFORMANCE_COLS)
+        report[f'workers_{workers}_seconds'] = round(time.time() - start, 3)
+        report[f'workers_{workers}_shapes'] = [list(item['df'].shape) for item in parsed]
+    report['speedup'] = round(report['workers_1_seconds'] / report['workers_2_seconds'], 2)
+    return report
+
+
+def run_formats(args):
+    """Lecture projetée d'un même fichier performance en xlsx, CSV français et Parquet"""
+    import os
+    import tempfile
+    import pandas as pd
+    from src.api.controllers.data_controller import PERFORMANCE_COLS
+    from src.api.services.ingestion import fix_column_encoding, read_table_header, read_table_columns
+
+    def projected_read(path):
+        raw_cols = read_table_header(path)
+        needed = [raw for raw, fixed in zip(raw_cols, fix_column_encoding(raw_cols)) if fixed in PERFORMANCE_COLS]
+        return read_table_columns(path, columns=needed)
+
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        source = pd.read_excel(args.file)
+        paths = {'xlsx': args.file, 'csv': os.path.join(directory, 'performance.csv'),
+                 'parquet': os.path.join(directory, 'performance.parquet')}
+        source.to_csv(paths['csv'], sep=';', decimal=',', index=False, encoding='cp1252')
+        source.to_parquet(paths['parquet'], index=False)
+        frames = {}
+        for file_format, path in paths.items():
+            start = time.time()
+            frames[file_format] = projected_read(path)
+            report[f'{file_format}_seconds'] = round(time.time() - start, 3)
+        for file_format in ('csv', 'parquet'):
+            report[f'{file_format}_speedup'] = round(report['xlsx_seconds'] / report[f'{file_format}_seconds'], 1)
+            report[f'{file_format}_same_shape'] = frames[file_format].shape == frames['xlsx'].shape
+    return report
+
+
+def read_interview(path):
+    """Fichier interview préparé pour la fusion (SIRET, siret_agence, Campagne d'appels)"""
+    import pandas as pd
+    from src.api.services.ingestion import fix_column_encoding, read_table_columns
+    from src.modules.ai.siret_cleaner import normalize_siret
+
+    df_interview = read_table_columns(path)
+    df_interview.columns = fix_column_encoding(df_interview.columns)
+    df_interview['SIRET'] = normalize_siret(df_interview['SIRET'])
+    df_interview['siret_agence'] = df_interview['SIRET'].astype(str) + df_interview['CODE_AGENC'].astype(str)
+    df_interview["Campagne d'appels"] = pd.to_numeric(df_interview["Campagne d'appels"], errors='coerce').astype('Int64')
+    return df_interview
+
+
+def run_partitions(args):
+    """Pic mémoire et temps de la fusion performance × interview : en mémoire vs par partitions"""
+    import os
+    os.environ['WORKBOOK_CACHE'] = '0'
+    import pandas as pd
+    from src.api.controllers.data_controller import (
+        PERFORMANCE_COLS, prepare_performance, keep_campaign_rows
+    )
+    from src.api.services.ingestion import (
+        fix_column_encoding, read_table_header, read_table_columns, iter_table_chunks
+    )
+    from src.api.services.partitioned_join import PartitionedJoin
+
+    df_interview = read_interview(args.interview)
+    raw_cols = read_table_header(args.performance)
+    needed = [raw for raw, fixed in zip(raw_cols, fix_column_encoding(raw_cols)) if fixed in PERFORMANCE_COLS]
+
+    def in_memory():
+        df_performance = read_table_columns(args.performance, columns=needed)
+        df_performance.columns = fix_column_encoding(df_performance.columns)
+        df_performance = prepare_performance(df_performance)
+        merged = pd.merge(df_performance, df_interview, on='siret_agence', how='left', suffixes=('', '_interview'))
+        return keep_campaign_rows(merged).reset_index(drop=True)
+
+    def partitioned():
+        join = PartitionedJoin(key='siret_agence', partitions=args.partitions, memory_budget_mb=args.budget_mb)
+        try:
+            for chunk in iter_table_chunks(args.performance, columns=needed, chunk_rows=args.chunk_rows):
+                chunk.columns = fix_column_encoding(chunk.columns)
+                join.spill(prepare_performance(chunk))
+            result, _ = join.join(df_interview, suffixes=('', '_interview'), row_filter=keep_campaign_rows)
+        finally:
+            join.cleanup()
+        return result, join.stats
+
+    expected, memory_seconds, memory_peak = measure(in_memory)
+    (result, stats), partitioned_seconds, partitioned_peak = measure(partitioned)
+    return {
+        'rows': stats['left_rows'],
+        'result_rows': len(result),
+        'same_result': expected.astype(str).equals(result.astype(str)),
+        'in_memory_seconds': memory_seconds,
+        'in_memory_peak_mb': memory_peak,
+        'partitioned_seconds': partitioned_seconds,
+        'partitioned_peak_mb': partitioned_peak,
+        'partitioned_stats': stats,
+    }
+
+
+def run_join(args):
+    """Fusion gauche puis filtre de campagne vs fusion sur (clé, année) : temps, pic mémoire, équivalence"""
+    import os
+    os.environ['WORKBOOK_CACHE'] = '0'
+    import pandas as pd
+    from src.api.controllers.data_controller import (
+        PERFORMANCE_COLS, prepare_performance, keep_campaign_rows, join_campaign_rows
+    )
+    from src.api.services.ingestion import fix_column_encoding, read_table_header, read_table_columns
+
+    df_interview = read_interview(args.interview)
+    raw_cols = read_table_header(args.performance)
+    needed = [raw for raw, fixed in zip(raw_cols, fix_column_encoding(raw_cols)) if fixed in PERFORMANCE_COLS]
+    df_performance = read_table_columns(args.performance, columns=needed)
+    df_performance.columns = fix_column_encoding(df_performance.columns)
+    df_performance = prepare_performance(df_performance)
+
+    def merge_then_filter():
+        merged = pd.merge(df_performance, df_interview, on='siret_agence', how='left', suffixes=('', '_interview'))
+        return keep_campaign_rows(merged).reset_index(drop=True), merged.notna().any(), merged.shape[0]
+
+    (expected, expected_has_values, merged_rows), merge_seconds, merge_peak = measure(merge_then_filter)
+    (result, has_values), join_seconds, join_peak = measure(lambda: join_campaign_rows(df_performance, df_interview))
+    return {
+        'rows': len(df_performance),
+        'years': sorted(int(year) for year in df_performance['Année'].dropna().unique()),
+        'left_join_rows': merged_rows,
+        'result_rows': len(result),
+        'same_result': expected.equals(result) and expected_has_values.equals(has_values),
+        'merge_then_filter_seconds': merge_seconds,
+        'merge_then_filter_peak_mb': merge_peak,
+        'campaign_join_seconds': join_seconds,
+        'campaign_join_peak_mb': join_peak,
+    }
+
+
+def run_dtypes(args):
+    """Octets par colonne de la fusion performance × interview : types de lecture vs DF_MAIN_SCHEMA"""
+    import os
+    os.environ['WORKBOOK_CACHE'] = '0'
+    from src.api.controllers.data_controller import (
+        PERFORMANCE_COLS, DF_MAIN_SCHEMA, prepare_performance, join_campaign_rows
+    )
+    from src.api.services.ingestion import (
+        fix_column_encoding, read_table_header, read_table_columns, apply_schema, restore_schema, memory_report
+    )
+
+    df_interview = read_interview(args.interview)
+    raw_cols = read_table_header(args.performance)
+    needed = [raw for raw, fixed in zip(raw_cols, fix_column_encoding(raw_cols)) if fixed in PERFORMANCE_COLS]
+    df_performance = read_table_columns(args.performance, columns=needed)
+    df_performance.columns = fix_column_encoding(df_performance.columns)
+    storage_dtypes = {}
+    df_performance = prepare_performance(df_performance, storage_dtypes)
+    # Fusion sur les types de lecture (catégories remises en texte), puis types compacts
+    df_performance = restore_schema(df_performance, DF_MAIN_SCHEMA, storage_dtypes)
+    for column in df_performance.select_dtypes('category').columns:
+        df_performance[column] = df_performance[column].astype(object)
+    expected, _ = join_campaign_rows(df_performance, df_interview)
+    merge_dtypes = {}
+    (compact, report), seconds, _ = measure(lambda: apply_schema(expected.copy(), DF_MAIN_SCHEMA, merge_dtypes))
+    restored = restore_schema(compact.copy(), DF_MAIN_SCHEMA, merge_dtypes)
+    return {
+        'rows': len(compact),
+        'same_values': expected.astype(str).equals(restored.astype(str)),
+        'apply_schema_seconds': seconds,
+        'total_mb': {
+            'before': round(expected.memory_usage(deep=True).sum() / 1024 ** 2, 2),
+            'after': round(compact.memory_usage(deep=True).sum() / 1024 ** 2, 2),
+        },
+        'compacted': memory_report(report),
+        'columns': {column: f"{entry['dtype']}: {entry['before']} -> {entry['after']} octets"
+                    for column, entry in report.items()},
+    }
+
+
+def run_load(args):
+    """Chargement de df_main dans main_data : ORM ligne à ligne (iterrows) vs chargement en masse"""
+    import os
+    import tempfile
+    import pandas as pd
+    from flask import Flask
+    from src.core.db import db
+    from src.api.models.data_models import MainData
+    from src.api.controllers.data_controller import MAIN_DATA_COLUMNS
+    from src.api.services.sqlite_loader import load_transaction, load_pragmas, insert_frame
+
+    df_main = pd.read_csv(args.csv, encoding='utf-8-sig', decimal=',', sep=';')
+    df_main = pd.concat([df_main] * args.repeat, ignore_index=True)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load.sqlite3')
+    db.init_app(app)
+
+    def safe_get(row, col_name, default_value=''):
+        # Helper de l'ancienne insertion (Series, numpy, None)
+        value = row.get(col_name, default_value)
+        if hasattr(value, 'iloc') and hasattr(value, 'dropna'):
+            non_null_values = value.dropna()
+            return non_null_values.iloc[0] if len(non_null_values) > 0 else default_value
+        elif hasattr(value, '__len__') and hasattr(value, 'item') and len(value) > 0:
+            return value.item()
+        elif value is None or (hasattr(value, 'isna') and value.isna()):
+            return default_value
+        return value
+
+    def orm_insert():
+        db.session.query(MainData).delete()
+        db.session.commit()
+        for _, row in df_main.iterrows():
+            db.session.add(MainData(**{attribute: safe_get(row, column, default)
+                                       for attribute, (column, default) in MAIN_DATA_COLUMNS.items()}))
+        db.session.commit()
+
+    def bulk_insert(pragmas):
+        with load_transaction(db.engine, pragmas) as connection:
+            connection.execute(MainData.__table__.delete())
+            insert_frame(connection, MainData, df_main, MAIN_DATA_COLUMNS)
+
+    def timed(func, *func_args):
+        start = time.time()
+        func(*func_args)
+        seconds = time.time() - start
+        table = pd.read_sql(f'SELECT * FROM {MainData.__tablename__} ORDER BY id', db.engine).drop(columns='id')
+        return table, {'seconds': round(seconds, 3), 'rows_per_second': int(len(df_main) / seconds)}
+
+    with app.app_context():
+        db.create_all()
+        expected, orm = timed(orm_insert)
+        report = {'rows': len(df_main), 'orm_iterrows': orm}
+        for label, pragmas in (('bulk_no_pragmas', {}), ('bulk', None)):
+            table, report[label] = timed(bulk_insert, pragmas)
+            report[label]['same_table'] = expected.equals(table)
+        report['pragmas'] = load_pragmas()
+        report['speedup'] = round(orm['seconds'] / report['bulk']['seconds'], 1)
+    return report
+
+
+def run_rules(args):
+    """Équivalence et temps des règles contextuelles vectorisées vs texte par texte"""
+    from src.modules.ai.sentiment_camembert import CamemBERTSentimentAnalyzer, REFERENCE_VERBATIMS
+
+    texts = read_texts(args.texts) or REFERENCE_VERBATIMS
+    analyzer = CamemBERTSentimentAnalyzer(cache=None)
+    report = analyzer.rules_equivalence_report(texts)
+
+    clean_texts = [text for text in analyzer.prepare_series(texts) if text] * args.repeat
+    labels = ['3 stars'] * len(clean_texts)
+    start = time.time()
+    for clean_text, label in zip(clean_texts, labels):
+        analyzer.score_label(clean_text, label)
+    report['per_text_seconds'] = round(time.time() - start, 3)
+    start = time.time()
+    analyzer.score_labels(clean_texts, labels)
+    report['vectorized_seconds'] = round(time.time() - start, 3)
+    return report
+
+
+def run_headers(args):
+    """Résolution des en-têtes interview : premier passage vs structure déjà vue (cache)"""
+    from src.api.controllers.data_controller import RENAME_MAP
+    from src.api.services.header_resolver import HeaderResolver
+    from src.api.services.ingestion import fix_column_encoding, read_table_header
+
+    with open(args.file, 'rb') as f:
+        columns = fix_column_encoding(read_table_header(f))
+    resolver = HeaderResolver(RENAME_MAP)
+    start = time.perf_counter()
+    plan = resolver.rename_plan(columns)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        resolver.rename_plan(columns)
+    warm = (time.perf_counter() - start) / args.repeat
+    return {
+        'columns': len(columns),
+        'renamed': len(plan),
+        'first_resolution_ms': round(cold * 1000, 3),
+        'cached_resolution_ms': round(warm * 1000, 3),
+        'stats': resolver.get_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks Analytics MOS')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    precision_parser = subparsers.add_parser('precision', help="Accord et gain de temps d'une précision vs fp32")
+    precision_parser.add_argument('--mode', choices=['fp32', 'int8', 'bf16'], default='int8')
+    precision_parser.add_argument('--texts', help='Fichier texte, un verbatim par ligne (défaut: jeu de référence intégré)')
+    precision_parser.set_defaults(func=run_precision)
+
+    cascade_parser = subparsers.add_parser('cascade', help='Accord et gain de temps du mode cascade vs modèle seul')
+    cascade_parser.add_argument('--max-chars', type=int, default=200, help='Longueur au-delà de laquelle le texte va au modèle')
+    cascade_parser.add_argument('--no-contrast', action='store_true', help='Ne pas envoyer au modèle les textes avec contraste')
+    cascade_parser.add_argument('--texts', help='Fichier texte, un verbatim par ligne (défaut: jeu de référence intégré)')
+    cascade_parser.set_defaults(func=run_cascade)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Temps et pic mémoire de la lecture Excel projetée vs pd.read_excel')
+    ingest_parser.add_argument('--file', required=True, help='Classeur performance (.xlsx)')
+    ingest_parser.set_defaults(func=run_ingest)
+
+    formats_parser = subparsers.add_parser('formats', help='Lecture projetée du même fichier en xlsx, CSV et Parquet')
+    formats_parser.add_argument('--file', required=True, help='Classeur performance (.xlsx), converti en CSV et Parquet')
+    formats_parser.set_defaults(func=run_formats)
+
+    parse_parser = subparsers.add_parser('parse', help='Lecture des deux classeurs en série vs en parallèle')
+    parse_parser.add_argument('--performance', required=True, help='Classeur performance (.xlsx)')
+    parse_parser.add_argument('--interview', required=True, help='Classeur interview (.xlsx)')
+    parse_parser.set_defaults(func=run_parse)
+
+    partitions_parser = subparsers.add_parser('partitions', help='Pic mémoire de la fusion en mémoire vs par partitions')
+    partitions_parser.add_argument('--performance', required=True, help='Fichier performance (xlsx, csv, parquet)')
+    partitions_parser.add_argument('--interview', required=True, help='Fichier interview (xlsx, csv, parquet)')
+    partitions_parser.add_argument('--partitions', type=int, default=32)
+    partitions_parser.add_argument('--budget-mb', type=int, default=64, help='Budget mémoire du mode par partitions')
+    partitions_parser.add_argument('--chunk-rows', type=int, default=10000)
+    partitions_parser.set_defaults(func=run_partitions)
+
+    join_parser = subparsers.add_parser('join', help='Fusion puis filtre de campagne vs fusion sur (clé, année)')
+    join_parser.add_argument('--performance', required=True, help='Fichier performance (xlsx, csv, parquet)')
+    join_parser.add_argument('--interview', required=True, help='Fichier interview (xlsx, csv, parquet)')
+    join_parser.set_defaults(func=run_join)
+
+    dtypes_parser = subparsers.add_parser('dtypes', help='Mémoire par colonne : types de lecture vs types compacts')
+    dtypes_parser.add_argument('--performance', required=True, help='Fichier performance (xlsx, csv, parquet)')
+    dtypes_parser.add_argument('--interview', required=True, help='Fichier interview (xlsx, csv, parquet)')
+    dtypes_parser.set_defaults(func=run_dtypes)
+
+    load_parser = subparsers.add_parser('load', help='Insertion de df_main en base : ORM ligne à ligne vs chargement en masse')
+    load_parser.add_argument('--csv', default='data/output/df_main.csv', help='df_main exporté (CSV ; séparateur décimal virgule)')
+    load_parser.add_argument('--repeat', type=int, default=1, help='Répétitions des lignes du CSV')
+    load_parser.set_defaults(func=run_load)
+
+    rules_parser = subparsers.add_parser('rules', help='Équivalence et débit des règles contextuelles vectorisées')
+    rules_parser.add_argument('--texts', help='Fichier texte, un verbatim par ligne (défaut: jeu de référence intégré)')
+    rules_parser.add_argument('--repeat', type=int, default=100, help='Répétitions du jeu pour la mesure de temps')
+    rules_parser.set_defaults(func=run_rules)
+
+    headers_parser = subparsers.add_parser('headers', help='Résolution des en-têtes : premier passage vs cache')
+    headers_parser.add_argument('--file', required=True, help='Fichier interview (xlsx, csv, parquet)')
+    headers_parser.add_argument('--repeat', type=int, default=100)
+    headers_parser.set_defaults(func=run_headers)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    report = args.func(args)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
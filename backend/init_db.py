@@ -1,5 +1,5 @@
 from src.core import db
-from src.api.models.data_models import MainData
+from src.api.models.data_models import MainData, RefreshGroup
 from flask import Flask
 
 app = Flask(__name__)
@@ -61,6 +61,12 @@ def create_app():
 
     db.init_app(app)
 
+    # Préchauffage optionnel du modèle de sentiment en arrière-plan (voir /ready)
+    if app.config.get('SENTIMENT_WARMUP'):
+        from src.modules.ai.sentiment_camembert import start_background_warmup
+        print("🔥 Préchauffage du modèle de sentiment en arrière-plan...")
+        start_background_warmup(app.config.get('SENTIMENT_WARMUP_BATCH_SIZES', (1, 8, 32)))
+
     return app
 
 
@@ -1,156 +1,120 @@
 import pandas as pd
-from src.modules.ai.siret_cleaner import clean_siret
-from src.modules.ai.sentiment import analyze_sentiment
+from src.modules.ai.siret_cleaner import normalize_siret, siret_index, combine_siret_indexes, backfill_siret
 # sentiment_camembert import will be done dynamically in the function
 from src.core.db import db
-from src.api.models.data_models import MainData
+from src.api.models.data_models import MainData, RefreshGroup
+from src.api.services.ingestion import (
+    fix_column_encoding, parse_workbooks, iter_table_chunks, apply_dtypes, DEFAULT_CHUNK_ROWS,
+    INTERVIEW_INDICATORS, PERFORMANCE_INDICATORS, ROLE_MIN_INDICATORS,
+    apply_schema, restore_schema, memory_report
+)
+from src.api.services.partitioned_join import PartitionedJoin, chunked_threshold_bytes
+from src.api.services.header_resolver import HeaderResolver
+from src.api.services.campaign_join import campaign_join
+from src.api.services.join_planner import JoinPlanner, DEFAULT_ON_FANOUT
+from src.api.services.pipeline import Pipeline, Stage, get_stage_cache, config_fingerprint
+from src.api.services.incremental_refresh import refresh_mode, plan_refresh, splice_csv
+from src.api.services.workbook_cache import content_hash
+from src.api.services.sqlite_loader import load_transaction, insert_frame, insert_rows
+from sqlalchemy import tuple_
 from sqlalchemy.exc import SQLAlchemyError
 import logging
+import os
+import time
 import numpy as np  # Pour gérer les numpy arrays
 
 def apply_camembert_sentiment_analysis(df_main):
     """
-    Applique l'analyse de sentiment CamemBERT sur la colonne 'Raison recommandation Manpower'
-    et remplit les colonnes 'Sentiment Raison de recommandation Manpower' et 'Score Raison de recommandation Manpower'
+    Applique l'analyse de sentiment CamemBERT sur toutes les colonnes de SENTIMENT_FIELDS
+    présentes dans df_main, en une seule passe (flux unique de textes, batchs communs),
+    et remplit les colonnes label/score déclarées dans SENTIMENT_LABELS.
+    Retourne (df_main, analyse aboutie) : False si le modèle n'a pas pu être utilisé
     """
     try:
-        # Import avec gestion des chemins
-        import sys
-        import os
-        
-        # Ajouter le répertoire src au PYTHONPATH 
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Remonter à backend/src depuis backend/src/api/controllers
-        src_path = os.path.dirname(os.path.dirname(current_dir))
-        if src_path not in sys.path:
-            sys.path.insert(0, src_path)
-            
-        from modules.ai.sentiment_camembert import get_sentiment_analyzer
+        # Même chemin d'import que le préchauffage (create_app) pour partager l'instance du modèle
+        from src.modules.ai.sentiment_camembert import get_sentiment_analyzer
         
         print("🤖 Initialisation de l'analyseur CamemBERT...")
         analyzer = get_sentiment_analyzer()
         
-        # Vérifier que les colonnes existent
-        if 'Raison recommandation Manpower' not in df_main.columns:
-            print("⚠️ Colonne 'Raison recommandation Manpower' non trouvée")
-            return df_main
+        # Colonnes textuelles présentes et contenant au moins un texte à analyser
+        columns_to_analyze = {}
+        for field in SENTIMENT_FIELDS:
+            if field not in df_main.columns:
+                print(f"⚠️ Colonne '{field}' non trouvée")
+                continue
+            texts = df_main[field]
+            if isinstance(texts, pd.DataFrame):
+                texts = texts.iloc[:, 0]
+            texts = texts.fillna('').astype(str)
             
-        if 'Sentiment Raison de recommandation Manpower' not in df_main.columns:
-            df_main['Sentiment Raison de recommandation Manpower'] = None
-            print("➕ Colonne 'Sentiment Raison de recommandation Manpower' créée")
-            
-        if 'Score Raison de recommandation Manpower' not in df_main.columns:
-            df_main['Score Raison de recommandation Manpower'] = None
-            print("➕ Colonne 'Score Raison de recommandation Manpower' créée")
-        
-        # Récupérer les textes à analyser
-        texts_to_analyze = df_main['Raison recommandation Manpower'].fillna('').astype(str)
+            # Filtrer les textes non vides (différents de 'Pas de réponse' et non vides)
+            valid_count = ((texts != '') & (texts != 'Pas de réponse')).sum()
+            print(f"📝 '{field}': {valid_count} textes à analyser sur {len(df_main)} lignes")
+            if valid_count == 0:
+                continue
+            columns_to_analyze[field] = safe_tolist(texts, label=field)
         
-        # Filtrer les textes non vides (différents de 'Pas de réponse' et non vides)
-        valid_texts = texts_to_analyze[
-            (texts_to_analyze != '') & 
-            (texts_to_analyze != 'Pas de réponse') &
-            (texts_to_analyze.notna())
-        ]
-        
-        print(f"📝 Analyse de {len(valid_texts)} textes de recommandation sur {len(df_main)} lignes...")
-        
-        if len(valid_texts) == 0:
+        if not columns_to_analyze:
             print("⚠️ Aucun texte valide à analyser")
-            return df_main
+            return df_main, True
         
-        # Analyse par batch optimisée pour éviter les timeouts
-        results = []
-        batch_size = 10  # Réduire la taille des batchs pour éviter les timeouts
+        # Analyse de toutes les colonnes dans une même séquence de batchs
+        batch_size = 32
         
         def progress_callback(progress, processed, total):
             """Callback pour afficher la progression"""
             logging.info(f"🔄 Analyse sentiment: {processed}/{total} ({progress}%)")
         
-        # Analyser par petits lots avec progression
-        batch_texts = safe_tolist(texts_to_analyze.values, label='texts_to_analyze.values')
-        results = analyzer.batch_analyze(batch_texts, batch_size=batch_size, progress_callback=progress_callback)
-        
+        results_by_field = analyzer.analyze_columns(columns_to_analyze, batch_size=batch_size, progress_callback=progress_callback)
+        for field, path_stats in analyzer.last_column_stats.items():
+            print(f"⚡ '{field}': {path_stats['lookup']} réponses fermées (table), "
+                  f"{path_stats['model']} textes libres (modèle), {path_stats['empty']} vides")
+        run_stats = analyzer.last_run_stats
+        if run_stats:
+            print(f"🧮 Déduplication: {run_stats['valid']} textes → {run_stats['unique']} uniques "
+                  f"(ratio {run_stats['dedup_ratio']})")
+        if run_stats.get('escalated') is not None:
+            print(f"🪜 Cascade: {run_stats['triaged']} textes notés par les mots-clés, {run_stats['escalated']} envoyés au modèle "
+                  f"({run_stats['escalation_rate']:.0%} escaladés, motifs {run_stats['escalation_reasons']})")
+        if analyzer.cache is not None and run_stats:
+            print(f"🗄️ Cache sentiment: {run_stats['cache_hits']} hits, {run_stats['cache_misses']} misses "
+                  f"({run_stats['inferred']} textes envoyés au modèle)")
+        if run_stats.get('truncated_texts'):
+            print(f"✂️ {run_stats['truncated_texts']} textes trop longs notés sur leurs {analyzer.max_chunks_per_text} "
+                  f"premières fenêtres seulement (SENTIMENT_MAX_CHUNKS)")
+        if run_stats.get('workers'):
+            print(f"🧵 Pool sentiment: {run_stats['pool_texts_per_second']} textes/s au total")
+            for pid, worker in run_stats['workers'].items():
+                print(f"   - worker {pid}: {worker['texts']} textes, {worker['texts_per_second']} textes/s")
+
         # Appliquer les résultats au DataFrame
-        sentiments, scores = zip(*results) if results else ([], [])
-        
-        df_main['Sentiment Raison de recommandation Manpower'] = list(sentiments)
-        df_main['Score Raison de recommandation Manpower'] = list(scores)
-        
-        # Statistiques des résultats
-        sentiment_counts = pd.Series(sentiments).value_counts()
         print(f"📊 Résultats de l'analyse de sentiment:")
-        for sentiment, count in sentiment_counts.items():
-            print(f"  • {sentiment}: {count} textes")
-        
-        # Statistiques des scores
-        scores_series = pd.Series(scores)
-        print(f"📈 Scores moyens: {scores_series.mean():.1f} (min: {scores_series.min():.1f}, max: {scores_series.max():.1f})")
+        for field, results in results_by_field.items():
+            label_col, score_col = SENTIMENT_LABELS[field]
+            sentiments, scores = zip(*results) if results else ([], [])
+            df_main[label_col] = list(sentiments)
+            df_main[score_col] = list(scores)
+            
+            # Statistiques des résultats et des scores
+            sentiment_counts = pd.Series(sentiments).value_counts()
+            scores_series = pd.Series(scores)
+            print(f"  • {field}: " + ', '.join(f"{sentiment}={count}" for sentiment, count in sentiment_counts.items()))
+            print(f"    📈 Score moyen: {scores_series.mean():.1f} (min: {scores_series.min():.1f}, max: {scores_series.max():.1f})")
         
         print("✅ Analyse de sentiment CamemBERT terminée avec succès")
-        return df_main
+        return df_main, True
         
     except ImportError as e:
         print(f"❌ Erreur d'import CamemBERT: {e}")
         print("⚠️ Installation des dépendances requise: pip install torch transformers")
-        return df_main
+        return df_main, False
         
     except Exception as e:
         print(f"❌ Erreur lors de l'analyse de sentiment: {e}")
         import traceback
         traceback.print_exc()
-        return df_main
-
-def fix_column_encoding(columns):
-    """Corrige les problèmes d'encodage dans les noms de colonnes"""
-    encoding_fixes = {
-        # Caractères mal encodés -> caractères corrects
-        'lâ€™': "l'",
-        'câ€™': "c'",
-        'dâ€™': "d'",
-        'sâ€™': "s'",
-        'Ã©': 'é',
-        'Ã ': 'à',
-        'Ã¨': 'è',
-        'Ã§': 'ç',
-        'Ã¹': 'ù',
-        'Ã´': 'ô',
-        'Ã¢': 'â',
-        'Ã®': 'î',
-        'Ã«': 'ë',
-        'Ã¯': 'ï',
-        'Ã¼': 'ü',
-        'proposÃ©s': 'proposés',
-        'ConformitÃ©': 'Conformité',
-        'QualitÃ©': 'Qualité',
-        'AmabilitÃ©': 'Amabilité',
-        'RÃ©activitÃ©': 'Réactivité',
-        'EfficacitÃ©': 'Efficacité',
-        'PrÃ©nom': 'Prénom',
-        'enrichi': 'enrichi',
-        'adÃ©quation': 'adéquation',
-        'rÃ©activitÃ©': 'réactivité',
-        'rÃ©glementation': 'réglementation',
-        'prÃ©vention': 'prévention',
-        'sÃ©curitÃ©': 'sécurité',
-        'matiÃ¨re': 'matière',
-        'sociÃ©tÃ©': 'société',
-        'Ã©chelle': 'échelle',
-        'interrogÃ©e': 'interrogée',
-        'disponibilitÃ©': 'disponibilité',
-        'â€™': "'",
-        'â€™': "'",
-        '?': ' ?',
-    }
-    
-    fixed_columns = []
-    for col in columns:
-        fixed_col = str(col)
-        for wrong, correct in encoding_fixes.items():
-            fixed_col = fixed_col.replace(wrong, correct)
-        fixed_columns.append(fixed_col)
-    
-    return fixed_columns
+        return df_main, False
 
 # Colonnes à conserver côté performance et interview (mapping prompt)
 PERFORMANCE_COLS = [
@@ -159,6 +123,41 @@ PERFORMANCE_COLS = [
     'var ca cum', 'Ca Mois M', 'Ca Mois M-1', 'var ca mois', 'Ca Cum A SIRET',
     'Ca Cum A-1 SIRET', 'var ca cum SIRET', 'ca mois A SIRET', 'ca mois A-1 SIRET', 'var ca mois SIRET', 'ETP Cum A', 'ETP Cum A-1', 'var ETP cum', 'siret_agence'
 ]
+# Types cibles des colonnes performance (conversion sûre à la lecture, voir apply_dtypes)
+PERFORMANCE_DTYPES = {
+    'Année': 'Int64',
+    **{col: 'float64' for col in [
+        'Ca Cum A', 'Ca Cum A-1', 'var ca cum', 'Ca Mois M', 'Ca Mois M-1', 'var ca mois',
+        'Ca Cum A SIRET', 'Ca Cum A-1 SIRET', 'var ca cum SIRET', 'ca mois A SIRET',
+        'ca mois A-1 SIRET', 'var ca mois SIRET', 'ETP Cum A', 'ETP Cum A-1', 'var ETP cum'
+    ]}
+}
+# Types compacts de df_main pendant le traitement (conversion seulement si sans perte, voir apply_schema) ;
+# les colonnes numériques reprennent leur type d'origine à l'export (restore_schema)
+DF_MAIN_SCHEMA = {
+    # Texte à faible cardinalité
+    **{col: 'category' for col in [
+        'type entité', 'Code DR', 'DR', 'agence', 'Ouvert / Fermé', 'Concurrent OnSite',
+        'DR (depuis performance)',
+        'Sentiment Raison note satisfaction', 'Sentiment Q8 - Qualité de collaboration',
+        'Sentiment Q11 - Qualité adéquation candidats', 'Sentiment Q14 - Quailté réactivité',
+        'Sentiment Q17 - Qualité presta administrative', 'Sentiment Q21 - Qualité expertise',
+        'Sentiment Raison de recommandation Manpower'
+    ]},
+    # Années et mois
+    'Année': 'Int16', "Campagne d'appels": 'Int16', 'Mois': 'Int8',
+    # Notes interview (0 à 10)
+    **{col: 'Int8' for col in [
+        'Satisf.\n\nGlobale', 'Satisf. Globale', 'Q5 - Amabilité et disponibilit',
+        'Q6 - Connaissance entreprise et objectifs', 'Q7 - Contribution objectifs et performances',
+        'Q9 - Conformité nombre de candidatures', 'Q10 - Qualité et pertinence profils', 'Q13 - Efficacité',
+        'Q15 - Production et suivi des contrats', 'Q16 - Prestation administrative', 'Q18 - Proactivité',
+        'Q19 - Qualité informations règlementation TT', 'Q20 - Actions prévention sécurité',
+        'Note Recommandation concurrent', 'Note Recommandation Manpower'
+    ]},
+    # Montants CA / ETP (float32 si chaque valeur se relit à l'identique au centime)
+    **{col: 'float32' for col, dtype in PERFORMANCE_DTYPES.items() if dtype == 'float64'},
+}
 INTERVIEW_COLS = [
     'Campagne d\'appels', 'CODE_AGENC', 'SIRET', 'Satisf.\n\nGlobale',
     'Raison note satisfaction',
@@ -221,8 +220,13 @@ RENAME_MAP = {
     'Pouvez-vous me dire pourquoi vous donner cette note de recommandation ?': 'Raison recommandation Manpower',
     'Pouvez-vous me dire pourquoi vous donner cette note de recommandation?  ': 'Raison recommandation Manpower',
     'Pouvez-vous me dire pourquoi vous donner cette note de recommandation ?  ': 'Raison recommandation Manpower',
+    # Variante de Q12 sans virgule finale (nom harmonisé avant fusion)
+    'Q12 - Réactivité pour répondre à vos besoins': 'Q12 - Réactivité',
 }
 
+# Résolution des en-têtes compilée une fois, mise en cache par structure de classeur
+HEADER_RESOLVER = HeaderResolver(RENAME_MAP)
+
 # Champs textuels à analyser pour le sentiment
 SENTIMENT_FIELDS = [
     'Raison note satisfaction',
@@ -234,64 +238,236 @@ SENTIMENT_FIELDS = [
     'Raison recommandation Manpower',
 ]
 
-# Champs pour stocker le label et le score
+# Champs pour stocker le label et le score (noms des colonnes persistées dans MainData)
 SENTIMENT_LABELS = {
     'Raison note satisfaction': ('Sentiment Raison note satisfaction', 'Score raison note de satisfaction'),
-    'Q8 - Qualité de collaboration': ('Sentiment Q8', 'Score Sentiment Q8'),
-    'Q11 - Qualité adéquation candidats': ('Sentiment Q11', 'Score Sentiment Q11'),
-    'Q14 - Quailté réactivité': ('Sentiment Q14', 'Score Sentiment Q14'),
-    'Q17 - Qualité presta administrative': ('Sentiment Q17', 'Score Sentiment Q17'),
-    'Q21 - Qualité expertise': ('Sentiment Q21', 'Score Sentiment Q21'),
-    'Raison recommandation Manpower': ('Sentiment raison recommandation Manpower', 'Score sentiment recommandation Manpower'),
+    'Q8 - Qualité de collaboration': ('Sentiment Q8 - Qualité de collaboration', 'Score Q8 - Qualité de collaboration'),
+    'Q11 - Qualité adéquation candidats': ('Sentiment Q11 - Qualité adéquation candidats', 'Score Q11 - Qualité adéquation candidats'),
+    'Q14 - Quailté réactivité': ('Sentiment Q14 - Quailté réactivité', 'Score Q14 - Quailté réactivité'),
+    'Q17 - Qualité presta administrative': ('Sentiment Q17 - Qualité presta administrative', 'Score Q17 - Qualité presta administrative'),
+    'Q21 - Qualité expertise': ('Sentiment Q21 - Qualité expertise', 'Score Q21 - Qualité expertise'),
+    'Raison recommandation Manpower': ('Sentiment Raison de recommandation Manpower', 'Score Raison de recommandation Manpower'),
+}
+
+# Colonnes de MainData : attribut -> (colonne de df_main, valeur si la colonne manque ou vaut None)
+MAIN_DATA_COLUMNS = {
+    'no_siret': ('No Siret', ''),
+    'code_agence': ('code agence', ''),
+    'siret_agence': ('siret_agence', ''),
+    'siret_interview': ('SIRET', ''),
+    'code_agenc': ('CODE_AGENC', ''),
+    'campagne_appels': ("Campagne d'appels", ''),
+    'satisf_globale': ('Satisf.\n\nGlobale', ''),
+    'raison_note_satisfaction': ('Raison note satisfaction', ''),
+    'sentiment_raison_note_satisfaction': ('Sentiment Raison note satisfaction', ''),
+    'score_raison_note_satisfaction': ('Score raison note de satisfaction', 0),
+    'concurrent': ('Concurrent OnSite', ''),
+    'q5_amabilite_disponibilite': ('Q5 - Amabilité et disponibilit', ''),
+    'q6_connaissance_entreprise': ('Q6 - Connaissance entreprise et objectifs', ''),
+    'q7_contribution_objectifs': ("Q7 - Contribution à votre performance et à l'atteinte de vos objectifs", ''),
+    'q8_qualite_collaboration': ('Q8 - Qualité de collaboration', ''),
+    'sentiment_q8_qualite_collaboration': ('Sentiment Q8 - Qualité de collaboration', ''),
+    'score_q8_qualite_collaboration': ('Score Q8 - Qualité de collaboration', 0),
+    'q9_conformite_candidatures': ('Q9 - Conformité nombre de candidatures', ''),
+    'q10_qualite_pertinence_profils': ('Q10 - Qualité et pertinence profils', ''),
+    'q11_qualite_adequation_candidats': ("Q11 - Diriez-vous que l'adéquation entre les candidats proposés par MANPOWER et votre demande est :", ''),
+    'sentiment_q11_qualite_adequation_candidats': ('Sentiment Q11 - Qualité adéquation candidats', ''),
+    'score_q11_qualite_adequation_candidats': ('Score Q11 - Qualité adéquation candidats', 0),
+    'q12_reactivite': ('Q12 - Réactivité pour répondre à vos besoins', ''),
+    'q13_efficacite': ('Q13 - Efficacité', ''),
+    'q14_qualite_reactivite': ('Q14 - Quailté réactivité', ''),
+    'sentiment_q14_qualite_reactivite': ('Sentiment Q14 - Quailté réactivité', ''),
+    'score_q14_qualite_reactivite': ('Score Q14 - Quailté réactivité', 0),
+    'q15_production_suivi_contrats': ('Q15 - Production et suivi des contrats', ''),
+    'q16_prestation_administrative': ("Q16 - Prestation administrative, c'est-à-dire les relevés d'activités et la facturation", ''),
+    'q17_qualite_presta_administrative': ('Q17 - Qualité presta administrative', ''),
+    'sentiment_q17_qualite_presta_administrative': ('Sentiment Q17 - Qualité presta administrative', ''),
+    'score_q17_qualite_presta_administrative': ('Score Q17 - Qualité presta administrative', 0),
+    'q18_proactivite': ('Q18 - Proactivité', ''),
+    'q19_qualite_infos_reglementation': ('Q19 - Qualité informations règlementation TT', ''),
+    'q20_actions_prevention_securite': ('Q20 - Actions prévention sécurité', ''),
+    'q21_qualite_expertise': ("Q21 - Diriez-vous que l'expertise de MANPOWER est :", ''),
+    'sentiment_q21_qualite_expertise': ('Sentiment Q21 - Qualité expertise', ''),
+    'score_q21_qualite_expertise': ('Score Q21 - Qualité expertise', 0),
+    'note_recommandation_concurrent': ('Q21bis - Sur une échelle de 0 à 10, recommanderiez-vous [CONCURRENT PRINCIPAL CITE] pour du TRAVAIL TEMPORAIRE ? ', 0),
+    'note_recommandation_manpower': ('Note Recommandation Manpower', 0),
+    'raison_recommandation_manpower': ('Raison recommandation Manpower', ''),
+    # Colonne sentiment renommée (utilise le bon nom)
+    'sentiment_raison_de_recommandation_manpower': ('Sentiment Raison de recommandation Manpower', ''),
+    'score_raison_de_recommandation_manpower': ('Score Raison de recommandation Manpower', 0),
+    # Colonnes performance
+    'annee': ('Année', 0),
+    'mois': ('Mois', 0),
+    'type_entite': ('type entité', ''),
+    'code_dr': ('Code DR', ''),
+    'dr': ('DR', ''),
+    'agence': ('agence', ''),
+    'ouvert_ferme': ('Ouvert / Fermé', ''),
+    'raison_sociale': ('raison sociale', ''),
+    'ca_cum_a': ('Ca Cum A', 0.0),
+    'ca_cum_a_1': ('Ca Cum A-1', 0.0),
+    'var_ca_cum': ('var ca cum', 0.0),
+    'ca_mois_m': ('Ca Mois M', 0.0),
+    'ca_mois_m_1': ('Ca Mois M-1', 0.0),
+    'var_ca_mois': ('var ca mois', 0.0),
+    'ca_cum_a_siret': ('Ca Cum A SIRET', 0.0),
+    'ca_cum_a_1_siret': ('Ca Cum A-1 SIRET', 0.0),
+    'var_ca_cum_siret': ('var ca cum SIRET', 0.0),
+    'ca_mois_a_siret': ('ca mois A SIRET', 0.0),
+    'ca_mois_a_1_siret': ('ca mois A-1 SIRET', 0.0),
+    'var_ca_mois_siret': ('var ca mois SIRET', 0.0),
+    # Colonnes ETP ajoutées
+    'etp_cum_a': ('ETP Cum A', 0.0),
+    'etp_cum_a_1': ('ETP Cum A-1', 0.0),
+    'var_etp_cum': ('var ETP cum', 0.0),
 }
 
-def process_excel_files(file1, file2):
+# Jeu de données de sortie (lu par /main_data)
+DF_MAIN_OUTPUT_PATH = 'data/output/df_main.csv'
+
+def prepare_performance(df_performance, storage_dtypes=None, schema_report=None):
     """
-    Traite les fichiers Excel en détectant automatiquement lequel est performance vs interview
+    Préparation ligne à ligne du fichier performance (types, SIRET, siret_agence, Année, types compacts) ;
+    en mode par partitions, appliquée morceau par morceau
     """
-    # Lecture des deux fichiers
-    df1 = pd.read_excel(file1)
-    df2 = pd.read_excel(file2)
-    
-    # Correction de l'encodage des noms de colonnes
-    df1.columns = fix_column_encoding(df1.columns)
-    df2.columns = fix_column_encoding(df2.columns)
+    df_performance = apply_dtypes(df_performance, PERFORMANCE_DTYPES)
+    # Nettoyage SIRET sur 14 caractères, sans décimale, AVANT création de siret_agence
+    if 'No Siret' in df_performance.columns:
+        df_performance['No Siret'] = normalize_siret(df_performance['No Siret'])
+    # Ajout de la colonne siret_agence (clé de fusion)
+    if 'No Siret' in df_performance.columns and 'code agence' in df_performance.columns:
+        df_performance['siret_agence'] = df_performance['No Siret'].astype(str) + df_performance['code agence'].astype(str)
+    # Forcer le type Année en int si possible
+    if 'Année' in df_performance.columns:
+        df_performance['Année'] = pd.to_numeric(df_performance['Année'], errors='coerce').astype('Int64')
+    df_performance, report = apply_schema(df_performance, DF_MAIN_SCHEMA, storage_dtypes)
+    if schema_report is not None:
+        for column, entry in report.items():
+            total = schema_report.setdefault(column, {'dtype': entry['dtype'], 'before': 0, 'after': 0})
+            total['before'] += entry['before']
+            total['after'] += entry['after']
+    return df_performance
+
+def keep_campaign_rows(df_merge):
+    """Ne garde que les lignes où Campagne d'appels = Année - 1"""
+    return df_merge[df_merge["Campagne d'appels"] == (df_merge['Année'] - 1)]
+
+def join_campaign_rows(df_performance, df_interview):
+    """
+    Fusion gauche sur siret_agence restreinte aux lignes Campagne d'appels = Année - 1
+    (mêmes lignes que pd.merge puis keep_campaign_rows, sans matérialiser les autres années)
+    """
+    return campaign_join(df_performance, df_interview, key='siret_agence', left_year='Année',
+                         right_year="Campagne d'appels", year_offset=1, suffixes=('', '_interview'))
+
+def read_stage(file1, file2):
+    """Étape 'read' : lecture des deux classeurs et attribution des rôles performance / interview"""
+    # Les deux classeurs sont lus en parallèle (un processus chacun) : en-tête, correction
+    # de l'encodage des noms de colonnes, détection du rôle puis lecture des données
+    started = time.time()
+    # Au-delà du seuil du mode par partitions, les données performance ne sont pas lues ici
+    parsed1, parsed2 = parse_workbooks([file1, file2], PERFORMANCE_COLS, stream_min_bytes=chunked_threshold_bytes())
+    print(f"⏱️ Lecture des classeurs: {time.time() - started:.2f}s")
     
     # Auto-détection : le fichier interview contient les colonnes Q, le fichier performance contient "Année"
-    cols1 = safe_tolist(df1.columns, label='df1.columns')
-    cols2 = safe_tolist(df2.columns, label='df2.columns')
     
     # Détection fichier interview : contient des colonnes commençant par "Q" et "Satisf" et "SIRET"
-    interview_indicators = ['Q5', 'Q7', 'Q8', 'Q11', 'Satisf', 'SIRET', 'CODE_AGENC', 'Campagne']
-    is_file1_interview = sum(1 for indicator in interview_indicators if any(indicator in str(col) for col in cols1)) >= 3
-    is_file2_interview = sum(1 for indicator in interview_indicators if any(indicator in str(col) for col in cols2)) >= 3
+    is_file1_interview = parsed1['scores']['interview'] >= ROLE_MIN_INDICATORS
+    is_file2_interview = parsed2['scores']['interview'] >= ROLE_MIN_INDICATORS
     
     # Détection fichier performance : contient "Année" et "Ca Cum A" et "No Siret"
-    performance_indicators = ['Année', 'Ca Cum A', 'No Siret', 'code agence', 'raison sociale']
-    is_file1_performance = sum(1 for indicator in performance_indicators if any(indicator in str(col) for col in cols1)) >= 3
-    is_file2_performance = sum(1 for indicator in performance_indicators if any(indicator in str(col) for col in cols2)) >= 3
+    is_file1_performance = parsed1['scores']['performance'] >= ROLE_MIN_INDICATORS
+    is_file2_performance = parsed2['scores']['performance'] >= ROLE_MIN_INDICATORS
     
-    print(f"🔍 Indicateurs interview file1: {sum(1 for indicator in interview_indicators if any(indicator in str(col) for col in cols1))}/8")
-    print(f"🔍 Indicateurs interview file2: {sum(1 for indicator in interview_indicators if any(indicator in str(col) for col in cols2))}/8")
-    print(f"🔍 Indicateurs performance file1: {sum(1 for indicator in performance_indicators if any(indicator in str(col) for col in cols1))}/5")
-    print(f"🔍 Indicateurs performance file2: {sum(1 for indicator in performance_indicators if any(indicator in str(col) for col in cols2))}/5")
+    print(f"🔍 Indicateurs interview file1: {parsed1['scores']['interview']}/{len(INTERVIEW_INDICATORS)}")
+    print(f"🔍 Indicateurs interview file2: {parsed2['scores']['interview']}/{len(INTERVIEW_INDICATORS)}")
+    print(f"🔍 Indicateurs performance file1: {parsed1['scores']['performance']}/{len(PERFORMANCE_INDICATORS)}")
+    print(f"🔍 Indicateurs performance file2: {parsed2['scores']['performance']}/{len(PERFORMANCE_INDICATORS)}")
     
     # Attribution automatique des rôles
     if is_file1_interview and is_file2_performance:
         print("🔄 Auto-détection: file1 = INTERVIEW, file2 = PERFORMANCE")
-        df_interview = df1
-        df_performance = df2
+        interview, performance = parsed1, parsed2
     elif is_file2_interview and is_file1_performance:
         print("🔄 Auto-détection: file1 = PERFORMANCE, file2 = INTERVIEW")
-        df_performance = df1
-        df_interview = df2
+        performance, interview = parsed1, parsed2
     else:
         # Fallback sur l'ordre d'origine si auto-détection échoue
         print("⚠️  Auto-détection échouée, utilisation ordre d'origine")
-        df_performance = df1
-        df_interview = df2
+        performance, interview = parsed1, parsed2
+    return {'performance_source': performance, 'interview_source': interview}
+
+def performance_stage(performance_source):
+    """
+    Étape 'performance' : préparation du fichier performance (types, SIRET, siret_agence, types compacts)
+    et index code agence -> SIRET. Au-delà du seuil du mode par partitions, les données sont
+    réparties sur disque (partitioned_join) au lieu d'être gardées en mémoire (df_performance=None).
+    """
+    performance = performance_source
+    # Types d'origine des colonnes compactées (restaurés à l'export) et octets gagnés par colonne
+    storage_dtypes = {}
+    schema_report = {}
     
-    print(f"📊 FICHIER PERFORMANCE: {df_performance.shape[1]} colonnes, {df_performance.shape[0]} lignes")
+    # Mode par partitions (fichier performance volumineux) : lecture en flux, morceau par morceau,
+    # réparti par hachage de siret_agence sur disque ; seuls les index utiles restent en mémoire
+    chunked = performance['df'] is None
+    if chunked:
+        df_performance = None
+        partitioned_join = PartitionedJoin(key='siret_agence')
+        agence_indexes = []  # code agence -> premier No Siret, par morceau (complément des SIRET interview)
+        # siret_agence -> DR (dernière occurrence, comme set_index().to_dict() en mémoire)
+        has_dr = all(col in performance['cols'] for col in ('DR', 'No Siret', 'code agence'))
+        dr_by_siret_agence = {} if has_dr else None
+        started = time.time()
+        chunk_rows = int(os.getenv('CHUNKED_CHUNK_ROWS', DEFAULT_CHUNK_ROWS))
+        for chunk in iter_table_chunks(performance['file'], columns=performance['columns'], chunk_rows=chunk_rows):
+            chunk.columns = fix_column_encoding(chunk.columns)
+            chunk = prepare_performance(chunk, storage_dtypes, schema_report)
+            if 'code agence' in chunk.columns and 'No Siret' in chunk.columns:
+                agence_indexes.append(siret_index(chunk['code agence'], chunk['No Siret']))
+            if dr_by_siret_agence is not None:
+                dr_by_siret_agence.update(zip(chunk['siret_agence'], chunk['DR']))
+            partitioned_join.spill(chunk)
+        partitioned_join.flush()
+        print(f"🧩 Performance par partitions: {partitioned_join.rows} lignes réparties en "
+              f"{partitioned_join.partitions} partitions en {time.time() - started:.2f}s")
+        print(f"📊 FICHIER PERFORMANCE: {len(performance['columns'])} colonnes, {partitioned_join.rows} lignes (lecture en flux)")
+    else:
+        # Performance : seules les colonnes de PERFORMANCE_COLS sont conservées (fichier très large) ;
+        # elles sont déjà seules lues quand le fichier a été reconnu comme performance
+        df_performance = performance['df']
+        if not performance['projected']:
+            df_performance = df_performance[[col for col in df_performance.columns if col in PERFORMANCE_COLS]].copy()
+        print(f"📥 Performance: {df_performance.shape[1]}/{len(performance['cols'])} colonnes lues")
+        df_performance = prepare_performance(df_performance, storage_dtypes, schema_report)
+        print(f"📊 FICHIER PERFORMANCE: {df_performance.shape[1]} colonnes, {df_performance.shape[0]} lignes")
+
+    # Index code agence -> SIRET du premier établissement performance de l'agence
+    if chunked:
+        agence_siret = combine_siret_indexes(agence_indexes)
+    elif 'code agence' in df_performance.columns and 'No Siret' in df_performance.columns:
+        agence_siret = siret_index(df_performance['code agence'], df_performance['No Siret'])
+    else:
+        agence_siret = pd.Series(dtype=object)
+    performance_columns = performance['cols'] if chunked else df_performance.columns
+    return {
+        'df_performance': df_performance,
+        'partitioned_join': partitioned_join if chunked else None,
+        'dr_by_siret_agence': dr_by_siret_agence if chunked else None,
+        'agence_siret': agence_siret,
+        'performance_columns': list(performance_columns),
+        'performance_dtypes': storage_dtypes,
+        'performance_schema_report': schema_report,
+    }
+
+def interview_stage(interview_source, agence_siret, performance_columns):
+    """
+    Étape 'interview' : nettoyage du fichier interview avant fusion (SIRET complétés depuis
+    l'index des agences, colonne Q12, 'Pas de réponse', colonnes sentiment vides, siret_agence)
+    """
+    interview = interview_source
+    # Interview : toutes les colonnes (résolution approximative des questions plus bas)
+    df_interview = interview['df']
     print(f"📋 FICHIER INTERVIEW: {df_interview.shape[1]} colonnes, {df_interview.shape[0]} lignes")
     
     # Debug: afficher toutes les colonnes Q du fichier interview
@@ -299,7 +475,7 @@ def process_excel_files(file1, file2):
     print(f"🔍 Colonnes Q trouvées: {q_columns}")
     
     # Debug: chercher spécifiquement Q11
-    q11_candidates = [col for col in df_interview.columns if 'Q11' in str(col)]
+    q11_candidates = HEADER_RESOLVER.containing_all(df_interview.columns, 'Q11')
     print(f"🎯 Colonnes contenant Q11: {q11_candidates}")
     
     if q11_candidates:
@@ -313,36 +489,27 @@ def process_excel_files(file1, file2):
             print(f"   {i:2d}. {col}")
 
     # Nettoyage SIRET sur 14 caractères, sans décimale, AVANT création de siret_agence
-    if 'No Siret' in df_performance.columns:
-        df_performance['No Siret'] = df_performance['No Siret'].apply(lambda x: str(x).split('.')[0].zfill(14))
+    # (fait pour df_performance par prepare_performance)
     if 'SIRET' in df_interview.columns:
-        df_interview['SIRET'] = df_interview['SIRET'].apply(lambda x: str(x).split('.')[0].zfill(14))
+        df_interview['SIRET'] = normalize_siret(df_interview['SIRET'])
 
     # Gestion des SIRET vides dans interview (seulement si la colonne SIRET existe)
     if 'SIRET' in df_interview.columns:
-        mask_empty = df_interview['SIRET'].isnull() | (df_interview['SIRET'] == '')
-        for idx in df_interview[mask_empty].index:
-            code_ag = df_interview.at[idx, 'CODE_AGENC']
-            match = df_performance[df_performance['code agence'] == code_ag]
-            if not match.empty:
-                df_interview.at[idx, 'SIRET'] = match.iloc[0]['No Siret']
+        if 'CODE_AGENC' in df_interview.columns:
+            df_interview['SIRET'] = backfill_siret(df_interview['SIRET'], df_interview['CODE_AGENC'], agence_siret)
     else:
         print("⚠️ ATTENTION: Colonne 'SIRET' non trouvée dans le fichier interview")
         print(f"📋 Colonnes disponibles: {safe_tolist(df_interview.columns, label='df_interview.columns')}")
         # Si SIRET n'existe pas, on peut essayer de la créer à partir de CODE_AGENC
-        if 'CODE_AGENC' in df_interview.columns and 'code agence' in df_performance.columns:
+        if 'CODE_AGENC' in df_interview.columns and 'code agence' in performance_columns:
             print("🔧 Tentative de création de la colonne SIRET à partir de CODE_AGENC...")
-            df_interview['SIRET'] = ''
-            for idx in df_interview.index:
-                code_ag = df_interview.at[idx, 'CODE_AGENC']
-                match = df_performance[df_performance['code agence'] == code_ag]
-                if not match.empty:
-                    df_interview.at[idx, 'SIRET'] = match.iloc[0]['No Siret']
+            empty_sirets = pd.Series('', index=df_interview.index, dtype=object)
+            df_interview['SIRET'] = backfill_siret(empty_sirets, df_interview['CODE_AGENC'], agence_siret)
             print(f"✅ Colonne SIRET créée avec {df_interview['SIRET'].notna().sum()} valeurs remplies")
 
     # --- TRAITEMENT AVANT FUSION ---
     # Correction robuste du nom de la colonne Q12 - Réactivité (avec ou sans virgule)
-    q12_candidates = [col for col in df_interview.columns if 'Q12' in str(col) and 'Réactivit' in str(col)]
+    q12_candidates = HEADER_RESOLVER.containing_all(df_interview.columns, 'Q12', 'Réactivit')
     actual_q12_col = None
     if q12_candidates:
         # On cherche la première colonne Q12 qui ne contient PAS de valeurs de type DR
@@ -365,10 +532,6 @@ def process_excel_files(file1, file2):
             print("❌ Aucune colonne Q12 valide trouvée (notes ou 'Pas de réponse'). Vérifiez le fichier source !")
     else:
         print("❌ Colonne Q12 - Réactivité non trouvée dans df_interview !")
-    # Correction du mapping RENAME_MAP pour accepter les deux variantes (avec et sans virgule)
-    if 'Q12 - Réactivité pour répondre à vos besoins' not in RENAME_MAP:
-        RENAME_MAP['Q12 - Réactivité pour répondre à vos besoins'] = 'Q12 - Réactivité'
-    
     # Remplissage des valeurs manquantes par 'Pas de réponse' pour les colonnes interview importantes
     important_interview_cols = [
         'Satisf.\n\nGlobale',
@@ -423,10 +586,10 @@ def process_excel_files(file1, file2):
             sentiment_cols_to_process.append(actual_q11_col)
             print(f"✅ Sentiment {pattern_name}: {actual_q11_col}")
         elif pattern:
-            matching_cols = [col for col in df_interview.columns if pattern.lower() in str(col).lower()]
-            if matching_cols:
-                sentiment_cols_to_process.append(matching_cols[0])
-                print(f"✅ Sentiment {pattern_name}: {matching_cols[0]}")
+            match = HEADER_RESOLVER.first_containing_any(df_interview.columns, pattern)
+            if match is not None:
+                sentiment_cols_to_process.append(match)
+                print(f"✅ Sentiment {pattern_name}: {match}")
             else:
                 print(f"❌ Sentiment {pattern_name}: non trouvée (pattern: {pattern})")
     
@@ -439,9 +602,8 @@ def process_excel_files(file1, file2):
             df_interview[f'Score {col}'] = None      # Laisser vide pour analyse ultérieure
             print(f"📝 Colonnes sentiment créées (vides): Sentiment {col[:30]}..., Score {col[:30]}...")
 
-    # Ajout de la colonne siret_agence dans chaque DataFrame source
-    if 'No Siret' in df_performance.columns and 'code agence' in df_performance.columns:
-        df_performance['siret_agence'] = df_performance['No Siret'].astype(str) + df_performance['code agence'].astype(str)
+    # Ajout de la colonne siret_agence dans chaque DataFrame source (df_performance : prepare_performance)
+    if 'No Siret' in performance_columns and 'code agence' in performance_columns:
         print("✅ siret_agence créée pour df_performance")
     else:
         print("❌ Impossible de créer siret_agence pour df_performance - colonnes manquantes")
@@ -463,14 +625,6 @@ def process_excel_files(file1, file2):
                 print("❌ Impossible de créer siret_agence même après tentative de correction")
                 raise Exception("Colonne SIRET manquante dans le fichier interview - impossible de continuer le traitement")
 
-    # DEBUG : Afficher infos clés avant fusion
-    print('df_performance shape:', df_performance.shape)
-    print('df_interview shape:', df_interview.shape)
-    print('Exemples siret_agence performance:', safe_tolist(df_performance['siret_agence'].head(), label='siret_agence performance'))
-    print('Exemples siret_agence interview:', safe_tolist(df_interview['siret_agence'].head(), label='siret_agence interview'))
-    print('Année unique performance:', df_performance['Année'].unique() if 'Année' in df_performance.columns else 'N/A')
-    print("Campagne d'appels unique interview:", df_interview["Campagne d'appels"].unique() if "Campagne d'appels" in df_interview.columns else 'N/A')
-    
     # VISUALISATION : Affichage du DataFrame df_interview dans le terminal
     print('\n' + '='*80)
     print('VISUALISATION DU DATAFRAME df_interview')
@@ -483,9 +637,7 @@ def process_excel_files(file1, file2):
     print(df_interview.info())
     print('='*80 + '\n')
 
-    # Forcer les types Année et Campagne d'appels en int si possible
-    if 'Année' in df_performance.columns:
-        df_performance['Année'] = pd.to_numeric(df_performance['Année'], errors='coerce').astype('Int64')
+    # Forcer le type Campagne d'appels en int si possible (Année : prepare_performance)
     if "Campagne d'appels" in df_interview.columns:
         df_interview["Campagne d'appels"] = pd.to_numeric(df_interview["Campagne d'appels"], errors='coerce').astype('Int64')
 
@@ -501,16 +653,75 @@ def process_excel_files(file1, file2):
         print(f"Q11 présente dans df_interview: NON")
         q11_candidates = [col for col in df_interview.columns if 'Q11' in str(col) or 'adéquation' in str(col).lower()]
         print(f"Colonnes contenant Q11 ou adéquation: {q11_candidates}")
+    return {'df_interview': df_interview, 'interview_q12_col': actual_q12_col}
 
-    # Fusion principale sur la clé enrichie siret_agence uniquement
-    df_merge = pd.merge(
-        df_performance,
-        df_interview,
-        on='siret_agence',
-        how='left',
-        suffixes=('', '_interview')
-    )
-    print('df_merge shape après merge:', df_merge.shape)
+def merge_stage(df_performance, partitioned_join, dr_by_siret_agence, performance_columns,
+                performance_dtypes, performance_schema_report, df_interview, interview_q12_col):
+    """
+    Étape 'merge' : fusion performance × interview (filtre de campagne compris), renommage,
+    sélection et ordre des colonnes de df_main, compléments Q12 et DR
+    """
+    chunked = partitioned_join is not None
+    actual_q12_col = interview_q12_col
+    storage_dtypes = dict(performance_dtypes)
+    schema_report = dict(performance_schema_report)
+    # Contrôle de cardinalité de toutes les jointures du traitement (lignes en entrée / sortie)
+    join_planner = JoinPlanner()
+
+    # DEBUG : Afficher infos clés avant fusion
+    if chunked:
+        print('df_performance (par partitions):', partitioned_join.rows, 'lignes')
+    else:
+        print('df_performance shape:', df_performance.shape)
+    print('df_interview shape:', df_interview.shape)
+    if not chunked:
+        print('Exemples siret_agence performance:', safe_tolist(df_performance['siret_agence'].head(), label='siret_agence performance'))
+    print('Exemples siret_agence interview:', safe_tolist(df_interview['siret_agence'].head(), label='siret_agence interview'))
+    if not chunked:
+        print('Année unique performance:', df_performance['Année'].unique() if 'Année' in df_performance.columns else 'N/A')
+    print("Campagne d'appels unique interview:", df_interview["Campagne d'appels"].unique() if "Campagne d'appels" in df_interview.columns else 'N/A')
+
+    # Fusion principale sur la clé enrichie siret_agence ; le filtre de campagne est appliqué
+    # pendant la fusion quand les deux colonnes d'année sont présentes
+    campaign_pushdown = "Campagne d'appels" in df_interview.columns and 'Année' in performance_columns
+    merge_label = 'Fusion performance × interview'
+    performance_rows = partitioned_join.rows if chunked else len(df_performance)
+    if campaign_pushdown:
+        # Une réponse interview par (siret_agence, campagne) : sinon les lignes performance seraient démultipliées
+        df_interview_join, interview_profile = join_planner.unique_right(
+            merge_label, df_interview, ['siret_agence', "Campagne d'appels"])
+    else:
+        df_interview_join, interview_profile = df_interview, None
+    if chunked:
+        # Partition par partition, filtre de campagne compris ; merge_has_values indique les
+        # colonnes renseignées avant filtrage (comme sur la fusion complète en mémoire)
+        try:
+            df_merge, merge_has_values = partitioned_join.join(
+                df_interview_join, suffixes=('', '_interview'),
+                row_filter=None if campaign_pushdown else keep_campaign_rows,
+                joiner=join_campaign_rows if campaign_pushdown else None
+            )
+        finally:
+            partitioned_join.cleanup()
+        print(f"🧩 Fusion par partitions: {partitioned_join.stats}")
+        print('df_merge shape après merge (filtre année inclus):', df_merge.shape)
+    elif campaign_pushdown:
+        started = time.time()
+        df_merge, merge_has_values = join_campaign_rows(df_performance, df_interview_join)
+        print(f'df_merge shape après merge (filtre année inclus): {df_merge.shape} en {time.time() - started:.2f}s')
+    else:
+        df_merge = pd.merge(
+            df_performance,
+            df_interview,
+            on='siret_agence',
+            how='left',
+            suffixes=('', '_interview')
+        )
+        merge_has_values = df_merge.notna().any()
+        print('df_merge shape après merge:', df_merge.shape)
+    if campaign_pushdown:
+        join_planner.record(merge_label, 'many_to_one', performance_rows, interview_profile, len(df_merge),
+                            dropped_right=len(df_interview) - len(df_interview_join))
     print('Exemples Année/ Campagne d\'appels après merge:', df_merge[['Année', "Campagne d'appels"]].head().to_dict())
     
     # NETTOYAGE DES COLONNES DUPLICATAS VIDES
@@ -521,7 +732,7 @@ def process_excel_files(file1, file2):
     for col in df_merge.columns:
         if col.endswith('.1') or col.endswith('.2') or col.endswith('.3'):
             # Vérifier si la colonne est entièrement vide (NaN ou None)
-            if df_merge[col].isna().all():
+            if not merge_has_values[col]:
                 columns_to_drop.append(col)
                 print(f"🗑️ Colonne duplicata vide détectée : '{col}'")
             else:
@@ -546,7 +757,7 @@ def process_excel_files(file1, file2):
     
     # Supprimer la colonne vide 'Raison recommandation Manpower.1' si elle existe et est vide
     if 'Raison recommandation Manpower.1' in df_merge.columns:
-        if df_merge['Raison recommandation Manpower.1'].isna().all():
+        if not merge_has_values['Raison recommandation Manpower.1']:
             df_merge = df_merge.drop(columns=['Raison recommandation Manpower.1'])
             print("🗑️ Colonne 'Raison recommandation Manpower.1' supprimée (entièrement vide)")
         else:
@@ -578,46 +789,16 @@ def process_excel_files(file1, file2):
         print(f"Toutes les colonnes df_merge ({len(df_merge.columns)}): {safe_tolist(df_merge.columns, label='df_merge.columns')}")
 
     # Filtrer pour ne garder que les lignes où Campagne d'appels = Année - 1
-    df_merge = df_merge[df_merge["Campagne d'appels"] == (df_merge['Année'] - 1)]
+    if not campaign_pushdown:
+        df_merge = keep_campaign_rows(df_merge)
     print('df_merge shape après filtre année:', df_merge.shape)
     print('Exemples lignes après filtre:', df_merge.head().to_dict())
 
     # RENOMMAGE DES COLONNES selon RENAME_MAP
     print(f"\n=== RENOMMAGE DES COLONNES ===")
-    columns_to_rename = {}
-    processed_columns = set()  # Pour éviter les doublons
-    
-    for old_name, new_name in RENAME_MAP.items():
-        # Chercher la colonne qui correspond exactement d'abord
-        if old_name in df_merge.columns and old_name not in processed_columns:
-            columns_to_rename[old_name] = new_name
-            processed_columns.add(old_name)
-            print(f"✅ Renommage exact: '{old_name[:60]}...' -> '{new_name}'")
-        else:
-            # Chercher par correspondance partielle
-            matching_cols = [col for col in df_merge.columns 
-                           if col not in processed_columns and 
-                           (old_name.lower() in str(col).lower() or str(col).lower() in old_name.lower())]
-            if matching_cols:
-                actual_col = matching_cols[0]
-                columns_to_rename[actual_col] = new_name
-                processed_columns.add(actual_col)
-                print(f"✅ Renommage: '{actual_col[:60]}...' -> '{new_name}'")
-            else:
-                # Recherche plus flexible pour les colonnes Q
-                if old_name.startswith('Q') and ' - ' in old_name:
-                    q_num = old_name.split(' - ')[0]  # Ex: 'Q11'
-                    matching_q_cols = [col for col in df_merge.columns 
-                                     if col not in processed_columns and q_num in str(col)]
-                    if matching_q_cols:
-                        actual_col = matching_q_cols[0]
-                        columns_to_rename[actual_col] = new_name
-                        processed_columns.add(actual_col)
-                        print(f"✅ Renommage Q: '{actual_col[:60]}...' -> '{new_name}'")
-                    else:
-                        print(f"❌ Colonne non trouvée pour renommage: '{old_name}'")
-                else:
-                    print(f"❌ Colonne non trouvée pour renommage: '{old_name}'")
+    columns_to_rename = HEADER_RESOLVER.rename_plan(df_merge.columns)
+    for actual_col, new_name in columns_to_rename.items():
+        print(f"✅ Renommage: '{actual_col[:60]}...' -> '{new_name}'")
     
     # Appliquer le renommage
     if columns_to_rename:
@@ -629,6 +810,10 @@ def process_excel_files(file1, file2):
         print(f"🎯 Colonnes Q11 après renommage: {q11_renamed_cols}")
     else:
         print("⚠️  Aucune colonne n'a été renommée")
+    
+    # Colonnes interview sous leur nom df_main : types compacts
+    df_merge, report = apply_schema(df_merge, DF_MAIN_SCHEMA, storage_dtypes)
+    schema_report.update(report)
 
     # === LOGGING BALISÉ POUR RENOMMAGE ET FUSION ===
     print("\n[LOG-ALIGN] Colonnes df_interview AVANT renommage :", safe_tolist(df_interview.columns, label='df_interview.columns'))
@@ -647,7 +832,7 @@ def process_excel_files(file1, file2):
     # Filtrage strict des colonnes selon le prompt
     # Construire INTERVIEW_COLS dynamiquement basé sur les colonnes réellement présentes
     
-    # === MERGE SUPPLÉMENTAIRE POUR AJOUTER "Concurrent OnSite" AU BON ENDROIT ===
+    # === "Concurrent OnSite" PLACÉE APRÈS "No Siret" (déplacement de colonne, sans nouvelle fusion) ===
     print(f"\n=== AJOUT DE 'Concurrent OnSite' APRÈS 'No Siret' ===")
     
     # Vérifier si la colonne "Concurrent OnSite" existe dans df_merge
@@ -656,68 +841,29 @@ def process_excel_files(file1, file2):
         concurrent_col = 'Concurrent OnSite'
     else:
         # Chercher d'autres variantes possibles
-        concurrent_candidates = [col for col in df_merge.columns 
-                               if 'société de travail temporaire' in str(col).lower() 
-                               or 'concurrent' in str(col).lower()]
-        if concurrent_candidates:
-            concurrent_col = concurrent_candidates[0]
+        concurrent_col = HEADER_RESOLVER.first_containing_any(df_merge.columns, 'société de travail temporaire', 'concurrent')
+        if concurrent_col:
             print(f"📝 Colonne concurrent trouvée: '{concurrent_col}'")
     
     if concurrent_col:
         print(f"✅ Colonne 'Concurrent OnSite' disponible: {concurrent_col}")
+        # La valeur de chaque ligne est celle de sa propre réponse interview : un simple renommage suffit
+        if concurrent_col != 'Concurrent OnSite':
+            df_merge = df_merge.rename(columns={concurrent_col: 'Concurrent OnSite'})
         
-        # Créer un DataFrame temporaire avec seulement siret_agence et Concurrent OnSite
-        df_concurrent = df_merge[['siret_agence', concurrent_col]].copy()
-        df_concurrent = df_concurrent.rename(columns={concurrent_col: 'Concurrent OnSite'})
-        
-        # Créer df_main_base sans la colonne concurrent pour éviter les doublons
-        cols_without_concurrent = [col for col in df_merge.columns if col != concurrent_col]
-        df_main_base = df_merge[cols_without_concurrent].copy()
-        
-        # Merger pour garantir que Concurrent OnSite est bien présente
-        df_merge_with_concurrent = pd.merge(
-            df_main_base,
-            df_concurrent,
-            on='siret_agence',
-            how='left'
-        )
-        
-        # Réorganiser les colonnes pour mettre "Concurrent OnSite" juste après "No Siret"
-        cols = list(df_merge_with_concurrent.columns)
-        
-        # Trouver l'index de "No Siret"
-        no_siret_idx = cols.index('No Siret') if 'No Siret' in cols else -1
-        
-        if no_siret_idx >= 0:
-            # Retirer "Concurrent OnSite" de sa position actuelle
-            if 'Concurrent OnSite' in cols:
-                cols.remove('Concurrent OnSite')
-            
-            # L'insérer juste après "No Siret"
-            cols.insert(no_siret_idx + 1, 'Concurrent OnSite')
-            
-            # Réorganiser le DataFrame
-            df_merge = df_merge_with_concurrent[cols]
+        if 'No Siret' in df_merge.columns:
+            cols = [col for col in df_merge.columns if col != 'Concurrent OnSite']
+            cols.insert(cols.index('No Siret') + 1, 'Concurrent OnSite')
+            df_merge = df_merge[cols]
             print(f"✅ 'Concurrent OnSite' repositionnée juste après 'No Siret'")
-            
-            # Vérifier le résultat
-            siret_idx = df_merge.columns.get_loc('No Siret')
-            concurrent_idx = df_merge.columns.get_loc('Concurrent OnSite')
-            print(f"📍 Position 'No Siret': {siret_idx}, Position 'Concurrent OnSite': {concurrent_idx}")
-            
-            if concurrent_idx == siret_idx + 1:
-                print("✅ Positionnement correct vérifié")
-            else:
-                print(f"⚠️ Positionnement incorrect: attendu {siret_idx + 1}, obtenu {concurrent_idx}")
         else:
             print("❌ Colonne 'No Siret' non trouvée, impossible de positionner 'Concurrent OnSite'")
-            df_merge = df_merge_with_concurrent
     else:
         print("❌ Aucune colonne concurrent trouvée dans df_merge")
         # Afficher les colonnes disponibles pour debug
         print(f"📋 Colonnes disponibles: {safe_tolist(df_merge.columns, label='df_merge.columns')}")
     
-    print(f"📊 Shape après merge concurrent: {df_merge.shape}")
+    print(f"📊 Shape après placement concurrent: {df_merge.shape}")
     
     # Colonnes d'interview à rechercher (utiliser les noms renommés de RENAME_MAP)
     interview_patterns = {
@@ -760,11 +906,11 @@ def process_excel_files(file1, file2):
                 print(f"✅ Q11 trouvée exactement: '{expected_name}'")
         else:
             # Recherche par pattern si pas trouvé exactement
-            matching_cols = [col for col in df_merge.columns if search_pattern.lower() in str(col).lower()]
-            if matching_cols:
-                actual_interview_cols.append(matching_cols[0])
+            match = HEADER_RESOLVER.first_containing_any(df_merge.columns, search_pattern)
+            if match is not None:
+                actual_interview_cols.append(match)
                 if 'Q11' in expected_name:
-                    print(f"✅ Q11 trouvée par pattern: '{matching_cols[0]}'")
+                    print(f"✅ Q11 trouvée par pattern: '{match}'")
             elif 'Q11' in expected_name:
                 print(f"❌ Q11 non trouvée avec nom attendu '{expected_name}' ni pattern '{search_pattern}'")
                 # Debug supplémentaire pour Q11
@@ -832,7 +978,7 @@ def process_excel_files(file1, file2):
     # === PATCH: Récupération robuste de Q12 - Réactivité depuis df_interview via siret_agence ===
     try:
         # Détection de la bonne colonne Q12 dans df_interview
-        q12_candidates = [col for col in df_interview.columns if 'Q12' in str(col) and 'Réactivit' in str(col)]
+        q12_candidates = HEADER_RESOLVER.containing_all(df_interview.columns, 'Q12', 'Réactivit')
         actual_q12_col = None
         for candidate in q12_candidates:
             sample = df_interview[candidate].dropna().astype(str).head(10).tolist()
@@ -844,8 +990,9 @@ def process_excel_files(file1, file2):
                 actual_q12_col = candidate
                 break
         if actual_q12_col is not None and 'siret_agence' in df_interview.columns:
-            q12_map = df_interview.set_index('siret_agence')[actual_q12_col].to_dict()
-            df_main['Q12 - Réactivité (depuis interview)'] = df_main['siret_agence'].map(q12_map)
+            # Dernière réponse par siret_agence (comme set_index().to_dict())
+            df_main['Q12 - Réactivité (depuis interview)'] = join_planner.lookup(
+                'Q12 depuis interview', df_main['siret_agence'], df_interview, 'siret_agence', actual_q12_col)
             print("[PATCH Q12] Colonne 'Q12 - Réactivité (depuis interview)' ajoutée à df_main via siret_agence.")
             print(f"[PATCH Q12] Exemples: {df_main[['siret_agence', 'Q12 - Réactivité (depuis interview)'].head(5)]}")
         else:
@@ -854,9 +1001,17 @@ def process_excel_files(file1, file2):
         print(f"[PATCH Q12] Erreur lors de la récupération de Q12 depuis df_interview: {e}")
     # === PATCH: Récupération robuste de DR depuis df_performance via siret_agence ===
     try:
-        if 'DR' in df_performance.columns and 'siret_agence' in df_performance.columns:
-            dr_map = df_performance.set_index('siret_agence')['DR'].to_dict()
-            df_main['DR (depuis performance)'] = df_main['siret_agence'].map(dr_map)
+        if chunked:
+            dr_values = None if dr_by_siret_agence is None else join_planner.lookup_mapping(
+                'DR depuis performance', df_main['siret_agence'], dr_by_siret_agence)
+        elif 'DR' in df_performance.columns and 'siret_agence' in df_performance.columns:
+            # Dernière ligne par siret_agence (comme set_index().to_dict())
+            dr_values = join_planner.lookup('DR depuis performance', df_main['siret_agence'],
+                                            df_performance, 'siret_agence', 'DR')
+        else:
+            dr_values = None
+        if dr_values is not None:
+            df_main['DR (depuis performance)'] = dr_values
             print("[PATCH DR] Colonne 'DR (depuis performance)' ajoutée à df_main via siret_agence.")
             print(f"[PATCH DR] Exemples: {df_main[['siret_agence', 'DR (depuis performance)'].head(5)]}")
         else:
@@ -899,20 +1054,144 @@ def process_excel_files(file1, file2):
     else:
         print("ERREUR: Colonne Q11 manquante dans df_main !")
         print(f"Colonnes contenant 'Q11': {[col for col in df_main.columns if 'Q11' in col]}")
-    
-    # Sauvegarde du DataFrame principal au format CSV dans data/output
-    output_path = 'data/output/df_main.csv'
-    
+    # Colonnes ajoutées après la fusion (ex: DR depuis performance) : types compacts
+    df_main, report = apply_schema(df_main, DF_MAIN_SCHEMA, storage_dtypes)
+    schema_report.update(report)
+    return {
+        'df_merged': df_main,
+        'join_reports': join_planner.summary(),
+        'df_main_dtypes': storage_dtypes,
+        'schema_report': schema_report,
+    }
+
+def sentiment_config():
+    """Configuration dont dépendent les labels et scores de sentiment"""
+    return {
+        'fields': SENTIMENT_FIELDS, 'labels': SENTIMENT_LABELS, 'schema': DF_MAIN_SCHEMA,
+        'precision': os.getenv('SENTIMENT_PRECISION', 'fp32'),
+        'mode': os.getenv('SENTIMENT_MODE', 'bert'),
+        'max_chunks': os.getenv('SENTIMENT_MAX_CHUNKS'),
+        'cascade': {name: os.getenv(name) for name in (
+            'SENTIMENT_CASCADE_MAX_CHARS', 'SENTIMENT_CASCADE_CONTRAST')},
+    }
+
+def refresh_stage(df_merged, df_main_dtypes, refresh_state):
+    """
+    Étape 'refresh' : groupes (Année, Mois, siret_agence) nouveaux ou modifiés depuis le dernier
+    traitement (refresh_state, None pour une reconstruction complète) et lignes à analyser
+    """
+    # Les empreintes dépendent aussi des colonnes et de la configuration du sentiment :
+    # un changement de modèle ou de champs analysés retraite toutes les lignes
+    salt = config_fingerprint({'columns': [str(column) for column in df_merged.columns], 'sentiment': sentiment_config()})
+    # Empreintes calculées sur les valeurs d'origine : les types compacts choisis par apply_schema
+    # (float32 ou float64 selon les montants présents) ne doivent pas changer celles des autres groupes
+    df_stable = restore_schema(df_merged.copy(), DF_MAIN_SCHEMA, df_main_dtypes)
+    row_plan, plan = plan_refresh(df_stable, refresh_state, salt=salt)
+    print(f"\n=== RAFRAÎCHISSEMENT ({'complet' if plan['mode'] == 'full' else 'incrémental'}) ===")
+    print(f"🔄 {len(plan['affected_groups'])} groupes (Année, Mois, siret_agence) à traiter sur {plan['groups']}, "
+          f"{len(plan['removed_groups'])} à retirer ({plan['affected_rows']}/{plan['rows']} lignes)")
+    if plan['mode'] == 'incremental':
+        for label, name in (('new_partitions', 'nouvelles'), ('changed_partitions', 'modifiées'),
+                            ('removed_partitions', 'retirées')):
+            partitions = [f'{annee}-{mois:02d}' for annee, mois in plan[label]]
+            print(f"🗓️ Partitions {name}: {len(partitions)} {partitions[:12]}")
+        print(f"🏢 SIRET modifiés: {len(plan['changed_sirets'])} {plan['changed_sirets'][:10]}")
+    df_to_score = df_merged[row_plan['affected'].to_numpy()].copy() if plan['mode'] == 'incremental' else df_merged
+    return {'df_to_score': df_to_score, 'row_plan': row_plan, 'refresh_plan': plan}
+
+def sentiment_stage(df_to_score):
+    """
+    Étape 'sentiment' : labels et scores CamemBERT des lignes à (re)traiter ; le résultat
+    n'est mis en cache que si l'analyse a abouti (sentiment_complete)
+    """
+    df_main = df_to_score
+    # Colonnes label / score de chaque champ présent, même sans texte à analyser :
+    # mêmes colonnes en sortie quel que soit le sous-ensemble de lignes traité
+    for field in SENTIMENT_FIELDS:
+        if field in df_main.columns:
+            for column in SENTIMENT_LABELS[field]:
+                if column not in df_main.columns:
+                    df_main[column] = None
     # ANALYSE DE SENTIMENT AVANCÉE AVEC CAMEMBERT sur le DataFrame principal
     print(f"\n🤖 === ANALYSE DE SENTIMENT AVANCÉE AVEC CAMEMBERT ===")
-    df_main = apply_camembert_sentiment_analysis(df_main)
-    print("✅ Analyse CamemBERT terminée avec succès")
+    if df_main.empty:
+        print("✅ Aucune ligne à analyser")
+        completed = True
+    else:
+        df_main, completed = apply_camembert_sentiment_analysis(df_main)
+    if completed:
+        print("✅ Analyse CamemBERT terminée avec succès")
+    # Labels de sentiment : catégories (aucun type numérique à restaurer)
+    label_schema = {column: dtype for column, dtype in DF_MAIN_SCHEMA.items() if column.startswith('Sentiment ')}
+    df_main, report = apply_schema(df_main, label_schema)
+    return {'df_scored': df_main, 'sentiment_schema_report': report, 'sentiment_complete': completed}
+
+def load_refresh_state(output_path=DF_MAIN_OUTPUT_PATH):
+    """
+    Empreintes des groupes du dernier traitement {(annee, mois, siret_agence): empreinte} ;
+    None sans état exploitable (premier traitement, CSV absent, base modifiée depuis)
+    """
+    RefreshGroup.__table__.create(db.engine, checkfirst=True)
+    groups = db.session.query(RefreshGroup.annee, RefreshGroup.mois, RefreshGroup.siret_agence,
+                              RefreshGroup.fingerprint, RefreshGroup.rows).all()
+    if not groups or not os.path.exists(output_path):
+        return None
+    stored_rows = db.session.query(MainData).count()
+    if sum(group.rows for group in groups) != stored_rows:
+        print(f"⚠️ État de rafraîchissement désynchronisé ({stored_rows} lignes en base)")
+        return None
+    return {(group.annee, group.mois, group.siret_agence): group.fingerprint for group in groups}
+
+def delete_refresh_groups(connection, keys, batch_size=300):
+    """Supprime les lignes MainData et les empreintes des groupes (annee, mois, siret_agence) donnés"""
+    for start in range(0, len(keys), batch_size):
+        batch = [tuple(key) for key in keys[start:start + batch_size]]
+        for model in (MainData, RefreshGroup):
+            connection.execute(model.__table__.delete().where(
+                tuple_(model.annee, model.mois, model.siret_agence).in_(batch)
+            ))
+
+def export_stage(df_scored, row_plan, refresh_plan, join_reports, df_main_dtypes, schema_report, sentiment_schema_report):
+    """
+    Étape 'export' : types d'origine, CSV data/output/df_main.csv et table MainData (toujours exécutée).
+    En mode incrémental, seules les lignes des groupes traités sont remplacées (base et CSV) ;
+    le DataFrame retourné est alors le CSV complet relu (colonnes et types de df_main).
+    """
+    df_main = df_scored
+    storage_dtypes = df_main_dtypes
+    schema_report = {**schema_report, **sentiment_schema_report}
+    incremental = refresh_plan['mode'] == 'incremental'
+    # Sauvegarde du DataFrame principal au format CSV dans data/output
+    output_path = DF_MAIN_OUTPUT_PATH
+    
+    print(f"\n=== TYPES COMPACTS ===")
+    for column, entry in schema_report.items():
+        print(f"🗜️ {column}: {entry['dtype']} ({entry['before'] / 1024:.1f} Ko -> {entry['after'] / 1024:.1f} Ko)")
+    totals = memory_report(schema_report)
+    print(f"🗜️ {totals['columns']} colonnes compactées: {totals['before_mb']} Mo -> {totals['after_mb']} Mo "
+          f"({totals['saved_mb']} Mo gagnés), df_main: "
+          f"{df_main.memory_usage(deep=True).sum() / 1024 ** 2:.2f} Mo")
+    # Types d'origine pour l'export (CSV, base, JSON) : mêmes valeurs qu'à la lecture
+    df_main = restore_schema(df_main, DF_MAIN_SCHEMA, storage_dtypes)
     
     # Export CSV avec virgule comme séparateur décimal (format français)
-    df_main.to_csv(output_path, index=False, encoding='utf-8-sig', decimal=',', sep=';')
-    print(f"💾 DataFrame principal sauvegardé : {output_path} (séparateur décimal: virgule)")
+    if incremental:
+        try:
+            total_rows = splice_csv(output_path, df_main, row_plan, sep=';', decimal=',')
+        except (OSError, ValueError) as e:
+            raise Exception(f'Rafraîchissement incrémental impossible ({e}) : relancer en reconstruction complète (mode=full)')
+        print(f"💾 DataFrame principal mis à jour : {output_path} ({len(df_main)} lignes remplacées sur {total_rows})")
+    else:
+        df_main.to_csv(output_path, index=False, encoding='utf-8-sig', decimal=',', sep=';')
+        print(f"💾 DataFrame principal sauvegardé : {output_path} (séparateur décimal: virgule)")
     
     # NETTOYAGE FINAL des colonnes dupliquées avant sauvegarde en base
+    print(f"\n=== JOINTURES ===")
+    for report in join_reports:
+        print(f"🔗 {report['join']}: {report['left_rows']} -> {report['rows_out']} lignes "
+              f"(droite: {report['right_rows']} lignes, {report['right_keys']} clés, "
+              f"{report['right_duplicates_dropped']} doublons écartés)")
+
     print(f"\n=== NETTOYAGE FINAL AVANT SAUVEGARDE ===")
     duplicate_cols = df_main.columns[df_main.columns.duplicated()]
     if len(duplicate_cols) > 0:
@@ -923,114 +1202,119 @@ def process_excel_files(file1, file2):
     else:
         print("✅ Aucune colonne dupliquée détectée")
 
-    # Sauvegarde dans la base SQLite
+    # Sauvegarde dans la base SQLite : chargement en masse, une seule transaction
     try:
-        # On supprime les anciennes données
-        db.session.query(MainData).delete()
-        db.session.commit()
-        
-        # Fonction helper pour gérer les valeurs Series/scalaires
-        def safe_get(row, col_name, default_value=''):
-            """Récupère une valeur en gérant les cas Series et scalaires"""
-            try:
-                value = row.get(col_name, default_value)
-                # Si c'est une Series pandas, prendre la première valeur non-null
-                if hasattr(value, 'iloc') and hasattr(value, 'dropna'):
-                    non_null_values = value.dropna()
-                    return non_null_values.iloc[0] if len(non_null_values) > 0 else default_value
-                # Si c'est un numpy array, prendre le premier élément
-                elif hasattr(value, '__len__') and hasattr(value, 'item') and len(value) > 0:
-                    return value.item() if hasattr(value, 'item') else str(value)
-                # Si c'est None ou NaN, retourner la valeur par défaut
-                elif value is None or (hasattr(value, 'isna') and value.isna()):
-                    return default_value
-                # Valeur scalaire normale
-                return value
-            except Exception as e:
-                print(f"⚠️ Erreur safe_get pour colonne '{col_name}': {e}")
-                return default_value
-        
-        # On insère les nouvelles données avec les noms de colonnes mis à jour
-        for _, row in df_main.iterrows():
-            db_row = MainData(
-                no_siret=safe_get(row, 'No Siret', ''),
-                code_agence=safe_get(row, 'code agence', ''),
-                siret_agence=safe_get(row, 'siret_agence', ''),
-                siret_interview=safe_get(row, 'SIRET', ''),
-                code_agenc=safe_get(row, 'CODE_AGENC', ''),
-                campagne_appels=safe_get(row, "Campagne d'appels", ''),
-                satisf_globale=safe_get(row, 'Satisf.\n\nGlobale', ''),
-                raison_note_satisfaction=safe_get(row, 'Raison note satisfaction', ''),
-                sentiment_raison_note_satisfaction=safe_get(row, 'Sentiment Raison note satisfaction', ''),
-                score_raison_note_satisfaction=safe_get(row, 'Score raison note de satisfaction', 0),
-                concurrent=safe_get(row, 'Concurrent OnSite', ''),
-                q5_amabilite_disponibilite=safe_get(row, 'Q5 - Amabilité et disponibilit', ''),
-                q6_connaissance_entreprise=safe_get(row, 'Q6 - Connaissance entreprise et objectifs', ''),
-                q7_contribution_objectifs=safe_get(row, 'Q7 - Contribution à votre performance et à l\'atteinte de vos objectifs', ''),
-                q8_qualite_collaboration=safe_get(row, 'Q8 - Qualité de collaboration', ''),
-                sentiment_q8_qualite_collaboration=safe_get(row, 'Sentiment Q8 - Qualité de collaboration', ''),
-                score_q8_qualite_collaboration=safe_get(row, 'Score Q8 - Qualité de collaboration', 0),
-                q9_conformite_candidatures=safe_get(row, 'Q9 - Conformité nombre de candidatures', ''),
-                q10_qualite_pertinence_profils=safe_get(row, 'Q10 - Qualité et pertinence profils', ''),
-                q11_qualite_adequation_candidats=safe_get(row, 'Q11 - Diriez-vous que l\'adéquation entre les candidats proposés par MANPOWER et votre demande est :', ''),
-                sentiment_q11_qualite_adequation_candidats=safe_get(row, 'Sentiment Q11 - Qualité adéquation candidats', ''),
-                score_q11_qualite_adequation_candidats=safe_get(row, 'Score Q11 - Qualité adéquation candidats', 0),
-                q12_reactivite=safe_get(row, 'Q12 - Réactivité pour répondre à vos besoins', ''),
-                q13_efficacite=safe_get(row, 'Q13 - Efficacité', ''),
-                q14_qualite_reactivite=safe_get(row, 'Q14 - Quailté réactivité', ''),
-                sentiment_q14_qualite_reactivite=safe_get(row, 'Sentiment Q14 - Quailté réactivité', ''),
-                score_q14_qualite_reactivite=safe_get(row, 'Score Q14 - Quailté réactivité', 0),
-                q15_production_suivi_contrats=safe_get(row, 'Q15 - Production et suivi des contrats', ''),
-                q16_prestation_administrative=safe_get(row, 'Q16 - Prestation administrative, c\'est-à-dire les relevés d\'activités et la facturation', ''),
-                q17_qualite_presta_administrative=safe_get(row, 'Q17 - Qualité presta administrative', ''),
-                sentiment_q17_qualite_presta_administrative=safe_get(row, 'Sentiment Q17 - Qualité presta administrative', ''),
-                score_q17_qualite_presta_administrative=safe_get(row, 'Score Q17 - Qualité presta administrative', 0),
-                q18_proactivite=safe_get(row, 'Q18 - Proactivité', ''),
-                q19_qualite_infos_reglementation=safe_get(row, 'Q19 - Qualité informations règlementation TT', ''),
-                q20_actions_prevention_securite=safe_get(row, 'Q20 - Actions prévention sécurité', ''),
-                q21_qualite_expertise=safe_get(row, 'Q21 - Diriez-vous que l\'expertise de MANPOWER est :', ''),
-                sentiment_q21_qualite_expertise=safe_get(row, 'Sentiment Q21 - Qualité expertise', ''),
-                score_q21_qualite_expertise=safe_get(row, 'Score Q21 - Qualité expertise', 0),
-                note_recommandation_concurrent=safe_get(row, 'Q21bis - Sur une échelle de 0 à 10, recommanderiez-vous [CONCURRENT PRINCIPAL CITE] pour du TRAVAIL TEMPORAIRE ? ', 0),
-                note_recommandation_manpower=safe_get(row, 'Note Recommandation Manpower', 0),
-                raison_recommandation_manpower=safe_get(row, 'Raison recommandation Manpower', ''),
-                # Colonne sentiment renommée (utilise le bon nom)
-                sentiment_raison_de_recommandation_manpower=safe_get(row, 'Sentiment Raison de recommandation Manpower', ''),
-                score_raison_de_recommandation_manpower=safe_get(row, 'Score Raison de recommandation Manpower', 0),
-                # Colonnes performance
-                annee=safe_get(row, 'Année', 0),
-                mois=safe_get(row, 'Mois', 0),
-                type_entite=safe_get(row, 'type entité', ''),
-                code_dr=safe_get(row, 'Code DR', ''),
-                dr=safe_get(row, 'DR', ''),
-                agence=safe_get(row, 'agence', ''),
-                ouvert_ferme=safe_get(row, 'Ouvert / Fermé', ''),
-                raison_sociale=safe_get(row, 'raison sociale', ''),
-                ca_cum_a=safe_get(row, 'Ca Cum A', 0.0),
-                ca_cum_a_1=safe_get(row, 'Ca Cum A-1', 0.0),
-                var_ca_cum=safe_get(row, 'var ca cum', 0.0),
-                ca_mois_m=safe_get(row, 'Ca Mois M', 0.0),
-                ca_mois_m_1=safe_get(row, 'Ca Mois M-1', 0.0),
-                var_ca_mois=safe_get(row, 'var ca mois', 0.0),
-                ca_cum_a_siret=safe_get(row, 'Ca Cum A SIRET', 0.0),
-                ca_cum_a_1_siret=safe_get(row, 'Ca Cum A-1 SIRET', 0.0),
-                var_ca_cum_siret=safe_get(row, 'var ca cum SIRET', 0.0),
-                ca_mois_a_siret=safe_get(row, 'ca mois A SIRET', 0.0),
-                ca_mois_a_1_siret=safe_get(row, 'ca mois A-1 SIRET', 0.0),
-                var_ca_mois_siret=safe_get(row, 'var ca mois SIRET', 0.0),
-                # Colonnes ETP ajoutées
-                etp_cum_a=safe_get(row, 'ETP Cum A', 0.0),
-                etp_cum_a_1=safe_get(row, 'ETP Cum A-1', 0.0),
-                var_etp_cum=safe_get(row, 'var ETP cum', 0.0)
-            )
-            db.session.add(db_row)
-        db.session.commit()
+        with load_transaction(db.engine) as connection:
+            if incremental:
+                # On supprime les lignes des groupes retraités ou disparus
+                delete_refresh_groups(connection, refresh_plan['affected_groups'] + refresh_plan['removed_groups'])
+            else:
+                # On supprime les anciennes données
+                connection.execute(MainData.__table__.delete())
+                connection.execute(RefreshGroup.__table__.delete())
+            # On insère les nouvelles données avec les noms de colonnes mis à jour
+            load_stats = insert_frame(connection, MainData, df_main, MAIN_DATA_COLUMNS)
+            # Empreintes des groupes écrits, pour le prochain rafraîchissement incrémental
+            insert_rows(connection, RefreshGroup, ['annee', 'mois', 'siret_agence', 'fingerprint', 'rows'],
+                        refresh_plan['fingerprints'])
         print(f"✅ Sauvegarde réussie : {len(df_main)} lignes insérées en base avec Q11 renommée")
+        print(f"⚡ Chargement SQLite : {load_stats['seconds']:.2f}s ({load_stats['rows_per_second']} lignes/s)")
     except SQLAlchemyError as e:
-        db.session.rollback()
         print(f"❌ Erreur lors de la sauvegarde en base : {str(e)}")
         raise Exception(f'Erreur lors de la sauvegarde en base : {str(e)}')
 
+    if incremental:
+        # Mêmes colonnes que df_main (sans les doublons du CSV) : texte relu en chaînes (SIRET avec
+        # zéros de tête), catégories et entiers nullables avec leur type, autres numériques inférés
+        dtypes = {column: str if dtype == object else dtype for column, dtype in df_main.dtypes.items()
+                  if dtype == object or not isinstance(dtype, np.dtype)}
+        df_main = pd.read_csv(output_path, encoding='utf-8-sig', decimal=',', sep=';',
+                              usecols=list(df_main.columns), dtype=dtypes)
+    return {'df_main': df_main}
+
+def processing_pipeline():
+    """
+    Étapes du traitement et configuration dont dépend chacune (clé de son cache) :
+    read -> performance -> interview -> merge -> refresh -> sentiment -> export
+    Les modules déclarés par étape entrent aussi dans sa clé : une modification de la lecture,
+    des jointures ou de l'analyse de sentiment invalide les résultats en cache qui en dépendent
+    """
+    ingestion = 'src.api.services.ingestion'
+    partitioned = ['src.api.services.partitioned_join', 'src.api.services.workbook_cache']
+    return Pipeline([
+        Stage('read', read_stage, inputs=['file1', 'file2'],
+              outputs=['performance_source', 'interview_source'],
+              config={'performance_cols': PERFORMANCE_COLS, 'stream_min_bytes': chunked_threshold_bytes()},
+              cache=False, modules=[ingestion]),
+        Stage('performance', performance_stage, inputs=['performance_source'],
+              outputs=['df_performance', 'partitioned_join', 'dr_by_siret_agence', 'agence_siret',
+                       'performance_columns', 'performance_dtypes', 'performance_schema_report'],
+              config={'performance_cols': PERFORMANCE_COLS, 'dtypes': PERFORMANCE_DTYPES, 'schema': DF_MAIN_SCHEMA},
+              modules=[ingestion, *partitioned, 'src.modules.ai.siret_cleaner', prepare_performance]),
+        Stage('interview', interview_stage, inputs=['interview_source', 'agence_siret', 'performance_columns'],
+              outputs=['df_interview', 'interview_q12_col'],
+              config={'rename_map': RENAME_MAP},
+              modules=['src.api.services.header_resolver', 'src.modules.ai.siret_cleaner']),
+        Stage('merge', merge_stage,
+              inputs=['df_performance', 'partitioned_join', 'dr_by_siret_agence', 'performance_columns',
+                      'performance_dtypes', 'performance_schema_report', 'df_interview', 'interview_q12_col'],
+              outputs=['df_merged', 'join_reports', 'df_main_dtypes', 'schema_report'],
+              config={'rename_map': RENAME_MAP, 'performance_cols': PERFORMANCE_COLS, 'schema': DF_MAIN_SCHEMA,
+                      'on_fanout': os.getenv('JOIN_ON_FANOUT', DEFAULT_ON_FANOUT)},
+              modules=[ingestion, *partitioned, 'src.api.services.campaign_join', 'src.api.services.join_planner',
+                       'src.api.services.header_resolver', keep_campaign_rows, join_campaign_rows]),
+        # Dépend de l'état enregistré en base (source refresh_state) : pas de cache
+        Stage('refresh', refresh_stage, inputs=['df_merged', 'df_main_dtypes', 'refresh_state'],
+              outputs=['df_to_score', 'row_plan', 'refresh_plan'],
+              config={'sentiment': sentiment_config()}, cache=False,
+              modules=['src.api.services.incremental_refresh']),
+        Stage('sentiment', sentiment_stage, inputs=['df_to_score'],
+              outputs=['df_scored', 'sentiment_schema_report', 'sentiment_complete'],
+              config=sentiment_config(),
+              cache=lambda outputs: outputs['sentiment_complete'],
+              modules=[ingestion, 'src.modules.ai.sentiment_camembert', apply_camembert_sentiment_analysis]),
+        Stage('export', export_stage,
+              inputs=['df_scored', 'row_plan', 'refresh_plan', 'join_reports', 'df_main_dtypes',
+                      'schema_report', 'sentiment_schema_report'],
+              outputs=['df_main'], cache=False,
+              modules=[ingestion, 'src.api.services.incremental_refresh', 'src.api.services.sqlite_loader']),
+    ], cache=get_stage_cache())
+
+def process_excel_files(file1, file2, mode=None):
+    """
+    Traite les fichiers Excel en détectant automatiquement lequel est performance vs interview.
+    Les étapes dont les entrées (contenu des fichiers), la configuration et le code sont inchangés
+    depuis un traitement précédent sont relues depuis le cache des étapes.
+    `mode` : 'incremental' (défaut, REFRESH_MODE) ne remplace que les groupes (Année, Mois,
+    siret_agence) nouveaux ou modifiés depuis le dernier traitement ; 'full' reconstruit tout.
+    """
+    mode = refresh_mode(mode)
+    refresh_state = load_refresh_state() if mode == 'incremental' else None
+    if mode == 'incremental' and refresh_state is None:
+        print("ℹ️ Aucun état de rafraîchissement exploitable : reconstruction complète")
+    pipeline = processing_pipeline()
+    sources = {'file1': file1, 'file2': file2, 'refresh_state': refresh_state}
+    fingerprints = None
+    if pipeline.cache is not None:
+        fingerprints = {
+            'file1': content_hash(file1), 'file2': content_hash(file2),
+            'refresh_state': 'full' if refresh_state is None else config_fingerprint(
+                sorted([*key, fingerprint] for key, fingerprint in refresh_state.items())),
+        }
+    try:
+        df_main = pipeline.run(sources, targets=['df_main'], fingerprints=fingerprints)['df_main']
+    finally:
+        # Partitions sur disque d'une étape performance dont la fusion n'a pas été exécutée
+        partitioned_join = pipeline.values.get('partitioned_join')
+        if partitioned_join is not None:
+            partitioned_join.cleanup()
+    print(f"\n=== ÉTAPES ===")
+    for entry in pipeline.report:
+        if entry['status'] == 'cache':
+            print(f"♻️ {entry['stage']}: relue depuis le cache")
+        else:
+            print(f"▶️ {entry['stage']}: exécutée en {entry['seconds']:.2f}s"
+                  f"{' (mise en cache)' if entry.get('stored') else ''}")
     return df_main
 
 # Utilitaire robuste pour .tolist()
@@ -80,4 +80,15 @@ class MainData(db.Model):
         if self.no_siret:
             s = str(self.no_siret).strip()
             return s.zfill(13)
-        return '0'*13
\ No newline at end of file
+        return '0'*13
+
+
+class RefreshGroup(db.Model):
+    """Empreinte d'un groupe (Année, Mois, siret_agence) de main_data au dernier traitement (rafraîchissement incrémental)"""
+    __tablename__ = 'refresh_groups'
+    id = Column(Integer, primary_key=True)
+    annee = Column('Année', Integer)
+    mois = Column('Mois', Integer)
+    siret_agence = Column('siret_agence', String)
+    fingerprint = Column(String(32))
+    rows = Column(Integer)
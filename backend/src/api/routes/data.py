@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from src.api.controllers.data_controller import process_excel_files
+from src.api.services.ingestion import load_table, load_tables, SUPPORTED_EXTENSIONS
+from src.api.services.incremental_refresh import REFRESH_MODES
+from src.modules.ai.siret_cleaner import normalize_siret, siret_index, backfill_siret
 import logging
 
 import os
+import numpy as np
 import pandas as pd
 
 data_bp = Blueprint('data', __name__)
@@ -17,7 +21,7 @@ def process_excels():
         # On attend deux fichiers dans le formulaire : 'performance' et 'interview'
         if 'performance' not in request.files or 'interview' not in request.files:
             logger.warning('Fichiers manquants dans la requête')
-            return jsonify({'error': 'Les deux fichiers Excel sont requis (performance, interview)'}), 400
+            return jsonify({'error': 'Les deux fichiers sont requis (performance, interview)'}), 400
         
         performance_file = request.files['performance']
         interview_file = request.files['interview']
@@ -26,6 +30,18 @@ def process_excels():
         if performance_file.filename == '' or interview_file.filename == '':
             logger.warning('Fichiers vides dans la requête')
             return jsonify({'error': 'Les fichiers ne peuvent pas être vides'}), 400
+        
+        # Formats acceptés : Excel (.xlsx), CSV et Parquet, pour l'un ou l'autre rôle
+        for uploaded in (performance_file, interview_file):
+            if os.path.splitext(uploaded.filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+                logger.warning(f'Format non pris en charge: {uploaded.filename}')
+                return jsonify({'error': f"Format non pris en charge ({uploaded.filename}) : {', '.join(SUPPORTED_EXTENSIONS)} attendus"}), 400
+        
+        # Mode de rafraîchissement : 'incremental' (défaut) ou 'full' pour une reconstruction complète
+        mode = request.form.get('mode') or None
+        if mode is not None and mode not in REFRESH_MODES:
+            logger.warning(f'Mode de rafraîchissement invalide: {mode}')
+            return jsonify({'error': f"Mode invalide ({mode}) : {', '.join(REFRESH_MODES)} attendus"}), 400
     
     except Exception as e:
         logger.error(f'Erreur lors de la validation des fichiers: {e}')
@@ -44,7 +60,7 @@ def process_excels():
         
         # Démarrer le traitement
         start_time = time.time()
-        df_main = process_excel_files(performance_file, interview_file)
+        df_main = process_excel_files(performance_file, interview_file, mode=mode)
         end_time = time.time()
         
         logger.info(f'Traitement terminé en {end_time - start_time:.2f} secondes')
@@ -138,7 +154,7 @@ def preview_performance():
     logger.info('Requête reçue pour /preview_performance')
     if 'performance' not in request.files or 'interview' not in request.files:
         logger.warning('Fichiers manquants dans la requête')
-        return jsonify({'error': 'Les deux fichiers Excel sont requis (performance, interview)'}), 400
+        return jsonify({'error': 'Les deux fichiers sont requis (performance, interview)'}), 400
     
     performance_file = request.files['performance']
     interview_file = request.files['interview']
@@ -148,11 +164,11 @@ def preview_performance():
         import pandas as pd
         
         # Lecture et nettoyage du DataFrame Performance comme dans le controller
-        df_performance = pd.read_excel(performance_file)
+        df_performance = load_table(performance_file)
         
         # Nettoyage SIRET sur 14 caractères, sans décimale
         if 'No Siret' in df_performance.columns:
-            df_performance['No Siret'] = df_performance['No Siret'].apply(lambda x: str(x).split('.')[0].zfill(14))
+            df_performance['No Siret'] = normalize_siret(df_performance['No Siret'])
         
         # Ajout de la colonne siret_agence
         if 'No Siret' in df_performance.columns and 'code agence' in df_performance.columns:
@@ -172,7 +188,7 @@ def preview_interview():
     logger.info('Requête reçue pour /preview_interview')
     if 'performance' not in request.files or 'interview' not in request.files:
         logger.warning('Fichiers manquants dans la requête')
-        return jsonify({'error': 'Les deux fichiers Excel sont requis (performance, interview)'}), 400
+        return jsonify({'error': 'Les deux fichiers sont requis (performance, interview)'}), 400
     
     performance_file = request.files['performance']
     interview_file = request.files['interview']
@@ -180,11 +196,14 @@ def preview_interview():
     try:
         logger.info('Nettoyage du DataFrame Interview...')
         import pandas as pd
-        from src.modules.ai.sentiment import analyze_sentiment
+        from src.modules.ai.sentiment import analyze_sentiment_batch
         
-        # Lecture des DataFrames
-        df_performance = pd.read_excel(performance_file)
-        df_interview = pd.read_excel(interview_file)
+        # Lecture des DataFrames en parallèle (via le cache des classeurs) ; seules les
+        # colonnes SIRET / code agence du fichier performance servent ici
+        df_performance, df_interview = load_tables([
+            (performance_file, ['No Siret', 'code agence']),
+            (interview_file, None),
+        ])
         
         # DEBUG : Afficher les colonnes avant renommage pour identifier les problèmes
         logger.info(f'Colonnes originales df_interview: {df_interview.columns.tolist()}')
@@ -201,17 +220,17 @@ def preview_interview():
         
         # Nettoyage SIRET sur 14 caractères
         if 'No Siret' in df_performance.columns:
-            df_performance['No Siret'] = df_performance['No Siret'].apply(lambda x: str(x).split('.')[0].zfill(14))
+            df_performance['No Siret'] = normalize_siret(df_performance['No Siret'])
         if 'SIRET' in df_interview.columns:
-            df_interview['SIRET'] = df_interview['SIRET'].apply(lambda x: str(x).split('.')[0].zfill(14))
+            df_interview['SIRET'] = normalize_siret(df_interview['SIRET'])
         
-        # Gestion des SIRET vides dans interview
-        mask_empty = df_interview['SIRET'].isnull() | (df_interview['SIRET'] == '')
-        for idx in df_interview[mask_empty].index:
-            code_ag = df_interview.at[idx, 'CODE_AGENC']
-            match = df_performance[df_performance['code agence'] == code_ag]
-            if not match.empty:
-                df_interview.at[idx, 'SIRET'] = match.iloc[0]['No Siret']
+        # Gestion des SIRET vides dans interview (index code agence -> premier SIRET, construit une fois)
+        if 'code agence' in df_performance.columns and 'No Siret' in df_performance.columns:
+            agence_siret = siret_index(df_performance['code agence'], df_performance['No Siret'])
+        else:
+            agence_siret = pd.Series(dtype=object)
+        if 'SIRET' in df_interview.columns and 'CODE_AGENC' in df_interview.columns:
+            df_interview['SIRET'] = backfill_siret(df_interview['SIRET'], df_interview['CODE_AGENC'], agence_siret)
         
         # Renommage des colonnes selon le mapping
         rename_map = {
@@ -286,11 +305,26 @@ def preview_interview():
             "Raison recommandation Manpower"
         ]
         
-        # Appliquer l'analyse de sentiment
-        for col in sentiment_cols:
-            if col in df_interview.columns:
-                df_interview[f'Sentiment {col}'] = df_interview[col].apply(lambda x: analyze_sentiment(x)[0] if x != 'Pas de réponse' else 'Pas de réponse')
-                df_interview[f'Score {col}'] = df_interview[col].apply(lambda x: analyze_sentiment(x)[1] if x != 'Pas de réponse' else 'Pas de réponse')
+        # Appliquer l'analyse de sentiment : une seule passe sur les réponses de toutes les colonnes
+        present_cols = [col for col in sentiment_cols if col in df_interview.columns]
+        answered = {col: (df_interview[col] != 'Pas de réponse').to_numpy() for col in present_cols}
+        flat_texts = []
+        for col in present_cols:
+            flat_texts.extend(df_interview[col].to_numpy()[answered[col]])
+        flat_results = analyze_sentiment_batch(flat_texts)
+        logger.info(f'Sentiment TextBlob: {len(flat_texts)} réponses, {len(set(map(str, flat_texts)))} textes distincts')
+        
+        offset = 0
+        for col in present_cols:
+            mask = answered[col]
+            col_results = flat_results[offset:offset + mask.sum()]
+            offset += mask.sum()
+            labels = np.full(len(df_interview), 'Pas de réponse', dtype=object)
+            scores = np.full(len(df_interview), 'Pas de réponse', dtype=object)
+            labels[mask] = [label for label, _ in col_results]
+            scores[mask] = [score for _, score in col_results]
+            df_interview[f'Sentiment {col}'] = labels
+            df_interview[f'Score {col}'] = scores
         
         # Ajout de la colonne siret_agence
         if 'SIRET' in df_interview.columns and 'CODE_AGENC' in df_interview.columns:
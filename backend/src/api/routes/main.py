@@ -1,7 +1,20 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify
+from src.modules.ai.model_status import get_status
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/ping', methods=['GET'])
 def ping():
-    return jsonify({'message': 'pong'}), 200 
\ No newline at end of file
+    return jsonify({'message': 'pong'}), 200
+
+@main_bp.route('/ready', methods=['GET'])
+def ready():
+    """
+    Disponibilité réelle du modèle de sentiment (503 tant qu'il n'est pas prêt).
+    Sans préchauffage (SENTIMENT_WARMUP=0), le modèle est chargé à la première analyse :
+    l'application est prête dès le démarrage, sauf échec d'un chargement.
+    """
+    status = get_status()
+    status['lazy'] = not current_app.config.get('SENTIMENT_WARMUP')
+    ready = status['ready'] or (status['lazy'] and status['state'] != 'error')
+    return jsonify(status), 200 if ready else 503
@@ -0,0 +1,82 @@
+"""
+Fusion performance / interview restreinte à l'année de campagne
+Équivalent de pd.merge(how='left') suivi du filtre Campagne d'appels = Année - 1,
+sans matérialiser les lignes écartées par le filtre : les clés texte sont encodées
+en entiers (codes partagés par les deux côtés) et la jointure se fait sur (clé, année).
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+logger = logging.getLogger('campaign_join')
+
+
+def _year_codes(years):
+    """Années en int64 et masque des années renseignées (entières)"""
+    years = pd.to_numeric(years, errors='coerce').astype('Float64')
+    valid = (years.notna() & (years == years.round())).to_numpy(dtype=bool, na_value=False)
+    values = np.zeros(len(years), dtype=np.int64)
+    values[valid] = years[valid].to_numpy(dtype=np.int64)
+    return values, valid
+
+
+def _left_join_dtype(series):
+    """Type d'une colonne de droite dans une jointure gauche où des lignes n'ont pas de correspondance"""
+    values = series.array if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else series.to_numpy()
+    return take(values, np.array([-1]), allow_fill=True).dtype
+
+
+def campaign_join(left, right, key, left_year, right_year, year_offset=1, suffixes=('', '_interview')):
+    """
+    Lignes de la jointure gauche de `left` et `right` sur `key` telles que
+    right[right_year] == left[left_year] - year_offset, dans l'ordre de pd.merge.
+    Retourne (résultat, colonnes ayant au moins une valeur dans la jointure gauche complète).
+    """
+    # Codes entiers partagés : les clés gauche absentes à droite (-1) n'ont aucune correspondance
+    right_codes, uniques = pd.factorize(right[key])
+    left_codes = pd.Index(uniques).get_indexer(left[key])
+    left_years, left_valid = _year_codes(left[left_year])
+    right_years, right_valid = _year_codes(right[right_year])
+
+    left_rows = np.flatnonzero((left_codes >= 0) & left_valid)
+    right_rows = np.flatnonzero((right_codes >= 0) & right_valid)
+    pairs = pd.merge(
+        pd.DataFrame({'k': left_codes[left_rows], 'y': left_years[left_rows] - year_offset, 'l': left_rows}),
+        pd.DataFrame({'k': right_codes[right_rows], 'y': right_years[right_rows], 'r': right_rows}),
+        on=['k', 'y'], how='inner'
+    )
+    # Ordre de la jointure gauche : lignes gauche dans l'ordre, correspondances dans l'ordre de droite
+    order = np.lexsort((pairs['r'].to_numpy(), pairs['l'].to_numpy()))
+    pair_left = pairs['l'].to_numpy()[order]
+    pair_right = pairs['r'].to_numpy()[order]
+
+    right_values = right.drop(columns=[key])
+    overlap = set(left.columns) & set(right_values.columns)
+    left_part = left.take(pair_left).reset_index(drop=True)
+    right_part = right_values.take(pair_right).reset_index(drop=True)
+    left_part.columns = [f'{col}{suffixes[0]}' if col in overlap else col for col in left.columns]
+    right_part.columns = [f'{col}{suffixes[1]}' if col in overlap else col for col in right_values.columns]
+
+    # Types de la jointure gauche complète : s'il existe des lignes gauche sans correspondance,
+    # les colonnes de droite y reçoivent des valeurs manquantes (ex: entiers -> float64)
+    key_in_left = np.zeros(len(uniques), dtype=bool)
+    key_in_left[left_codes[left_codes >= 0]] = True
+    right_in_left = np.zeros(len(right), dtype=bool)
+    right_in_left[right_codes >= 0] = key_in_left[right_codes[right_codes >= 0]]
+    if (left_codes < 0).any():
+        for position in range(right_part.shape[1]):
+            dtype = _left_join_dtype(right_values.iloc[:, position])
+            if right_part.dtypes.iloc[position] != dtype:
+                right_part.isetitem(position, right_part.iloc[:, position].astype(dtype))
+
+    result = pd.concat([left_part, right_part], axis=1)
+    has_values = pd.concat([
+        left.notna().any().set_axis(left_part.columns),
+        right_values[right_in_left].notna().any().set_axis(right_part.columns),
+    ])
+    logger.info(f'Fusion (clé, année): {len(left_rows)}/{len(left)} lignes gauche candidates, '
+                f'{len(result)} lignes conservées')
+    return result, has_values
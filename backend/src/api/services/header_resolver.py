@@ -0,0 +1,88 @@
+"""
+Résolution des en-têtes de colonnes
+Le mapping de renommage est compilé une fois (clés normalisées, numéro de question) ;
+les résolutions sont mises en cache par signature d'en-tête : un classeur de même
+structure qu'un classeur déjà traité est résolu sans nouvelle recherche.
+"""
+
+from functools import lru_cache
+import logging
+
+logger = logging.getLogger('header_resolver')
+
+DEFAULT_CACHE_SIZE = 64
+
+
+def header_signature(columns):
+    """Signature (hachable) d'un en-tête : les noms de colonnes dans l'ordre"""
+    return tuple(str(col) for col in columns)
+
+
+def _question_number(name):
+    # 'Q11 - Diriez-vous ...' -> 'Q11' (recherche de dernier recours pour les colonnes Q)
+    if name.startswith('Q') and ' - ' in name:
+        return name.split(' - ')[0]
+    return None
+
+
+class HeaderResolver:
+    """
+    Mapping de renommage compilé. Pour chaque entrée (dans l'ordre du mapping), une colonne
+    non encore utilisée est recherchée : nom exact, puis inclusion dans un sens ou dans l'autre
+    (sans casse), puis numéro de question.
+    """
+
+    def __init__(self, rename_map: dict, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.entries = tuple(
+            (old_name, new_name, old_name.lower(), _question_number(old_name))
+            for old_name, new_name in rename_map.items()
+        )
+        self._rename_plan = lru_cache(maxsize=cache_size)(self._compile_rename_plan)
+        self._containing_all = lru_cache(maxsize=cache_size * 8)(self._compile_containing_all)
+        self._first_containing_any = lru_cache(maxsize=cache_size * 8)(self._compile_first_containing_any)
+
+    # --- Renommage ---
+
+    def rename_plan(self, columns):
+        """{colonne: nouveau nom} pour un en-tête (résultat partagé : ne pas modifier)"""
+        return self._rename_plan(header_signature(columns))
+
+    def _compile_rename_plan(self, signature):
+        present = set(signature)
+        lowered = [(col, col.lower()) for col in signature]
+        used = set()
+        plan = {}
+        for old_name, new_name, old_lower, q_num in self.entries:
+            if old_name in present and old_name not in used:
+                match = old_name
+            else:
+                match = next((col for col, col_lower in lowered
+                              if col not in used and (old_lower in col_lower or col_lower in old_lower)), None)
+                if match is None and q_num:
+                    match = next((col for col in signature if col not in used and q_num in col), None)
+            if match is None:
+                logger.debug(f"Colonne non trouvée pour renommage: '{old_name}'")
+                continue
+            used.add(match)
+            plan[match] = new_name
+        return plan
+
+    # --- Recherches par motif ---
+
+    def containing_all(self, columns, *needles):
+        """Colonnes dont le nom contient tous les motifs (sensible à la casse)"""
+        return list(self._containing_all(header_signature(columns), needles))
+
+    def _compile_containing_all(self, signature, needles):
+        return tuple(col for col in signature if all(needle in col for needle in needles))
+
+    def first_containing_any(self, columns, *needles):
+        """Première colonne dont le nom contient l'un des motifs (sans casse), sinon None"""
+        return self._first_containing_any(header_signature(columns), tuple(needle.lower() for needle in needles))
+
+    def _compile_first_containing_any(self, signature, needles):
+        return next((col for col in signature if any(needle in col.lower() for needle in needles)), None)
+
+    def get_stats(self):
+        info = self._rename_plan.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'layouts': info.currsize}
@@ -0,0 +1,168 @@
+"""
+Rafraîchissement incrémental de df_main
+Les lignes fusionnées (avant analyse de sentiment) sont regroupées par (Année, Mois, siret_agence)
+et chaque groupe reçoit une empreinte de son contenu. Comparées à celles du traitement précédent,
+elles désignent les groupes à traiter : nouveaux ou modifiés (nouveau mois de performance,
+réponses d'interview corrigées pour un SIRET...). Les lignes des autres groupes restent telles
+quelles en base et dans le CSV de sortie.
+"""
+
+import csv
+import hashlib
+import io
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('incremental_refresh')
+
+# 'incremental' : seuls les groupes nouveaux ou modifiés ; 'full' : reconstruction complète
+REFRESH_MODES = ('incremental', 'full')
+DEFAULT_REFRESH_MODE = 'incremental'
+
+# Colonnes de df_main qui définissent un groupe, et champs correspondants de la clé
+GROUP_COLUMNS = ('Année', 'Mois', 'siret_agence')
+KEY_FIELDS = ('annee', 'mois', 'siret_agence')
+
+
+def refresh_mode(mode=None):
+    """Mode demandé, sinon REFRESH_MODE (incrémental par défaut)"""
+    mode = mode or os.getenv('REFRESH_MODE', DEFAULT_REFRESH_MODE)
+    if mode not in REFRESH_MODES:
+        raise ValueError(f"Mode de rafraîchissement invalide: {mode} (attendu: {', '.join(REFRESH_MODES)})")
+    return mode
+
+
+def _column(df, name):
+    """Première occurrence d'une colonne (df_main peut contenir des colonnes dupliquées)"""
+    values = df[name]
+    return values.iloc[:, 0] if isinstance(values, pd.DataFrame) else values
+
+
+def _key_number(value):
+    """Année / Mois d'une clé : entier, 0 si absent (comme à l'insertion en base)"""
+    if value is None or value == '' or pd.isna(value):
+        return 0
+    return int(float(str(value).replace(',', '.')))
+
+
+def group_keys(df):
+    """Clé (annee, mois, siret_agence) de chaque ligne, dans l'ordre de df"""
+    keys = pd.DataFrame(index=range(len(df)))
+    for field, column in zip(KEY_FIELDS[:2], GROUP_COLUMNS[:2]):
+        keys[field] = pd.to_numeric(_column(df, column), errors='coerce').fillna(0).astype('int64').to_numpy()
+    siret = _column(df, GROUP_COLUMNS[2])
+    keys[KEY_FIELDS[2]] = siret.astype(object).where(siret.notna(), '').astype(str).to_numpy()
+    return keys
+
+
+def _stable_columns(df):
+    """
+    Colonnes numériques en float64 : l'empreinte d'une valeur ne dépend pas de son type de
+    stockage (Int8 / Int64, int64 / float64 quand une valeur manque, float32 / float64)
+    """
+    columns = {}
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position]
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            values = values.astype('float64')
+        columns[position] = values
+    return pd.DataFrame(columns, index=df.index)
+
+
+def group_fingerprints(df, salt=''):
+    """
+    {clé: (empreinte, lignes)} : sha256 des empreintes des lignes du groupe, dans l'ordre,
+    préfixé par `salt` (colonnes et configuration dont dépend le résultat)
+    """
+    row_hashes = pd.util.hash_pandas_object(_stable_columns(df), index=False).to_numpy()
+    keys = group_keys(df)
+    fingerprints = {}
+    for key, positions in keys.groupby(list(KEY_FIELDS), sort=False).indices.items():
+        digest = hashlib.sha256(salt.encode('utf-8'))
+        digest.update(row_hashes[positions].tobytes())
+        fingerprints[(int(key[0]), int(key[1]), str(key[2]))] = (digest.hexdigest()[:32], len(positions))
+    return fingerprints
+
+
+def plan_refresh(df, stored, salt=''):
+    """
+    Compare les groupes de df aux empreintes `stored` ({clé: empreinte} du traitement précédent,
+    None pour une reconstruction complète). Retourne (row_plan, plan) :
+    - row_plan : clé et indicateur 'affected' de chaque ligne de df, dans l'ordre ;
+    - plan : groupes à traiter et à retirer, leurs nouvelles empreintes, et le relevé des
+      partitions (Année, Mois) et des SIRET concernés (sérialisable en JSON).
+    """
+    current = group_fingerprints(df, salt)
+    full = stored is None
+    stored = stored or {}
+    affected = [key for key, (fingerprint, _) in current.items() if full or stored.get(key) != fingerprint]
+    removed = [] if full else [key for key in stored if key not in current]
+
+    row_plan = group_keys(df)
+    affected_set = set(affected)
+    row_plan['affected'] = np.fromiter(
+        (key in affected_set for key in zip(*(row_plan[field] for field in KEY_FIELDS))), dtype=bool, count=len(df)
+    ) if affected_set else np.zeros(len(df), dtype=bool)
+
+    current_partitions = {key[:2] for key in current}
+    stored_partitions = {key[:2] for key in stored}
+    kept_partitions = current_partitions & stored_partitions
+    changed = affected + removed
+    plan = {
+        'mode': 'full' if full else 'incremental',
+        'rows': len(df),
+        'affected_rows': int(row_plan['affected'].sum()),
+        'groups': len(current),
+        'affected_groups': [list(key) for key in affected],
+        'removed_groups': [list(key) for key in removed],
+        'fingerprints': [[*key, *current[key]] for key in affected],
+        'new_partitions': sorted(list(key) for key in current_partitions - stored_partitions),
+        'changed_partitions': sorted(list(key) for key in {key[:2] for key in changed} & kept_partitions),
+        'removed_partitions': sorted(list(key) for key in stored_partitions - current_partitions),
+        'changed_sirets': sorted({key[2] for key in changed if key[:2] in kept_partitions}),
+    }
+    logger.info(f"Rafraîchissement {plan['mode']}: {len(affected)} groupes à traiter, {len(removed)} à retirer "
+                f"sur {len(current)} ({plan['affected_rows']}/{len(df)} lignes)")
+    return row_plan, plan
+
+
+def splice_csv(path, df_new, row_plan, sep=';', decimal=','):
+    """
+    Réécrit le CSV `path` dans l'ordre de row_plan : lignes existantes (texte inchangé) pour les
+    groupes non traités, lignes de df_new (les lignes traitées, dans l'ordre) pour les autres.
+    ValueError si le fichier ne correspond plus à l'état enregistré (reconstruction complète requise).
+    """
+    text = df_new.to_csv(index=False, sep=sep, decimal=decimal)
+    new_records = csv.reader(io.StringIO(text, newline=''), delimiter=sep)
+    header = next(new_records)
+    positions = [header.index(column) for column in GROUP_COLUMNS]
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        records = csv.reader(f, delimiter=sep)
+        if next(records, None) != header:
+            raise ValueError(f'{path}: colonnes différentes du traitement en cours')
+        kept = {}
+        for record in records:
+            key = (_key_number(record[positions[0]]), _key_number(record[positions[1]]), record[positions[2]])
+            kept.setdefault(key, []).append(record)
+    kept = {key: iter(group) for key, group in kept.items()}
+
+    rows = []
+    for annee, mois, siret_agence, affected in row_plan[[*KEY_FIELDS, 'affected']].itertuples(index=False):
+        source = new_records if affected else kept.get((annee, mois, siret_agence), iter(()))
+        record = next(source, None)
+        if record is None:
+            raise ValueError(f'{path}: lignes manquantes pour le groupe {(annee, mois, siret_agence)}')
+        rows.append(record)
+
+    # Même écriture que DataFrame.to_csv (csv.writer, guillemets minimaux, BOM utf-8-sig)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, delimiter=sep, lineterminator=os.linesep, quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp, path)
+    return len(rows)
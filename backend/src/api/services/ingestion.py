@@ -0,0 +1,711 @@
+"""
+Ingestion des fichiers d'entrée : classeurs Excel (.xlsx), CSV (formats français ; / , compris) et Parquet
+Lecture de l'en-tête seul, puis lecture des seules colonnes utiles (en flux openpyxl read-only
+pour Excel) : les colonnes non demandées ne sont jamais matérialisées en DataFrame.
+Les deux fichiers d'un traitement sont lus en parallèle dans des processus séparés
+(sauf s'ils sont déjà servis par le cache des classeurs).
+"""
+
+import atexit
+import codecs
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+from src.api.services.workbook_cache import content_hash, get_workbook_cache, frame_to_table, table_to_frame
+
+logger = logging.getLogger('ingestion')
+
+# Valeurs texte interprétées comme manquantes (mêmes valeurs par défaut que pd.read_excel)
+EXCEL_NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+
+# Taille des morceaux de la lecture en flux (mode par partitions)
+DEFAULT_CHUNK_ROWS = 10000
+_CSV_CHECK_BLOCK = 1024 * 1024
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.csv', '.parquet')
+# Identifiants lus en texte depuis un CSV (zéros de tête conservés, jamais convertis en float)
+CSV_TEXT_COLUMNS = ('No Siret', 'SIRET')
+
+# Détection des rôles : le fichier interview contient les colonnes Q, le fichier performance contient "Année"
+INTERVIEW_INDICATORS = ['Q5', 'Q7', 'Q8', 'Q11', 'Satisf', 'SIRET', 'CODE_AGENC', 'Campagne']
+PERFORMANCE_INDICATORS = ['Année', 'Ca Cum A', 'No Siret', 'code agence', 'raison sociale']
+ROLE_MIN_INDICATORS = 3
+
+
+def _rewind(file):
+    """Les FileStorage Flask / BytesIO sont relus plusieurs fois (en-tête puis données)"""
+    if hasattr(file, 'seek'):
+        file.seek(0)
+
+
+def _stream(file):
+    """Flux binaire d'un envoi Flask (FileStorage.stream), que pandas ne reconnaît pas sous son enveloppe"""
+    return getattr(file, 'stream', file)
+
+
+def _header_names(row):
+    """Noms de colonnes comme pd.read_excel : 'Unnamed: i' pour les vides, doublons suffixés .1, .2..."""
+    cells = list(row)
+    while cells and cells[-1] is None:
+        cells.pop()
+    names = [f'Unnamed: {i}' if value is None
+             else int(value) if isinstance(value, float) and value.is_integer()
+             else value
+             for i, value in enumerate(cells)]
+    counts = {}
+    for i, name in enumerate(names):
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f'{name}.{count}'
+            count = counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+
+def _convert_cell(value):
+    # Flottants entiers -> int et textes "manquants" -> NaN, comme le lecteur openpyxl de pandas
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in EXCEL_NA_VALUES:
+        return None
+    return value
+
+
+def _to_series(values):
+    series = pd.Series(values)
+    if series.dtype == object:
+        series = series.where(series.notna(), np.nan)
+    return series
+
+
+# Caractères mal encodés -> caractères corrects (appliqués dans l'ordre)
+ENCODING_FIXES = {
+    'lâ€™': "l'",
+    'câ€™': "c'",
+    'dâ€™': "d'",
+    'sâ€™': "s'",
+    'Ã©': 'é',
+    'Ã ': 'à',
+    'Ã¨': 'è',
+    'Ã§': 'ç',
+    'Ã¹': 'ù',
+    'Ã´': 'ô',
+    'Ã¢': 'â',
+    'Ã®': 'î',
+    'Ã«': 'ë',
+    'Ã¯': 'ï',
+    'Ã¼': 'ü',
+    'proposÃ©s': 'proposés',
+    'ConformitÃ©': 'Conformité',
+    'QualitÃ©': 'Qualité',
+    'AmabilitÃ©': 'Amabilité',
+    'RÃ©activitÃ©': 'Réactivité',
+    'EfficacitÃ©': 'Efficacité',
+    'PrÃ©nom': 'Prénom',
+    'enrichi': 'enrichi',
+    'adÃ©quation': 'adéquation',
+    'rÃ©activitÃ©': 'réactivité',
+    'rÃ©glementation': 'réglementation',
+    'prÃ©vention': 'prévention',
+    'sÃ©curitÃ©': 'sécurité',
+    'matiÃ¨re': 'matière',
+    'sociÃ©tÃ©': 'société',
+    'Ã©chelle': 'échelle',
+    'interrogÃ©e': 'interrogée',
+    'disponibilitÃ©': 'disponibilité',
+    'â€™': "'",
+    'â€™': "'",
+    '?': ' ?',
+}
+
+
+@lru_cache(maxsize=4096)
+def _fix_header(name):
+    for wrong, correct in ENCODING_FIXES.items():
+        name = name.replace(wrong, correct)
+    return name
+
+
+def fix_column_encoding(columns):
+    """Corrige les problèmes d'encodage dans les noms de colonnes (mis en cache par nom)"""
+    return [_fix_header(str(col)) for col in columns]
+
+
+def role_scores(columns):
+    """Nombre d'indicateurs interview / performance présents dans les noms de colonnes"""
+    return {
+        'interview': sum(1 for indicator in INTERVIEW_INDICATORS if any(indicator in str(col) for col in columns)),
+        'performance': sum(1 for indicator in PERFORMANCE_INDICATORS if any(indicator in str(col) for col in columns)),
+    }
+
+
+def read_header(file):
+    """Noms des colonnes de la première feuille, sans lire les données"""
+    _rewind(file)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    finally:
+        workbook.close()
+    return _header_names(header)
+
+
+def read_excel_columns(file, columns=None):
+    """
+    Lit la première feuille en flux, en ne conservant que `columns` (toutes si None).
+    Les lignes vides en fin de feuille sont ignorées, comme avec pd.read_excel.
+    """
+    _rewind(file)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = _header_names(next(rows, ()))
+        wanted = set(header) if columns is None else set(columns)
+        selected = [(position, name) for position, name in enumerate(header) if name in wanted]
+        data = [[] for _ in selected]
+        row_count = 0
+        for row_number, row in enumerate(rows, start=1):
+            if row.count(None) != len(row):
+                row_count = row_number
+            width = len(row)
+            for values, (position, _) in zip(data, selected):
+                values.append(_convert_cell(row[position]) if position < width else None)
+    finally:
+        workbook.close()
+    for values in data:
+        del values[row_count:]
+
+    logger.info(f'Lecture Excel: {len(selected)}/{len(header)} colonnes, {row_count} lignes')
+    return pd.DataFrame({name: _to_series(values) for values, (_, name) in zip(data, selected)},
+                        columns=[name for _, name in selected])
+
+
+def _head(file, size):
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            return f.read(size)
+    _rewind(file)
+    head = file.read(size)
+    _rewind(file)
+    return head
+
+
+def detect_format(file):
+    """Format d'après les premiers octets (le nom du fichier n'est plus connu dans les workers)"""
+    head = _head(file, 8)
+    if head.startswith(b'PK'):
+        return 'xlsx'
+    if head.startswith(b'PAR1'):
+        return 'parquet'
+    if head.startswith(b'\xd0\xcf\x11\xe0'):
+        raise ValueError('Format .xls non pris en charge : enregistrer le classeur en .xlsx')
+    return 'csv'
+
+
+def _csv_options(file):
+    """Séparateur et décimale détectés sur l'en-tête : ';' et ',' (export français) ou ',' et '.'"""
+    first_line = _head(file, 65536).split(b'\n', 1)[0].decode('utf-8', errors='replace')
+    sep = ';' if first_line.count(';') > first_line.count(',') else ','
+    return {'sep': sep, 'decimal': ',' if sep == ';' else '.'}
+
+
+def _read_csv(file, **kwargs):
+    """
+    CSV français (séparateur ';', décimale ',') ou international (',' et '.'), détecté sur l'en-tête ;
+    UTF-8 (avec ou sans BOM), sinon Windows-1252 (exports Excel)
+    """
+    options = _csv_options(file)
+    for encoding in ('utf-8-sig', 'cp1252'):
+        _rewind(file)
+        try:
+            return pd.read_csv(file, encoding=encoding, **options, **kwargs)
+        except UnicodeDecodeError:
+            logger.info(f'CSV non décodable en {encoding}')
+    raise ValueError('Encodage du CSV non reconnu')
+
+
+def _csv_encoding(file):
+    """
+    Encodage vérifié sur tout le fichier avant une lecture par morceaux
+    (une erreur de décodage en cours de flux ne peut plus être rattrapée)
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    handle = open(file, 'rb') if isinstance(file, (str, os.PathLike)) else file
+    try:
+        _rewind(handle)
+        for block in iter(lambda: handle.read(_CSV_CHECK_BLOCK), b''):
+            decoder.decode(block)
+        decoder.decode(b'', final=True)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'cp1252'
+    finally:
+        if handle is not file:
+            handle.close()
+        _rewind(file)
+
+
+def _parquet_source(file):
+    """Chemin ou flux binaire repositionnable, lu par pyarrow sans copie en mémoire"""
+    _rewind(file)
+    return file
+
+
+def read_table_header(file):
+    """Noms des colonnes d'un fichier d'entrée, quel que soit son format"""
+    file_format = detect_format(file)
+    if file_format == 'xlsx':
+        return read_header(file)
+    if file_format == 'parquet':
+        names = pq.read_schema(_parquet_source(file)).names
+        return [name for name in names if not name.startswith('__index_level_')]
+    return list(_read_csv(file, nrows=0).columns)
+
+
+def read_table_columns(file, columns=None):
+    """
+    Données d'un fichier d'entrée limitées à `columns` (toutes si None), dans l'ordre du fichier.
+    Parquet et CSV gardent leurs types (SIRET en texte, entiers, dates) au lieu de passer par Excel.
+    """
+    file_format = detect_format(file)
+    if file_format == 'xlsx':
+        return read_excel_columns(file, columns=columns)
+    if file_format == 'parquet':
+        if columns is not None:
+            wanted = set(columns)
+            columns = [name for name in read_table_header(file) if name in wanted]
+        df = pd.read_parquet(_parquet_source(file), columns=columns).reset_index(drop=True)
+        # Valeurs manquantes des colonnes texte : NaN comme pour les autres formats (et non None)
+        return df.apply(lambda series: _to_series(series) if series.dtype == object else series)
+    header = read_table_header(file)
+    if columns is not None:
+        wanted = set(columns)
+        columns = [name for name in header if name in wanted]
+    text_columns = {name: str for name in CSV_TEXT_COLUMNS if name in header}
+    df = _read_csv(file, usecols=columns, dtype=text_columns)
+    logger.info(f'Lecture CSV: {df.shape[1]}/{len(header)} colonnes, {len(df)} lignes')
+    return df
+
+
+def _iter_excel_chunks(file, columns, chunk_rows):
+    """read_excel_columns par morceaux ; les lignes vides ne sont émises que si une ligne non vide suit"""
+    _rewind(file)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = _header_names(next(rows, ()))
+        wanted = set(header) if columns is None else set(columns)
+        selected = [(position, name) for position, name in enumerate(header) if name in wanted]
+        names = [name for _, name in selected]
+
+        def to_frame(buffer):
+            data = [[] for _ in selected]
+            for row in buffer:
+                width = len(row)
+                for values, (position, _) in zip(data, selected):
+                    values.append(_convert_cell(row[position]) if position < width else None)
+            return pd.DataFrame({name: _to_series(values) for values, name in zip(data, names)}, columns=names)
+
+        buffer, blank_rows = [], []
+        for row in rows:
+            if row.count(None) == len(row):
+                blank_rows.append(row)
+                continue
+            buffer.extend(blank_rows)
+            blank_rows = []
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                yield to_frame(buffer)
+                buffer = []
+        if buffer:
+            yield to_frame(buffer)
+    finally:
+        workbook.close()
+
+
+def iter_table_chunks(file, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Lecture en flux d'un fichier d'entrée, par DataFrames d'environ `chunk_rows` lignes :
+    mêmes colonnes et conversions que read_table_columns, sans jamais tout matérialiser
+    """
+    file = _stream(file)
+    file_format = detect_format(file)
+    if file_format == 'xlsx':
+        yield from _iter_excel_chunks(file, columns, chunk_rows)
+        return
+    if columns is not None:
+        wanted = set(columns)
+        columns = [name for name in read_table_header(file) if name in wanted]
+    if file_format == 'parquet':
+        parquet_file = pq.ParquetFile(_parquet_source(file))
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            df = batch.to_pandas()
+            yield df.apply(lambda series: _to_series(series) if series.dtype == object else series)
+        return
+    header = read_table_header(file)
+    text_columns = {name: str for name in CSV_TEXT_COLUMNS if name in header}
+    encoding = _csv_encoding(file)
+    reader = pd.read_csv(file, encoding=encoding, usecols=columns, dtype=text_columns,
+                         chunksize=chunk_rows, **_csv_options(file))
+    with reader:
+        yield from reader
+
+
+def load_header(file):
+    """read_table_header, servi par le cache des classeurs quand ce contenu a déjà été vu"""
+    cache = get_workbook_cache()
+    if cache is None or detect_format(file) == 'parquet':
+        return read_table_header(file)
+    file_hash = content_hash(file)
+    header = cache.get_header(file_hash)
+    if header is None:
+        header = read_table_header(file)
+        cache.put_header(file_hash, header)
+    return header
+
+
+def load_table(file, columns=None):
+    """
+    read_table_columns, servi par le cache des classeurs : un même contenu n'est parsé
+    qu'une fois, quel que soit l'endpoint (traitement ou aperçus).
+    Le Parquet est déjà un format de cache : il est relu directement.
+    """
+    file = _stream(file)
+    cache = get_workbook_cache()
+    if cache is None or detect_format(file) == 'parquet':
+        return read_table_columns(file, columns=columns)
+    file_hash = content_hash(file)
+    df = cache.get_frame(file_hash, columns=columns)
+    if df is not None:
+        logger.info(f'Cache classeurs: {file_hash[:12]} relu depuis le cache ({df.shape[1]} colonnes, {len(df)} lignes)')
+        return df
+    df = read_table_columns(file, columns=columns)
+    cache.put_frame(file_hash, df, columns=columns)
+    return df
+
+
+def apply_dtypes(df, dtypes):
+    """
+    Conversion sûre vers les types cibles : une colonne n'est convertie que si aucune
+    valeur renseignée n'est perdue (sinon elle est conservée telle quelle)
+    """
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        converted = pd.to_numeric(df[column], errors='coerce')
+        if converted.isna().sum() != df[column].isna().sum():
+            logger.warning(f"Colonne '{column}' conservée en {df[column].dtype} (valeurs non numériques)")
+            continue
+        try:
+            df[column] = converted.astype(dtype)
+        except (TypeError, ValueError):
+            logger.warning(f"Colonne '{column}' non convertible en {dtype}")
+    return df
+
+
+# --- Schéma mémoire : types compacts pendant le traitement, types d'origine à l'export ---
+
+# Part maximale de valeurs distinctes pour passer une colonne texte en catégorie
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+FLOAT32_DECIMALS = 2
+
+
+def _compact(series, dtype, float_decimals):
+    """Série convertie vers le type compact, ou None si la conversion perdrait de l'information"""
+    if dtype == 'category':
+        if series.dtype != object or series.nunique() > CATEGORY_MAX_UNIQUE_RATIO * max(1, len(series)):
+            return None
+        return series.astype('category')
+    converted = pd.to_numeric(series, errors='coerce')
+    if converted.isna().sum() != series.isna().sum():
+        return None
+    values = converted.dropna().astype('float64')
+    if dtype == 'float32':
+        # Uniquement si chaque valeur se relit à l'identique une fois arrondie (ex: montants au centime)
+        restored = values.astype('float32').astype('float64').round(float_decimals)
+        return converted.astype('float32') if restored.equals(values) else None
+    info = np.iinfo(dtype.lower())
+    if not ((values == values.round()) & values.between(info.min, info.max)).all():
+        return None
+    return converted.astype(dtype)
+
+
+def apply_schema(df, schema, storage_dtypes=None, float_decimals=FLOAT32_DECIMALS):
+    """
+    Types compacts (catégories, petits entiers nullables, float32) pour les colonnes du schéma,
+    quand la conversion est sans perte. Le type d'origine des colonnes numériques est noté dans
+    `storage_dtypes` (pour restore_schema). Retourne (DataFrame, octets avant / après par colonne).
+    """
+    report = {}
+    for column, dtype in schema.items():
+        if column not in df.columns or isinstance(df[column], pd.DataFrame) or str(df[column].dtype) == dtype:
+            continue
+        compact = _compact(df[column], dtype, float_decimals)
+        if compact is None:
+            continue
+        before = int(df[column].memory_usage(deep=True, index=False))
+        if storage_dtypes is not None and dtype != 'category':
+            original = str(df[column].dtype)
+            previous = storage_dtypes.get(column, original)
+            # Morceaux lus en flux : une colonne entière dans un morceau et décimale dans un autre reste décimale
+            storage_dtypes[column] = original if previous == original else 'float64'
+        df[column] = compact
+        report[column] = {'dtype': dtype, 'before': before, 'after': int(compact.memory_usage(deep=True, index=False))}
+    return df, report
+
+
+def restore_schema(df, schema, storage_dtypes, float_decimals=FLOAT32_DECIMALS):
+    """Types d'origine des colonnes numériques compactées (mêmes valeurs qu'à la lecture)"""
+    for column, dtype in schema.items():
+        if dtype == 'category' or column not in storage_dtypes or column not in df.columns:
+            continue
+        if isinstance(df[column], pd.DataFrame) or str(df[column].dtype) != dtype:
+            continue
+        series = df[column]
+        if dtype == 'float32':
+            series = series.astype('float64').round(float_decimals)
+        storage = storage_dtypes[column]
+        if storage == 'int64' and series.isna().any():
+            storage = 'float64'
+        df[column] = series.astype(storage)
+    return df
+
+
+def memory_report(report):
+    """Totaux d'un rapport apply_schema (Mo)"""
+    before = sum(entry['before'] for entry in report.values())
+    after = sum(entry['after'] for entry in report.values())
+    return {
+        'columns': len(report),
+        'before_mb': round(before / 1024 ** 2, 2),
+        'after_mb': round(after / 1024 ** 2, 2),
+        'saved_mb': round((before - after) / 1024 ** 2, 2),
+    }
+
+
+# --- Lecture parallèle : un processus par classeur ---
+
+@contextmanager
+def _worker_sources(files):
+    """
+    Sources transmissibles aux workers : chemins tels quels ; les objets fichier (FileStorage)
+    sont recopiés par blocs dans des fichiers temporaires (jamais lus entièrement en mémoire),
+    supprimés à la sortie
+    """
+    sources, temporary = [], []
+    try:
+        for file in files:
+            if isinstance(file, (str, os.PathLike)):
+                sources.append(file)
+                continue
+            # Extension d'après le contenu : openpyxl refuse un chemin sans extension .xlsx
+            fd, path = tempfile.mkstemp(prefix='upload-', suffix=f'.{detect_format(file)}')
+            temporary.append(path)
+            _rewind(file)
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(file, f, _CSV_CHECK_BLOCK)
+            _rewind(file)
+            sources.append(path)
+        yield sources
+    finally:
+        for path in temporary:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _to_ipc(df):
+    """DataFrame -> flux Arrow IPC (bien moins coûteux que le pickle de colonnes objet)"""
+    table = frame_to_table(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _from_ipc(buffer):
+    return table_to_frame(pa.ipc.open_stream(buffer).read_all())
+
+
+def _source_size(file):
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.getsize(file)
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    _rewind(file)
+    return size
+
+
+def _parse_header(file, performance_cols, stream_min_bytes=None):
+    """
+    En-tête, correction d'encodage et détection du rôle. Un fichier reconnu comme performance
+    (et seulement performance) n'est lu que sur les colonnes de performance_cols ; au-delà de
+    stream_min_bytes, ses données ne sont pas lues ici (streamed) mais en flux par iter_table_chunks.
+    """
+    raw_cols = load_header(file)
+    cols = fix_column_encoding(raw_cols)
+    scores = role_scores(cols)
+    projected = scores['performance'] >= ROLE_MIN_INDICATORS and scores['interview'] < ROLE_MIN_INDICATORS
+    columns = [raw for raw, fixed in zip(raw_cols, cols) if fixed in performance_cols] if projected else None
+    streamed = projected and stream_min_bytes is not None and _source_size(file) >= stream_min_bytes
+    return {'raw_cols': raw_cols, 'cols': cols, 'scores': scores, 'projected': projected,
+            'columns': columns, 'streamed': streamed}
+
+
+def _parse_workbook(file, performance_cols, stream_min_bytes=None):
+    """_parse_header puis lecture des données (df=None si laissées à la lecture en flux)"""
+    parsed = _parse_header(file, performance_cols, stream_min_bytes)
+    streamed = parsed.pop('streamed')
+    df = None
+    if not streamed:
+        df = load_table(file, columns=parsed['columns'])
+        df.columns = fix_column_encoding(df.columns)
+    parsed['df'] = df
+    return parsed
+
+
+def _read_served_by_cache(file, columns=None):
+    """Lecture sans parsing : Parquet (relu directement) ou contenu déjà dans le cache des classeurs"""
+    if detect_format(file) == 'parquet':
+        return True
+    cache = get_workbook_cache()
+    return cache is not None and cache.has_frame(content_hash(file), columns=columns)
+
+
+def _parse_served_by_cache(file, performance_cols, stream_min_bytes=None):
+    """Analyse sans parsing : en-tête et, sauf lecture en flux, données déjà en cache (ou Parquet)"""
+    if detect_format(file) == 'parquet':
+        return True
+    cache = get_workbook_cache()
+    if cache is None or not cache.has_header(content_hash(file)):
+        return False
+    parsed = _parse_header(file, performance_cols, stream_min_bytes)
+    return parsed['streamed'] or _read_served_by_cache(file, parsed['columns'])
+
+
+def _parse_task(source, performance_cols, stream_min_bytes):
+    parsed = _parse_workbook(source, performance_cols, stream_min_bytes)
+    if parsed['df'] is not None:
+        parsed['df'] = _to_ipc(parsed['df'])
+    return parsed
+
+
+def _read_task(source, columns):
+    return _to_ipc(load_table(source, columns=columns))
+
+
+def _pool_size():
+    """Processus de lecture, bornés par les cœurs disponibles (INGESTION_WORKERS=1 pour lire en série)"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    return min(cpus, int(os.getenv('INGESTION_WORKERS', '2')))
+
+
+# Pool de lecture partagé entre traitements, créé à la première lecture parallèle
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """
+    Pool réutilisé d'un traitement à l'autre (recréé si le nombre de workers change).
+    Workers lancés par spawn : aucun état du serveur (threads, modèle chargé) n'est hérité
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    """Arrête les workers du pool de lecture (appelé à la sortie du processus)"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_workers = None, None
+
+
+atexit.register(shutdown_pool)
+
+
+def _run_parallel(task, files, arguments):
+    """
+    task(source, *arguments) pour chaque fichier, un fichier par worker du pool partagé
+    (sources transmises en chemins) ; None si la lecture doit se faire en série
+    """
+    workers = _pool_size()
+    if min(len(files), workers) <= 1:
+        return None
+    with _worker_sources(files) as sources:
+        try:
+            return list(_get_pool(workers).map(task, sources, *zip(*arguments)))
+        except BrokenProcessPool as e:
+            # Worker arrêté brutalement (mémoire...) : pool recréé au prochain appel
+            logger.warning(f'Pool de lecture interrompu ({e}): lecture des classeurs en série')
+            shutdown_pool()
+            return None
+
+
+def parse_workbooks(files, performance_cols, stream_min_bytes=None):
+    """
+    Analyse les fichiers d'entrée (xlsx, csv, parquet) en parallèle (un processus par fichier),
+    en série s'ils sont tous déjà servis par le cache des classeurs.
+    Retourne, dans l'ordre de `files`, un dict par fichier : raw_cols, cols (encodage corrigé),
+    scores de rôle, projected (lecture limitée aux colonnes performance), columns (colonnes lues),
+    df (None si laissé à la lecture en flux) et file (le fichier d'origine, relu par iter_table_chunks).
+    """
+    files = [_stream(file) for file in files]
+    arguments = [(performance_cols, stream_min_bytes)] * len(files)
+    results = None
+    # Fichiers déjà servis par le cache (ou Parquet) : aucun processus de lecture à lancer
+    if not all(_parse_served_by_cache(file, *argument) for file, argument in zip(files, arguments)):
+        results = _run_parallel(_parse_task, files, arguments)
+    if results is None:
+        results = [_parse_workbook(file, *argument) for file, argument in zip(files, arguments)]
+    else:
+        for parsed in results:
+            if parsed['df'] is not None:
+                parsed['df'] = _from_ipc(parsed['df'])
+    for parsed, file in zip(results, files):
+        _rewind(file)
+        parsed['file'] = file
+    return results
+
+
+def load_tables(requests):
+    """load_table en parallèle sur plusieurs (fichier, colonnes) ; DataFrames dans l'ordre"""
+    requests = [(_stream(file), columns) for file, columns in requests]
+    files = [file for file, _ in requests]
+    results = None
+    if not all(_read_served_by_cache(file, columns) for file, columns in requests):
+        results = _run_parallel(_read_task, files, [(columns,) for _, columns in requests])
+    if results is None:
+        return [load_table(file, columns=columns) for file, columns in requests]
+    return [_from_ipc(buffer) for buffer in results]
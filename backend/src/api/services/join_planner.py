@@ -0,0 +1,116 @@
+"""
+Contrôle des jointures du pipeline
+Avant chaque fusion ou table de correspondance : unicité de la clé côté droit au regard
+de la cardinalité attendue, refus ou dédoublonnage en cas de démultiplication des lignes,
+et relevé des lignes en entrée / sortie.
+"""
+
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger('join_planner')
+
+# Politique en cas de clé dupliquée côté droit : 'dedupe' (une ligne par clé) ou 'raise'
+DEFAULT_ON_FANOUT = 'dedupe'
+
+CARDINALITIES = ('one_to_one', 'many_to_one', 'one_to_many', 'many_to_many')
+
+
+class JoinCardinalityError(ValueError):
+    """Jointure refusée : les lignes seraient démultipliées au-delà de la cardinalité attendue"""
+
+
+def key_profile(df, keys):
+    """Lignes, clés distinctes et lignes en double pour une ou plusieurs colonnes clés"""
+    duplicated = df.duplicated(subset=keys, keep='first')
+    return {
+        'rows': len(df),
+        'keys': int(len(df) - duplicated.sum()),
+        'duplicates': int(duplicated.sum()),
+    }
+
+
+class JoinPlanner:
+    """
+    Contrôle et relevé des jointures d'un traitement. `on_fanout` s'applique quand le côté droit
+    a des clés en double alors que chaque ligne gauche doit recevoir au plus une correspondance
+    ('dedupe' garde la ligne `keep`, 'raise' refuse la jointure).
+    """
+
+    def __init__(self, on_fanout: str = None):
+        self.on_fanout = on_fanout or os.getenv('JOIN_ON_FANOUT', DEFAULT_ON_FANOUT)
+        if self.on_fanout not in ('dedupe', 'raise'):
+            raise ValueError(f"JOIN_ON_FANOUT invalide: {self.on_fanout} (attendu: 'dedupe' ou 'raise')")
+        self.reports = []
+
+    def unique_right(self, label, right, keys, keep='last'):
+        """Côté droit avec au plus une ligne par clé (cardinalité many_to_one), selon la politique"""
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        profile = key_profile(right, keys)
+        if profile['duplicates']:
+            message = (f"{label}: {profile['duplicates']} lignes en double sur {keys} "
+                       f"({profile['rows']} lignes, {profile['keys']} clés)")
+            if self.on_fanout == 'raise':
+                raise JoinCardinalityError(message)
+            logger.warning(f'{message} : dédoublonnage (keep={keep})')
+            right = right.drop_duplicates(subset=keys, keep=keep)
+        return right, profile
+
+    def record(self, label, cardinality, left_rows, right_profile, rows_out, dropped_right=0):
+        """Relevé d'une jointure ; une jointure gauche many_to_one ne doit pas ajouter de lignes"""
+        if cardinality not in CARDINALITIES:
+            raise ValueError(f'Cardinalité inconnue: {cardinality}')
+        if cardinality in ('one_to_one', 'many_to_one') and rows_out > left_rows:
+            raise JoinCardinalityError(f'{label}: {left_rows} lignes en entrée, {rows_out} en sortie')
+        report = {
+            'join': label,
+            'cardinality': cardinality,
+            'left_rows': left_rows,
+            'right_rows': right_profile['rows'],
+            'right_keys': right_profile['keys'],
+            'right_duplicates_dropped': dropped_right,
+            'rows_out': rows_out,
+        }
+        self.reports.append(report)
+        logger.info(f"{label}: {left_rows} -> {rows_out} lignes (droite: {right_profile['rows']} lignes, "
+                    f"{right_profile['keys']} clés)")
+        return report
+
+    def merge(self, label, left, right, on, how='left', keep='last', **kwargs):
+        """pd.merge many_to_one contrôlé : clés droites dédoublonnées ou jointure refusée"""
+        right, profile = self.unique_right(label, right, on, keep=keep)
+        merged = pd.merge(left, right, on=on, how=how, validate='many_to_one', **kwargs)
+        self.record(label, 'many_to_one', len(left), profile, len(merged),
+                    dropped_right=profile['rows'] - len(right))
+        return merged
+
+    def lookup(self, label, keys, table, key, value, keep='last'):
+        """
+        keys.map(table[key] -> table[value]) ; une clé en double garde la ligne `keep`
+        (keep='last' : comme set_index(key)[value].to_dict()). Les clés dont les valeurs
+        divergent sont signalées.
+        """
+        pairs = table[[key, value]]
+        profile = key_profile(pairs, key)
+        if profile['duplicates']:
+            conflicts = int((pairs.dropna(subset=[key]).groupby(key, sort=False)[value].nunique(dropna=False) > 1).sum())
+            if conflicts and self.on_fanout == 'raise':
+                raise JoinCardinalityError(f'{label}: {conflicts} clés avec plusieurs valeurs de {value}')
+            if conflicts:
+                logger.warning(f'{label}: {conflicts} clés avec plusieurs valeurs de {value} (keep={keep})')
+            pairs = pairs.drop_duplicates(subset=key, keep=keep)
+        mapped = keys.map(pd.Series(pairs[value].to_numpy(), index=pairs[key].to_numpy()))
+        self.record(label, 'many_to_one', len(keys), profile, len(mapped),
+                    dropped_right=profile['rows'] - len(pairs))
+        return mapped
+
+    def lookup_mapping(self, label, keys, mapping):
+        """keys.map(mapping) pour une table déjà construite (ex: en flux, une valeur par clé)"""
+        mapped = keys.map(mapping)
+        self.record(label, 'many_to_one', len(keys), {'rows': len(mapping), 'keys': len(mapping)}, len(mapped))
+        return mapped
+
+    def summary(self):
+        return list(self.reports)
@@ -0,0 +1,205 @@
+"""
+Mode par partitions pour les très gros fichiers performance
+Le fichier est lu en flux, réparti par hachage de la clé de jointure dans des partitions
+écrites sur disque, puis chaque partition est jointe à l'interview (petit fichier, en mémoire) ;
+les résultats sont eux aussi écrits sur disque. Seules la répartition et la jointure sont bornées
+par le budget (CHUNKED_MEMORY_BUDGET_MB) : le résultat filtré (les lignes de df_main) est ensuite
+réassemblé en mémoire par join(), et sa taille suit celle du fichier. Le fichier d'entrée n'est
+jamais chargé entier : un envoi (FileStorage) est recopié par blocs dans un fichier temporaire.
+"""
+
+import glob
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.api.services.workbook_cache import frame_to_table, table_to_frame
+
+logger = logging.getLogger('partitioned_join')
+
+# Budget des tampons de répartition et d'une partition jointe (pas du résultat réassemblé)
+DEFAULT_MEMORY_BUDGET_MB = 512
+DEFAULT_PARTITIONS = 32
+# Taille de fichier performance au-delà de laquelle le mode 'auto' passe par partitions
+# (sous MAX_CONTENT_LENGTH de la configuration de développement, 50 Mo, pour qu'un envoi puisse l'atteindre)
+DEFAULT_THRESHOLD_MB = 20
+DEFAULT_SPILL_DIR = os.path.join('data', 'cache', 'spill')
+
+# Numéro de ligne d'origine : l'ordre de la jointure en mémoire est restitué à la fin
+ROW_COLUMN = '__row'
+
+
+def chunked_threshold_bytes():
+    """
+    Taille minimale (octets) d'un fichier performance traité par partitions,
+    None si le mode est désactivé (CHUNKED_MODE=0), 0 s'il est forcé (CHUNKED_MODE=1)
+    """
+    mode = os.getenv('CHUNKED_MODE', 'auto')
+    if mode == '0':
+        return None
+    if mode == '1':
+        return 0
+    return int(float(os.getenv('CHUNKED_THRESHOLD_MB', DEFAULT_THRESHOLD_MB)) * 1024 ** 2)
+
+
+def _partition_ids(keys: pd.Series, partitions: int) -> np.ndarray:
+    return (pd.util.hash_pandas_object(keys, index=False).to_numpy() % partitions).astype(np.int64)
+
+
+def _write_frame(df: pd.DataFrame, path: str) -> str:
+    """Parquet direct quand Arrow sait typer toutes les colonnes, sinon encodage du cache des classeurs"""
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, ValueError):
+        table = frame_to_table(df)
+        path = path.replace('.parquet', '.enc.parquet')
+    pq.write_table(table, path)
+    return path
+
+
+def _read_frame(path: str) -> pd.DataFrame:
+    if path.endswith('.enc.parquet'):
+        return table_to_frame(pq.read_table(path))
+    table = pq.read_table(path)
+    df = table.to_pandas()
+    # Valeurs manquantes des colonnes texte : NaN comme à la lecture des fichiers (et non None)
+    for position, column in enumerate(table.columns):
+        if column.null_count and df.dtypes.iloc[position] == object:
+            series = df.iloc[:, position]
+            df.isetitem(position, series.where(series.notna(), np.nan))
+    return df
+
+
+class PartitionedJoin:
+    """
+    Jointure gauche par partitions de hachage, avec débordement sur disque.
+    spill() reçoit les morceaux du grand côté (gauche) dans l'ordre du fichier ;
+    join() joint chaque partition au petit côté (droite) et renvoie le résultat réassemblé
+    en mémoire (seules les partitions sont bornées par memory_budget).
+    """
+
+    def __init__(self, key: str, partitions: int = None, memory_budget_mb: int = None, directory: str = None):
+        self.key = key
+        self.partitions = partitions or int(os.getenv('CHUNKED_PARTITIONS', DEFAULT_PARTITIONS))
+        budget_mb = memory_budget_mb or int(os.getenv('CHUNKED_MEMORY_BUDGET_MB', DEFAULT_MEMORY_BUDGET_MB))
+        self.memory_budget = budget_mb * 1024 ** 2
+        base_directory = directory or os.getenv('CHUNKED_SPILL_DIR', DEFAULT_SPILL_DIR)
+        os.makedirs(base_directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix='join-', dir=base_directory)
+        self.rows = 0
+        self._template = None
+        self._row_bytes = None
+        self._buffers = {}
+        self._buffered_bytes = 0
+        self._flushes = 0
+        self.stats = {
+            'partitions': self.partitions,
+            'memory_budget_mb': budget_mb,
+            'left_rows': 0,
+            'spilled_files': 0,
+            'merged_rows': 0,
+            'result_rows': 0,
+            'max_partition_mb': 0.0,
+        }
+
+    # --- Côté gauche : répartition et débordement sur disque ---
+
+    def spill(self, chunk: pd.DataFrame):
+        """Répartit un morceau par hachage de la clé ; les tampons sont vidés sur disque au quart du budget"""
+        chunk = chunk.reset_index(drop=True)
+        if self._template is None:
+            self._template = chunk.iloc[:0]
+            # Taille mémoire par ligne mesurée une fois (le calcul exact parcourt toutes les chaînes)
+            self._row_bytes = chunk.memory_usage(deep=True).sum() / max(1, len(chunk))
+        chunk[ROW_COLUMN] = np.arange(self.rows, self.rows + len(chunk), dtype=np.int64)
+        self.rows += len(chunk)
+        ids = _partition_ids(chunk[self.key], self.partitions)
+        # Un tri stable puis des tranches : l'ordre du fichier est conservé dans chaque partition
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        chunk = chunk.take(order)
+        bounds = np.searchsorted(sorted_ids, np.arange(self.partitions + 1))
+        for partition in range(self.partitions):
+            start, stop = bounds[partition], bounds[partition + 1]
+            if stop > start:
+                self._buffers.setdefault(partition, []).append(chunk.iloc[start:stop])
+        self._buffered_bytes += int(self._row_bytes * len(chunk))
+        if self._buffered_bytes >= self.memory_budget // 4:
+            self.flush()
+
+    def flush(self):
+        for partition, frames in self._buffers.items():
+            path = os.path.join(self.directory, f'left-{partition:04d}-{self._flushes:06d}.parquet')
+            _write_frame(pd.concat(frames, ignore_index=True), path)
+            self.stats['spilled_files'] += 1
+        self._buffers = {}
+        self._buffered_bytes = 0
+        self._flushes += 1
+
+    def _read_left(self, partition: int):
+        paths = sorted(glob.glob(os.path.join(self.directory, f'left-{partition:04d}-*.parquet')))
+        if not paths:
+            return None
+        return pd.concat([_read_frame(path) for path in paths], ignore_index=True)
+
+    # --- Jointure partition par partition ---
+
+    def join(self, right: pd.DataFrame, suffixes=('', '_interview'), row_filter=None, joiner=None):
+        """
+        Jointure gauche de chaque partition avec les lignes de `right` de même hachage,
+        puis `row_filter` (ex: filtre de campagne) avant écriture du résultat sur disque.
+        `joiner(left, right)` remplace la jointure gauche ; il retourne (lignes jointes,
+        colonnes ayant au moins une valeur dans la jointure gauche complète).
+        Retourne (résultat dans l'ordre de la jointure en mémoire, colonnes ayant au moins
+        une valeur avant filtrage).
+        """
+        self.flush()
+        self.stats['left_rows'] = self.rows
+        right_ids = _partition_ids(right[self.key], self.partitions)
+        merged_row_bytes = (self._row_bytes or 0) + right.memory_usage(deep=True).sum() / max(1, len(right))
+        has_values = None
+        result_paths = []
+        for partition in range(self.partitions):
+            left = self._read_left(partition)
+            if left is None:
+                continue
+            if joiner is None:
+                merged = pd.merge(left, right[right_ids == partition], on=self.key, how='left', suffixes=suffixes)
+                partition_has_values = merged.notna().any()
+            else:
+                merged, partition_has_values = joiner(left, right[right_ids == partition])
+            del left
+            partition_bytes = int(merged_row_bytes * len(merged))
+            self.stats['max_partition_mb'] = max(self.stats['max_partition_mb'], round(partition_bytes / 1024 ** 2, 1))
+            if partition_bytes > self.memory_budget:
+                logger.warning(f'Partition {partition}: {partition_bytes / 1024 ** 2:.1f} Mo, au-delà du budget '
+                               f'({self.memory_budget / 1024 ** 2:.0f} Mo) : augmenter CHUNKED_PARTITIONS')
+            self.stats['merged_rows'] += len(merged)
+            has_values = partition_has_values if has_values is None else (has_values | partition_has_values)
+            if row_filter is not None:
+                merged = row_filter(merged)
+            path = os.path.join(self.directory, f'result-{partition:04d}.parquet')
+            result_paths.append(_write_frame(merged, path))
+            del merged
+
+        if not result_paths:
+            if self._template is None:
+                raise ValueError('Fichier performance sans aucune ligne de données')
+            # Fichier sans aucune ligne : résultat vide avec les colonnes de la jointure
+            empty = pd.merge(self._template.assign(**{ROW_COLUMN: pd.Series(dtype=np.int64)}),
+                             right.iloc[:0], on=self.key, how='left', suffixes=suffixes)
+            return empty.drop(columns=[ROW_COLUMN]), empty.notna().any().drop(ROW_COLUMN)
+        result = pd.concat([_read_frame(path) for path in result_paths], ignore_index=True)
+        # Ordre de la jointure en mémoire : lignes gauche dans l'ordre du fichier, correspondances dans l'ordre de droite
+        result = result.sort_values(ROW_COLUMN, kind='stable').drop(columns=[ROW_COLUMN]).reset_index(drop=True)
+        self.stats['result_rows'] = len(result)
+        return result, has_values.drop(ROW_COLUMN)
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,254 @@
+"""
+Traitement en étapes déclarées, avec cache disque des résultats de chaque étape
+Chaque étape déclare ses entrées et ses sorties (des noms d'artefacts). Sa clé de cache
+combine les empreintes de ses entrées (contenu des fichiers pour les sources, clé de l'étape
+productrice sinon), sa configuration, son code et celui des modules qu'elle appelle. Les sorties demandées sont résolues à
+rebours : une étape dont le résultat est en cache n'est pas exécutée, et les étapes en amont
+ne le sont que si une étape à exécuter a besoin de leurs sorties.
+"""
+
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.api.services.workbook_cache import WorkbookCache, frame_to_table, table_to_frame
+
+logger = logging.getLogger('pipeline')
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'cache', 'stages')
+DEFAULT_MAX_ENTRIES = 32
+
+
+def config_fingerprint(value):
+    """Empreinte stable d'une configuration (dict, listes, constantes)"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _code_fingerprint(func):
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = repr(func.__code__.co_code)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def _module_fingerprint(module):
+    """Empreinte d'une dépendance d'étape : fichier source d'un module (nom importable) ou fonction"""
+    if callable(module):
+        return _code_fingerprint(module)
+    with open(inspect.getsourcefile(importlib.import_module(module)), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class Stage:
+    """
+    Étape du traitement : func(**entrées) -> dict {sortie: valeur}.
+    `config` : paramètres dont dépend le résultat (hors entrées) ; `modules` : code appelé par
+    func dont dépend aussi le résultat (noms de modules ou fonctions) ; `cache` : False pour une
+    étape à effets de bord ou aux sorties non sérialisables, ou fonction (sorties) -> bool.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), config=None, cache=True, modules=()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.config = config or {}
+        self.cache = cache
+        self.modules = tuple(modules)
+
+    def key(self, input_fingerprints, version):
+        return config_fingerprint({
+            'stage': self.name,
+            'version': version,
+            'code': _code_fingerprint(self.func),
+            'modules': [_module_fingerprint(module) for module in self.modules],
+            'config': config_fingerprint(self.config),
+            'inputs': [input_fingerprints[name] for name in self.inputs],
+        })[:32]
+
+    def should_cache(self, outputs):
+        return self.cache(outputs) if callable(self.cache) else bool(self.cache)
+
+
+class StageCache(WorkbookCache):
+    """
+    Résultats d'étapes sur disque : un Parquet par artefact DataFrame / Series, les autres
+    artefacts (dicts, listes, scalaires) en JSON dans le manifeste, écrit en dernier.
+    L'éviction LRU (héritée du cache des classeurs) retire tous les fichiers d'une clé.
+    """
+
+    def _manifest_path(self, key):
+        return self._path(key, 'manifest.json')
+
+    def has(self, key):
+        return os.path.exists(self._manifest_path(key))
+
+    def _manifest(self, key):
+        path = self._manifest_path(key)
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        self._touch(path)
+        return manifest
+
+    def get(self, key, name):
+        """Valeur d'un artefact en cache (KeyError si absent)"""
+        entry = self._manifest(key)['artifacts'][name]
+        if entry['kind'] == 'json':
+            self.hits += 1
+            return entry['value']
+        df = table_to_frame(pq.read_table(self._path(key, entry['file'])))
+        # Colonnes entièrement à None (colonnes à remplir plus tard) : None et non NaN
+        for position in entry.get('none_columns', []):
+            df.isetitem(position, pd.Series([None] * len(df), index=df.index, dtype=object))
+        self.hits += 1
+        if entry['kind'] == 'series':
+            return pd.Series(df['value'].to_numpy(), index=pd.Index(df['index'].to_numpy()), name=entry['name'])
+        return df
+
+    def put(self, key, outputs):
+        """Écrit les sorties d'une étape ; False si l'une d'elles n'est pas sérialisable"""
+        artifacts = {}
+        tables = {}
+        for position, (name, value) in enumerate(outputs.items()):
+            file = f'a{position}.parquet'
+            if isinstance(value, pd.DataFrame):
+                frame, entry = value, {'kind': 'frame'}
+            elif isinstance(value, pd.Series):
+                frame = pd.DataFrame({'index': value.index.to_numpy(), 'value': value.to_numpy()})
+                entry = {'kind': 'series', 'name': value.name}
+            else:
+                try:
+                    json.dumps(value, allow_nan=True)
+                except (TypeError, ValueError):
+                    logger.info(f'Artefact {name!r} non sérialisable ({type(value).__name__}) : étape non mise en cache')
+                    return False
+                artifacts[name] = {'kind': 'json', 'value': value}
+                continue
+            entry['none_columns'] = [
+                column for column in range(frame.shape[1])
+                if frame.dtypes.iloc[column] == object and len(frame) and frame.iloc[0, column] is None
+                and all(item is None for item in frame.iloc[:, column])
+            ]
+            try:
+                tables[file] = frame_to_table(frame)
+            except Exception as e:
+                logger.warning(f'Artefact {name!r} non mis en cache (conversion Arrow impossible): {e}')
+                return False
+            artifacts[name] = {**entry, 'file': file}
+        for file, table in tables.items():
+            self._write(self._path(key, file), lambda tmp, table=table: pq.write_table(table, tmp))
+
+        def write_manifest(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'artifacts': artifacts}, f, ensure_ascii=False)
+        self._write(self._manifest_path(key), write_manifest)
+        return True
+
+
+_stage_cache = None
+_stage_cache_lock = threading.Lock()
+
+
+def get_stage_cache():
+    """Cache partagé configuré par variables d'environnement (STAGE_CACHE=0 pour désactiver)"""
+    global _stage_cache
+    if os.getenv('STAGE_CACHE', '1') == '0':
+        return None
+    if _stage_cache is None:
+        with _stage_cache_lock:
+            if _stage_cache is None:
+                try:
+                    _stage_cache = StageCache(
+                        directory=os.getenv('STAGE_CACHE_DIR', DEFAULT_CACHE_DIR),
+                        max_entries=int(os.getenv('STAGE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+                    )
+                except Exception as e:
+                    logger.warning(f'Cache des étapes désactivé: {e}')
+                    return None
+    return _stage_cache
+
+
+class Pipeline:
+    """
+    Étapes déclarées dans l'ordre d'exécution. run() résout les sorties demandées :
+    lecture du cache quand la clé de l'étape productrice y est, exécution sinon.
+    Le code de l'étape et celui déclaré dans `Stage.modules` (fichiers source des modules,
+    source des fonctions utilitaires) entrent dans sa clé. `version` entre dans toutes les
+    clés : à changer quand une dépendance non déclarée (librairie, modèle) change de comportement.
+    """
+
+    def __init__(self, stages, cache=None, version=1):
+        self.stages = list(stages)
+        self.cache = cache
+        self.version = version
+        self.producers = {}
+        for stage in self.stages:
+            for name in stage.outputs:
+                if name in self.producers:
+                    raise ValueError(f"Artefact {name!r} produit par deux étapes ({self.producers[name].name}, {stage.name})")
+                self.producers[name] = stage
+        self.report = []
+        self.values = {}
+
+    def run(self, sources, targets, fingerprints=None):
+        """
+        `sources` : artefacts d'entrée {nom: valeur} ; `fingerprints` : leur empreinte
+        (ex: sha256 du contenu des fichiers), nécessaire au cache. Retourne {cible: valeur}.
+        """
+        fingerprints = dict(fingerprints or {})
+        cache = self.cache if all(fingerprints.get(name) for name in sources) else None
+        keys = {}
+        for stage in self.stages:
+            missing = [name for name in stage.inputs if name not in fingerprints and name not in sources]
+            if missing:
+                raise ValueError(f'Étape {stage.name}: entrées inconnues {missing}')
+            keys[stage.name] = stage.key(fingerprints, self.version) if cache is not None else None
+            for name in stage.outputs:
+                fingerprints[name] = f'{keys[stage.name]}/{name}'
+
+        values = self.values = dict(sources)
+        ran = set()
+        self.report = []
+
+        def resolve(name):
+            if name in values:
+                return values[name]
+            stage = self.producers[name]
+            key = keys[stage.name]
+            if cache is not None and stage.cache and stage.name not in ran and cache.has(key):
+                try:
+                    values[name] = cache.get(key, name)
+                    if not any(entry['stage'] == stage.name for entry in self.report):
+                        self.report.append({'stage': stage.name, 'status': 'cache', 'key': key, 'seconds': 0.0})
+                    return values[name]
+                except Exception as e:
+                    logger.warning(f'Étape {stage.name}: cache illisible ({e}), exécution')
+            inputs = {input_name: resolve(input_name) for input_name in stage.inputs}
+            started = time.time()
+            outputs = stage.func(**inputs)
+            if set(outputs) != set(stage.outputs):
+                raise ValueError(f'Étape {stage.name}: sorties {sorted(outputs)} au lieu de {sorted(stage.outputs)}')
+            seconds = round(time.time() - started, 3)
+            ran.add(stage.name)
+            values.update(outputs)
+            cached = False
+            if cache is not None and stage.should_cache(outputs):
+                cached = cache.put(key, outputs)
+            self.report = [entry for entry in self.report if entry['stage'] != stage.name]
+            self.report.append({'stage': stage.name, 'status': 'run', 'key': key, 'seconds': seconds, 'stored': cached})
+            return values[name]
+
+        result = {name: resolve(name) for name in targets}
+        order = [stage.name for stage in self.stages]
+        self.report.sort(key=lambda entry: order.index(entry['stage']))
+        return result
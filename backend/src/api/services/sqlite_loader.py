@@ -0,0 +1,112 @@
+"""
+Chargement en masse d'un DataFrame dans une table SQLite
+Les colonnes du DataFrame sont associées aux colonnes du modèle par une correspondance déclarée
+et converties colonne par colonne (valeurs manquantes -> NULL, types numpy -> types Python),
+puis insérées par executemany dans une seule transaction, sur une connexion dédiée dont les
+pragmas (journal, synchronisation, cache) sont ajustés le temps du chargement.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect
+
+logger = logging.getLogger('sqlite_loader')
+
+# Pragmas appliqués pendant le chargement, rétablis ensuite (cache_size < 0 : en Kio)
+DEFAULT_JOURNAL_MODE = 'WAL'
+DEFAULT_SYNCHRONOUS = 'NORMAL'
+DEFAULT_CACHE_KB = 65536
+
+
+def load_pragmas():
+    """Pragmas de chargement configurés par variables d'environnement"""
+    return {
+        'journal_mode': os.getenv('SQLITE_LOAD_JOURNAL_MODE', DEFAULT_JOURNAL_MODE),
+        'synchronous': os.getenv('SQLITE_LOAD_SYNCHRONOUS', DEFAULT_SYNCHRONOUS),
+        'cache_size': -int(os.getenv('SQLITE_LOAD_CACHE_KB', DEFAULT_CACHE_KB)),
+    }
+
+
+def apply_pragmas(connection, pragmas):
+    """Applique les pragmas ; retourne leurs valeurs précédentes (pour les rétablir)"""
+    previous = {}
+    for name, value in pragmas.items():
+        previous[name] = connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+        connection.exec_driver_sql(f'PRAGMA {name}={value}')
+    return previous
+
+
+@contextmanager
+def load_transaction(engine, pragmas=None):
+    """
+    Connexion dédiée au chargement : pragmas appliqués avant la transaction (journal_mode ne
+    peut pas changer pendant), une transaction pour toutes les écritures, pragmas rétablis ensuite.
+    `pragmas` : None pour load_pragmas(), {} pour n'en changer aucun.
+    """
+    with engine.connect() as connection:
+        previous = apply_pragmas(connection, load_pragmas() if pragmas is None else pragmas)
+        # Les pragmas sont exécutés hors transaction explicite : on la termine avant begin()
+        connection.commit()
+        try:
+            with connection.begin():
+                yield connection
+        finally:
+            apply_pragmas(connection, previous)
+            connection.commit()
+
+
+def column_values(df, column, default=None):
+    """
+    Valeurs d'une colonne prêtes pour sqlite3 : None -> `default`, NaN / NA / NaT -> NULL,
+    scalaires numpy -> types Python. Colonne absente : `default` partout ; colonne dupliquée :
+    première occurrence.
+    """
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=object)
+    series = df[column]
+    if isinstance(series, pd.DataFrame):
+        series = series.iloc[:, 0]
+    # astype(object) sur un tableau numpy produit des int / float Python
+    values = series.to_numpy(dtype=object, copy=True)
+    none = np.equal(values, None) if series.dtype == object else None
+    values[pd.isna(values)] = None
+    if none is not None and none.any():
+        values[none] = default
+    if series.dtype == object and pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+        values = np.array([value.item() if isinstance(value, np.generic) else value for value in values], dtype=object)
+    return values
+
+
+def insert_rows(connection, model, attributes, rows):
+    """executemany d'un INSERT sur les colonnes du modèle correspondant à `attributes`"""
+    columns = inspect(model).columns
+    names = ', '.join('"' + columns[attribute].name.replace('"', '""') + '"' for attribute in attributes)
+    placeholders = ', '.join('?' for _ in attributes)
+    rows = [tuple(row) for row in rows]
+    if rows:
+        connection.exec_driver_sql(f'INSERT INTO "{model.__table__.name}" ({names}) VALUES ({placeholders})', rows)
+    return len(rows)
+
+
+def insert_frame(connection, model, df, mapping):
+    """
+    Insère df dans la table du modèle. `mapping` : {attribut du modèle: (colonne de df, défaut)}.
+    Retourne {'rows', 'seconds', 'rows_per_second'}.
+    """
+    started = time.time()
+    attributes = list(mapping)
+    columns = [column_values(df, column, default) for column, default in mapping.values()]
+    rows = insert_rows(connection, model, attributes, zip(*columns))
+    seconds = time.time() - started
+    stats = {
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_second': int(rows / seconds) if seconds > 0 else rows,
+    }
+    logger.info(f"{model.__table__.name}: {rows} lignes en {stats['seconds']}s ({stats['rows_per_second']} lignes/s)")
+    return stats
@@ -0,0 +1,273 @@
+"""
+Cache disque des classeurs déjà lus
+Adressé par contenu : clé = sha256 des octets du fichier (+ colonnes lues) ;
+les DataFrames sont stockés en Parquet (pyarrow), avec éviction LRU par classeur
+"""
+
+import datetime
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger('workbook_cache')
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'cache', 'workbooks')
+DEFAULT_MAX_ENTRIES = 8
+
+_HASH_CHUNK = 1024 * 1024
+_META_KEY = b'analytics_mos'
+
+
+def content_hash(file):
+    """sha256 des octets d'un fichier (chemin ou objet fichier, relu depuis le début)"""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+                digest.update(chunk)
+    else:
+        file.seek(0)
+        for chunk in iter(lambda: file.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+        file.seek(0)
+    return digest.hexdigest()
+
+
+def columns_signature(columns):
+    """Suffixe de clé pour une lecture projetée ('all' si toutes les colonnes)"""
+    if columns is None:
+        return 'all'
+    payload = json.dumps(sorted(map(str, columns)), ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+# --- Sérialisation : colonnes objet de types mélangés (ex: notes et 'D.R.') ---
+
+def _encode_value(value):
+    """(texte, type) d'une cellule, pour les colonnes que Arrow ne sait pas typer"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None, 'n'
+    if isinstance(value, (bool, np.bool_)):
+        return str(bool(value)), 'b'
+    if isinstance(value, (int, np.integer)):
+        return str(int(value)), 'i'
+    if isinstance(value, (float, np.floating)):
+        return repr(float(value)), 'f'
+    if isinstance(value, str):
+        return value, 's'
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(), 'd'
+    if isinstance(value, datetime.date):
+        return value.isoformat(), 'D'
+    if isinstance(value, datetime.time):
+        return value.isoformat(), 't'
+    if isinstance(value, datetime.timedelta):
+        return repr(value.total_seconds()), 'T'
+    raise TypeError(f'Type de cellule non pris en charge: {type(value).__name__}')
+
+
+_DECODERS = {
+    'n': lambda text: np.nan,
+    'b': lambda text: text == 'True',
+    'i': int,
+    'f': float,
+    's': lambda text: text,
+    'd': datetime.datetime.fromisoformat,
+    'D': datetime.date.fromisoformat,
+    't': datetime.time.fromisoformat,
+    'T': lambda text: datetime.timedelta(seconds=float(text)),
+}
+
+
+def frame_to_table(df):
+    """DataFrame -> table Arrow ; noms et types d'origine conservés dans les métadonnées"""
+    arrays = {}
+    columns = []
+    for position, name in enumerate(df.columns):
+        series = df.iloc[:, position]
+        field = f'c{position}'
+        kind = 'native'
+        if series.dtype == object:
+            try:
+                pa.array(series, from_pandas=True)
+                kind = 'object'
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                encoded = [_encode_value(value) for value in series]
+                arrays[f'{field}__type'] = pa.array([tag for _, tag in encoded], type=pa.string())
+                series = pd.Series([text for text, _ in encoded], dtype=object)
+                kind = 'mixed'
+        arrays[field] = series.reset_index(drop=True)
+        columns.append({'name': name, 'kind': kind})
+    frame = pd.DataFrame({key: value for key, value in arrays.items() if not isinstance(value, pa.Array)})
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    for key, value in arrays.items():
+        if isinstance(value, pa.Array):
+            table = table.append_column(key, value)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_META_KEY] = json.dumps({'columns': columns}, ensure_ascii=False).encode('utf-8')
+    return table.replace_schema_metadata(metadata)
+
+
+def table_to_frame(table):
+    meta = json.loads(table.schema.metadata[_META_KEY].decode('utf-8'))
+    frame = table.to_pandas()
+    data = {}
+    for position, column in enumerate(meta['columns']):
+        field = f'c{position}'
+        series = frame[field]
+        if column['kind'] == 'object':
+            series = series.astype(object)
+            series = series.where(series.notna(), np.nan)
+        elif column['kind'] == 'mixed':
+            series = pd.Series([_DECODERS[tag](text) for text, tag in zip(series, frame[f'{field}__type'])],
+                               dtype=object)
+        data[position] = series
+    df = pd.DataFrame(data)
+    df.columns = [column['name'] for column in meta['columns']]
+    return df
+
+
+class WorkbookCache:
+    """
+    Cache des classeurs lus, sur disque : un fichier Parquet par (classeur, colonnes lues)
+    et un JSON d'en-tête par classeur. L'éviction LRU retire tous les fichiers d'un classeur.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, file_hash, suffix):
+        return os.path.join(self.directory, f'{file_hash}.{suffix}')
+
+    def _touch(self, path):
+        # La date de modification sert de date de dernier usage pour l'éviction LRU
+        os.utime(path)
+
+    def get_header(self, file_hash):
+        path = self._path(file_hash, 'header.json')
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            header = json.load(f)
+        self._touch(path)
+        return header
+
+    def has_header(self, file_hash):
+        return os.path.exists(self._path(file_hash, 'header.json'))
+
+    def put_header(self, file_hash, header):
+        def writer(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(header, f, ensure_ascii=False)
+        self._write(self._path(file_hash, 'header.json'), writer)
+
+    def _frame_paths(self, file_hash, columns):
+        # Une lecture projetée peut être servie par la lecture complète
+        paths = [self._path(file_hash, f'{columns_signature(columns)}.parquet')]
+        if columns is not None:
+            paths.append(self._path(file_hash, 'all.parquet'))
+        return paths
+
+    def has_frame(self, file_hash, columns=None):
+        """Une lecture de ces colonnes serait servie par le cache (sans compter de hit)"""
+        return any(os.path.exists(path) for path in self._frame_paths(file_hash, columns))
+
+    def get_frame(self, file_hash, columns=None):
+        """DataFrame en cache ; une lecture projetée peut être servie par la lecture complète"""
+        for path in self._frame_paths(file_hash, columns):
+            if not os.path.exists(path):
+                continue
+            try:
+                df = table_to_frame(pq.read_table(path))
+            except Exception as e:
+                logger.warning(f'Entrée de cache illisible {path}: {e}')
+                continue
+            self._touch(path)
+            self.hits += 1
+            if columns is not None and path.endswith('all.parquet'):
+                wanted = set(columns)
+                df = df[[name for name in df.columns if name in wanted]]
+            return df
+        self.misses += 1
+        return None
+
+    def put_frame(self, file_hash, df, columns=None):
+        path = self._path(file_hash, f'{columns_signature(columns)}.parquet')
+        try:
+            table = frame_to_table(df)
+        except Exception as e:
+            logger.warning(f'Classeur non mis en cache (conversion Arrow impossible): {e}')
+            return
+        self._write(path, lambda tmp: pq.write_table(table, tmp))
+
+    def _write(self, path, writer):
+        tmp = f'{path}.tmp{os.getpid()}.{threading.get_ident()}'
+        with self._lock:
+            writer(tmp)
+            os.replace(tmp, path)
+            self._evict()
+
+    def _evict(self):
+        """Supprime les classeurs les moins récemment utilisés au-delà de max_entries"""
+        last_used = {}
+        for path in glob.glob(os.path.join(self.directory, '*.*')):
+            file_hash = os.path.basename(path).split('.', 1)[0]
+            try:
+                last_used[file_hash] = max(last_used.get(file_hash, 0), os.path.getmtime(path))
+            except FileNotFoundError:
+                # Supprimé entre-temps par un autre processus (lectures parallèles)
+                continue
+        overflow = len(last_used) - self.max_entries
+        if overflow <= 0:
+            return
+        for file_hash in sorted(last_used, key=last_used.get)[:overflow]:
+            for path in glob.glob(os.path.join(self.directory, f'{file_hash}.*')):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        logger.info(f'Cache classeurs: {overflow} classeurs évincés (limite {self.max_entries})')
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_workbook_cache = None
+_workbook_cache_lock = threading.Lock()
+
+
+def get_workbook_cache():
+    """Cache partagé configuré par variables d'environnement (WORKBOOK_CACHE=0 pour désactiver)"""
+    global _workbook_cache
+    if os.getenv('WORKBOOK_CACHE', '1') == '0':
+        return None
+    if _workbook_cache is None:
+        with _workbook_cache_lock:
+            if _workbook_cache is None:
+                try:
+                    _workbook_cache = WorkbookCache(
+                        directory=os.getenv('WORKBOOK_CACHE_DIR', DEFAULT_CACHE_DIR),
+                        max_entries=int(os.getenv('WORKBOOK_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+                    )
+                except Exception as e:
+                    logger.warning(f'Cache classeurs désactivé: {e}')
+                    return None
+    return _workbook_cache
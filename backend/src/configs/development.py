@@ -11,4 +11,8 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     LOG_LEVEL = 'DEBUG'
     # Configuration pour les uploads de fichiers
-    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB max 
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB max 
+    # Le mode par partitions 'auto' (CHUNKED_THRESHOLD_MB, 20 Mo par défaut) doit rester sous cette limite
+    # Chargement + préchauffage du modèle de sentiment au démarrage (opt-in)
+    SENTIMENT_WARMUP = os.getenv('SENTIMENT_WARMUP', '0') == '1'
+    SENTIMENT_WARMUP_BATCH_SIZES = (1, 8, 32)
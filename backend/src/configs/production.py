@@ -9,4 +9,7 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'prod_secret_key')
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DB_PATH}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    LOG_LEVEL = 'WARNING' 
\ No newline at end of file
+    LOG_LEVEL = 'WARNING' 
+    # Chargement + préchauffage du modèle de sentiment au démarrage (opt-in)
+    SENTIMENT_WARMUP = os.getenv('SENTIMENT_WARMUP', '0') == '1'
+    SENTIMENT_WARMUP_BATCH_SIZES = (1, 8, 32)
@@ -0,0 +1,39 @@
+"""
+État de disponibilité du modèle de sentiment
+Module volontairement léger (sans torch/transformers) pour être interrogé par /ready
+"""
+
+import threading
+import time
+
+# États successifs : not_loaded -> loading -> loaded -> warming -> ready (ou error)
+_status = {'state': 'not_loaded', 'error': None, 'updated_at': None}
+_lock = threading.Lock()
+_changed = threading.Condition(_lock)
+# États pendant lesquels le modèle est en cours de chargement ou de préchauffage
+BUSY_STATES = ('loading', 'loaded', 'warming')
+
+
+def set_state(state: str, error: str = None):
+    with _lock:
+        _status['state'] = state
+        _status['error'] = error
+        _status['updated_at'] = time.time()
+        _changed.notify_all()
+
+
+def wait_until_idle(timeout: float = None) -> bool:
+    """Attend la fin du chargement / préchauffage en cours ; False si le délai expire avant"""
+    with _changed:
+        return _changed.wait_for(lambda: _status['state'] not in BUSY_STATES, timeout=timeout)
+
+
+def get_status() -> dict:
+    """Retourne l'état courant avec les indicateurs model_loaded / warming / ready"""
+    with _lock:
+        status = dict(_status)
+    state = status['state']
+    status['model_loaded'] = state in ('loaded', 'warming', 'ready')
+    status['warming'] = state == 'warming'
+    status['ready'] = state == 'ready'
+    return status
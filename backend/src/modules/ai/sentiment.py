@@ -1,3 +1,11 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 from textblob import TextBlob
 
 def analyze_sentiment(text):
@@ -18,4 +26,90 @@ def analyze_sentiment(text):
         label = 'positive'
     else:
         label = 'very_positive'
-    return label, score 
\ No newline at end of file
+    return label, score 
+
+# --- Scoring par lot ---
+
+# Au-delà de ce nombre de textes distincts à noter, répartition sur plusieurs processus
+# (en dessous, la notation dans le processus courant coûte moins que l'envoi aux workers)
+PARALLEL_MIN_TEXTS = 2000
+# Nombre de workers par défaut (TEXTBLOB_WORKERS), borné par le nombre de cœurs
+DEFAULT_MAX_WORKERS = 4
+# Mémoïsation texte -> (label, score), vidée au-delà de cette taille
+MEMO_MAX_ENTRIES = 100000
+_memo = {}
+
+
+# Pool partagé entre requêtes, créé au premier lot volumineux
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def _default_workers():
+    return int(os.getenv('TEXTBLOB_WORKERS', min(DEFAULT_MAX_WORKERS, os.cpu_count() or 1)))
+
+
+def _get_pool(workers):
+    """
+    Pool de processus réutilisé d'un appel à l'autre (recréé si le nombre de workers change).
+    Workers lancés par spawn : aucun état du serveur (threads, modèle chargé) n'est hérité
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    """Arrête les workers du pool partagé (appelé à la sortie du processus)"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_workers = None, None
+
+
+atexit.register(shutdown_pool)
+
+
+def _memo_key(text):
+    # Même règle que analyze_sentiment : entrées vides -> '', sinon texte converti en str
+    return '' if not text else str(text)
+
+
+def analyze_sentiment_batch(texts, workers=None):
+    """
+    Note une liste de textes en une passe : (label, score) pour chaque entrée, dans l'ordre.
+    Chaque texte distinct n'est noté qu'une fois (mémoïsé entre appels) ;
+    à partir de PARALLEL_MIN_TEXTS textes à noter, répartition sur le pool partagé
+    (TEXTBLOB_WORKERS workers, min(4, nombre de cœurs) par défaut).
+    """
+    keys = [_memo_key(text) for text in texts]
+    # Textes déjà notés, relevés avant un éventuel vidage de la mémoïsation
+    hits = {key: _memo[key] for key in keys if key in _memo}
+    pending = [key for key in dict.fromkeys(keys) if key not in hits]
+
+    if workers is None:
+        workers = _default_workers()
+    results = None
+    if workers > 1 and len(pending) >= PARALLEL_MIN_TEXTS:
+        chunksize = max(1, len(pending) // (workers * 4))
+        try:
+            results = list(_get_pool(workers).map(analyze_sentiment, pending, chunksize=chunksize))
+        except BrokenProcessPool as e:
+            # Worker arrêté brutalement : pool recréé au prochain appel, ce lot noté en série
+            logging.warning(f"⚠️ Pool TextBlob interrompu ({e}): notation en série")
+            shutdown_pool()
+    if results is None:
+        results = [analyze_sentiment(key) for key in pending]
+
+    if len(_memo) + len(pending) > MEMO_MAX_ENTRIES:
+        _memo.clear()
+    scored = dict(zip(pending, results))
+    _memo.update(scored)
+    return [scored[key] if key in scored else hits[key] for key in keys]
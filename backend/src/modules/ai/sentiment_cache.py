@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache persistant des résultats de sentiment
+Adressé par contenu : clé = hash(texte normalisé + modèle + version des règles de scoring)
+Les verbatims déjà notés lors d'un import précédent ne repassent pas par le modèle
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+DEFAULT_CACHE_PATH = os.path.join('data', 'cache', 'sentiment_cache.sqlite3')
+DEFAULT_MAX_ENTRIES = 200000
+
+# Limite des paramètres par requête SQLite
+_SQL_CHUNK = 500
+
+
+class SentimentCache:
+    """
+    Cache disque (SQLite) des couples (label, score) avec éviction LRU bornée en nombre d'entrées
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sentiment_cache ('
+            'key TEXT PRIMARY KEY, label TEXT NOT NULL, score REAL NOT NULL, last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache(last_used)')
+        self._conn.commit()
+        logging.info(f"🗄️ Cache sentiment ouvert: {self.path} ({self.size()} entrées)")
+
+    @staticmethod
+    def make_key(text: str, model_key: str, rules_version: str) -> str:
+        """Clé de cache : sha256 du texte normalisé, du modèle et de la version des règles"""
+        payload = f"{model_key}\x1f{rules_version}\x1f{text}".encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[str, float]]:
+        """Retourne les entrées présentes et met à jour les compteurs hit/miss"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), _SQL_CHUNK):
+                chunk = keys[start:start + _SQL_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, label, score FROM sentiment_cache WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                for key, label, score in rows:
+                    found[key] = (label, score)
+            if found:
+                # Rafraîchir la date d'usage pour l'éviction LRU
+                self._conn.executemany(
+                    'UPDATE sentiment_cache SET last_used = ? WHERE key = ?',
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, Tuple[str, float]]):
+        """Enregistre de nouveaux résultats puis applique l'éviction"""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO sentiment_cache (key, label, score, last_used) VALUES (?, ?, ?, ?)',
+                [(key, label, float(score), now) for key, (label, score) in items.items()]
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_entries"""
+        overflow = self.size() - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                'DELETE FROM sentiment_cache WHERE key IN '
+                '(SELECT key FROM sentiment_cache ORDER BY last_used ASC LIMIT ?)',
+                (overflow,)
+            )
+            self._conn.commit()
+            logging.info(f"🧹 Cache sentiment: {overflow} entrées évincées (limite {self.max_entries})")
+
+    def size(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM sentiment_cache').fetchone()[0]
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': self.size(),
+        }
@@ -6,27 +6,111 @@ Optimisé pour les commentaires clients longs sur les services RH
 """
 
 import logging
+import os
 import re
+import threading
+import time
+import numpy as np
 import pandas as pd
-from typing import Tuple, List, Optional
+from typing import Dict, Tuple, List, Optional
 import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+import transformers
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
 import warnings
+from .sentiment_cache import SentimentCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES
+from . import model_status
+from .sentiment_pool import pool_available, score_in_pool
 warnings.filterwarnings("ignore")
 
+# Version des règles de scoring (mots-clés, échelle, prétraitement)
+# À incrémenter à chaque modification qui change les scores : invalide le cache persistant
+SCORING_RULES_VERSION = '2'
+
+# Version du tri du mode cascade (dans la clé de cache des résultats cascade)
+CASCADE_TRIAGE_VERSION = '2'
+
+# Précisions d'inférence disponibles : fp32 (référence), int8 (quantification dynamique
+# des couches Linear, CPU) et bf16 (si le CPU le supporte nativement)
+PRECISIONS = ('fp32', 'int8', 'bf16')
+
+# Modes d'analyse : bert (tout passe par le modèle) ou cascade (tri par mots-clés français, modèle si nécessaire)
+MODES = ('bert', 'cascade')
+
+# Textes longs : nombre maximal de fenêtres de tokens notées par texte (coût borné, 0 : sans limite)
+# La suite d'un texte plus long n'est pas notée : comptée dans last_run_stats['truncated_texts']
+DEFAULT_MAX_CHUNKS_PER_TEXT = 8
+
+# Motifs de prétraitement compilés une seule fois
+_WHITESPACE_RE = re.compile(r'\s+')
+_UNWANTED_CHARS_RE = re.compile(r'[^\w\s\.,!?;:()\'-]')
+# Marqueurs de négation du tri cascade
+_NEGATION_RE = re.compile(r"\b(?:ne|n'|pas|jamais|aucune?|rien|sans|ni)\b")
+DEFAULT_MODEL_CACHE_DIR = os.path.join('data', 'cache', 'models')
+
+# Jeu de référence de verbatims pour le rapport d'accord entre précisions
+REFERENCE_VERBATIMS = [
+    "Très bonne agence, réactive et à l'écoute de nos besoins.",
+    "RAS",
+    "Rien à signaler, tout se passe bien.",
+    "Les candidats proposés ne correspondent pas toujours au profil demandé.",
+    "Bon partenaire mais des difficultés sur les délais de réponse.",
+    "Excellente collaboration depuis plusieurs années, je recommande.",
+    "Service correct sans plus.",
+    "Problème de facturation récurrent, nous sommes mécontents.",
+    "Très réactif, les intérimaires sont sérieux et compétents.",
+    "Manque de suivi des missions, interlocuteurs qui changent souvent.",
+    "Satisfait dans l'ensemble, cependant les relevés d'heures arrivent en retard.",
+    "Agence disponible, bonne connaissance de notre entreprise.",
+    "Prestation décevante cette année, plusieurs absences non remplacées.",
+    "Nous travaillons avec eux par habitude, c'est moyen.",
+    "Parfait, rien à redire.",
+    "Inacceptable, aucun candidat envoyé malgré nos relances.",
+    "Bonne relation commerciale, tarifs un peu élevés.",
+    "Les équipes sont sympathiques et professionnelles.",
+    "Réactivité insuffisante en période de forte activité.",
+    "Nous recommandons Manpower pour la qualité des profils.",
+]
+
 class CamemBERTSentimentAnalyzer:
     """
     Analyseur de sentiment spécialisé pour les commentaires clients RH
     Utilise CamemBERT pour une analyse précise du français
     """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[SentimentCache] = None, precision: str = 'fp32',
+                 workers: int = 1, threads_per_worker: int = 1, mode: str = 'bert',
+                 cascade_thresholds: Optional[dict] = None,
+                 max_chunks_per_text: int = DEFAULT_MAX_CHUNKS_PER_TEXT):
         # Utilisation d'un modèle plus stable avec tokenizer compatible
         self.model_name = "nlptown/bert-base-multilingual-uncased-sentiment"  
         self.tokenizer = None
         self.model = None
-        self.pipeline = None
-        self.max_length = 512  
+        self.device = None
+        self.max_length = 512
+        # Textes longs : fenêtres de tokens de max_length, au plus max_chunks_per_text par texte
+        if max_chunks_per_text < 0:
+            raise ValueError(f"max_chunks_per_text doit être positif ou nul (reçu {max_chunks_per_text})")
+        self.max_chunks_per_text = max_chunks_per_text
+        # Textes tronqués au dernier découpage (tokenize_chunks)
+        self.last_truncated_texts = 0
+        if precision not in PRECISIONS:
+            raise ValueError(f"Précision inconnue '{precision}' (valeurs possibles: {', '.join(PRECISIONS)})")
+        self.precision = precision
+        # Cache persistant des scores (optionnel) et statistiques du dernier run
+        self.cache = cache
+        self.last_run_stats = {}
+        # Mode multi-processus (workers > 1) : voir sentiment_pool
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        if mode not in MODES:
+            raise ValueError(f"Mode inconnu '{mode}' (valeurs possibles: {', '.join(MODES)})")
+        self.mode = mode
+        # Seuils du mode cascade : au-delà, le texte est envoyé au modèle
+        self.cascade_thresholds = {
+            'max_chars': 200,            # textes plus longs que max_chars caractères
+            'escalate_on_contrast': True # présence d'un connecteur de contraste (mais, cependant...)
+        }
+        self.cascade_thresholds.update(cascade_thresholds or {})
         self.setup_model()
         
         # Échelle de sentiment selon ULTIMATE PROMPT
@@ -46,32 +130,123 @@ class CamemBERTSentimentAnalyzer:
             'positive': ['bon', 'satisfait', 'content', 'bien', 'apprécie', 'recommande'],
             'very_positive': ['excellent', 'parfait', 'formidable', 'exceptionnel', 'remarquable', 'fantastique']
         }
+        
+        # Poids de chaque mot-clé trouvé dans le boost contextuel
+        self.keyword_weights = {
+            'very_negative': -0.8,
+            'negative': -0.4,
+            'neutral': 0.0,
+            'positive': 0.4,
+            'very_positive': 0.8
+        }
+        
+        # Connecteurs de contraste (malus de 0.5)
+        self.contrast_words = ['mais', 'cependant', 'toutefois', 'malgré', 'en revanche']
+        
+        # Mapping des labels du modèle nlptown (1-5 stars) vers scores 0-10
+        self.star_mapping = {
+            '1 star': 1.0,   # Très négatif
+            '2 stars': 3.0,  # Négatif
+            '3 stars': 5.0,  # Neutre
+            '4 stars': 7.5,  # Positif
+            '5 stars': 9.0   # Très positif
+        }
+        
+        # Mapping vers les labels attendus
+        self.label_mapping = {
+            'very_negative': 'TRÈS NÉGATIF',
+            'negative': 'NÉGATIF', 
+            'neutral': 'NEUTRE',
+            'positive': 'POSITIF',
+            'very_positive': 'TRÈS POSITIF'
+        }
+        
+        # Réponses fermées des questions "Diriez-vous que ... est :" (Q8, Q11, Q14, Q17, Q21)
+        # Notées sans le modèle : étoiles équivalentes puis mêmes règles contextuelles
+        self.closed_answers = {
+            'excellente': '5 stars', 'excellent': '5 stars',
+            'très bonne': '5 stars', 'très bon': '5 stars',
+            'très satisfaisante': '5 stars', 'très satisfaisant': '5 stars',
+            'bonne': '4 stars', 'bon': '4 stars',
+            'satisfaisante': '4 stars', 'satisfaisant': '4 stars',
+            'moyenne': '3 stars', 'moyen': '3 stars',
+            'correcte': '3 stars', 'correct': '3 stars',
+            'ne sait pas': '3 stars', 'nsp': '3 stars',
+            'insuffisante': '2 stars', 'insuffisant': '2 stars',
+            'mauvaise': '2 stars', 'mauvais': '2 stars',
+            'très insuffisante': '1 star', 'très insuffisant': '1 star',
+            'très mauvaise': '1 star', 'très mauvais': '1 star'
+        }
+        self.last_column_stats = {}
     
     def setup_model(self):
         """Initialise le modèle CamemBERT"""
         try:
             logging.info("🤖 Initialisation du modèle de sentiment multilingue...")
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
-            
-            # Configuration pipeline optimisée
-            device = 0 if torch.cuda.is_available() else -1
-            self.pipeline = pipeline(
-                "sentiment-analysis",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device=device,
-                max_length=self.max_length,
-                truncation=True,
-                padding=True
-            )
-            
-            logging.info(f"✅ Modèle de sentiment chargé avec succès (device: {'GPU' if device >= 0 else 'CPU'})")
+
+            # Inférence directe sur le modèle (batchs paddés dynamiquement, voir predict_batch)
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            if self.precision == 'int8':
+                # La quantification dynamique ne s'exécute que sur CPU
+                self.device = torch.device('cpu')
+                self.model = self._load_quantized_model()
+            else:
+                self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+                if self.precision == 'bf16':
+                    if self.device.type == 'cpu' and not _cpu_supports_bf16():
+                        logging.warning("⚠️ bf16 non supporté nativement par ce CPU, repli sur fp32")
+                        self.precision = 'fp32'
+                    else:
+                        self.model = self.model.to(torch.bfloat16)
+            self.model.to(self.device)
+            self.model.eval()
+
+            logging.info(f"✅ Modèle de sentiment chargé avec succès (device: {'GPU' if self.device.type == 'cuda' else 'CPU'}, précision: {self.precision})")
             
         except Exception as e:
             logging.error(f"❌ Erreur lors du chargement du modèle: {e}")
             raise Exception(f"Impossible de charger le modèle de sentiment: {e}")
     
+    def _load_quantized_model(self):
+        """
+        Modèle quantifié int8 (couches Linear, poids int8). Le cache disque ne contient que ses
+        poids (state_dict, relus avec weights_only=True) : la structure est reconstruite en
+        quantifiant le modèle fp32, initialisé depuis sa configuration si les poids sont en cache
+        """
+        model_dir = os.getenv('SENTIMENT_MODEL_CACHE_DIR', DEFAULT_MODEL_CACHE_DIR)
+        # Versions dans le nom : les poids quantifiés dépendent des librairies qui les ont produits
+        file_name = (f"{self.model_name.replace('/', '__')}-int8-state-torch{torch.__version__}"
+                     f"-transformers{transformers.__version__}.pt")
+        path = os.path.join(model_dir, file_name)
+        if os.path.exists(path):
+            try:
+                state_dict = torch.load(path, weights_only=True)
+                config = AutoConfig.from_pretrained(self.model_name)
+                model = self._quantize(AutoModelForSequenceClassification.from_config(config))
+                model.load_state_dict(state_dict)
+                logging.info(f"⚡ Modèle int8 chargé depuis le cache: {path}")
+                return model
+            except Exception as e:
+                logging.warning(f"⚠️ Modèle int8 en cache illisible ({e}), nouvelle quantification")
+
+        start = time.time()
+        model = self._quantize(AutoModelForSequenceClassification.from_pretrained(self.model_name))
+        logging.info(f"⚡ Quantification int8 effectuée en {time.time() - start:.1f}s")
+        try:
+            os.makedirs(model_dir, exist_ok=True)
+            torch.save(model.state_dict(), path)
+            logging.info(f"💾 Modèle int8 enregistré: {path}")
+        except Exception as e:
+            logging.warning(f"⚠️ Impossible d'enregistrer le modèle int8: {e}")
+        return model
+    
+    @staticmethod
+    def _quantize(model):
+        """Quantification dynamique int8 des couches Linear d'un modèle fp32"""
+        model.eval()
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    
     def preprocess_text(self, text: str) -> str:
         """
         Préprocessing optimisé pour les commentaires clients
@@ -107,26 +282,301 @@ class CamemBERTSentimentAnalyzer:
         text = text_str.strip()
         
         # Nettoyage basique
-        text = re.sub(r'\s+', ' ', text)  # Normaliser les espaces
-        text = re.sub(r'[^\w\s\.,!?;:()\'-]', '', text)  # Garder la ponctuation utile
-        
-        # Gestion des textes très longs pour les recommandations
-        if len(text) > self.max_length * 2:  # Si très long, extraire les phrases clés
-            sentences = re.split(r'[.!?]+', text)
-            # Garder les phrases les plus expressives (début, fin, et celles avec mots-clés)
-            key_sentences = []
-            key_sentences.extend(sentences[:2])  # Début
-            key_sentences.extend(sentences[-2:])  # Fin
-            
-            # Sentences avec mots-clés émotionnels
-            emotion_words = ['satisfait', 'content', 'déçu', 'excellent', 'mauvais', 'recommande', 'apprécie']
-            for sentence in sentences[2:-2]:
-                if any(word in sentence.lower() for word in emotion_words):
-                    key_sentences.append(sentence)
-            
-            text = '. '.join(key_sentences[:8])  # Limiter à 8 phrases max
+        text = _WHITESPACE_RE.sub(' ', text)  # Normaliser les espaces
+        text = _UNWANTED_CHARS_RE.sub('', text)  # Garder la ponctuation utile
+        return text
+    
+    def prepare_series(self, values) -> pd.Series:
+        """
+        Équivalent colonne de prepare_text (mêmes résultats, voir tests/test_context_rules.py) :
+        les chaînes sont nettoyées par opérations vectorisées sur la Series, les autres types
+        passent par prepare_text. Aucun traitement propre aux textes longs : ils sont découpés
+        en fenêtres de tokens à l'inférence (tokenize_chunks).
+        """
+        series = pd.Series(list(values), dtype=object)
+        is_str = series.map(type).eq(str).to_numpy()
+        prepared = pd.Series([''] * len(series), index=series.index, dtype=object)
+        
+        if (~is_str).any():
+            prepared[~is_str] = series[~is_str].map(self.prepare_text)
+        
+        strings = series[is_str]
+        stripped = strings.str.strip()
+        has_content = ((stripped != '') & (strings != 'Pas de réponse') & (strings != 'nan')).to_numpy()
+        cleaned = (stripped[has_content]
+                   .str.replace(_WHITESPACE_RE, ' ', regex=True)
+                   .str.replace(_UNWANTED_CHARS_RE, '', regex=True))
+        prepared[cleaned.index] = cleaned
+        return prepared
+    
+    def tokenize_chunks(self, texts: List[str]) -> List[Tuple[int, List[int]]]:
+        """
+        Tokenise chaque texte une seule fois puis le découpe en fenêtres de tokens
+        (max_length tokens spéciaux compris, au plus max_chunks_per_text fenêtres par texte).
+        Les fenêtres au-delà de la limite ne sont pas notées : le nombre de textes tronqués
+        est conservé dans last_truncated_texts.
+        Returns: liste de (index du texte, input_ids de la fenêtre)
+        """
+        window = self.max_length - self.tokenizer.num_special_tokens_to_add()
+        token_ids = self.tokenizer(texts, add_special_tokens=False, truncation=False, verbose=False)['input_ids']
+        max_chunks = self.max_chunks_per_text or None
+        chunks = []
+        long_texts = 0
+        truncated_texts = 0
+        for i, ids in enumerate(token_ids):
+            windows = [ids[start:start + window] for start in range(0, len(ids), window)] or [[]]
+            if len(windows) > 1:
+                long_texts += 1
+            if max_chunks is not None and len(windows) > max_chunks:
+                truncated_texts += 1
+            for chunk_ids in windows[:max_chunks]:
+                chunks.append((i, self.tokenizer.build_inputs_with_special_tokens(chunk_ids)))
+        if long_texts:
+            logging.info(f"✂️ {long_texts} textes longs découpés en fenêtres de {window} tokens")
+        if truncated_texts:
+            logging.warning(f"⚠️ {truncated_texts} textes tronqués à {max_chunks} fenêtres ({max_chunks * window} tokens) : "
+                            f"la suite n'est pas notée (SENTIMENT_MAX_CHUNKS)")
+        self.last_truncated_texts = truncated_texts
+        return chunks
+
+    def predict_batch(self, texts: List[str], batch_size: int = 32, model=None):
+        """
+        Inférence batchée sur des textes déjà prétraités.
+        Les textes sont tokenisés une seule fois ; les textes longs sont découpés en fenêtres
+        de tokens batchées avec les textes courts. Les fenêtres sont triées par longueur puis
+        regroupées en batchs paddés dynamiquement (padding à la longueur du plus long du batch).
+        Les probabilités des fenêtres d'un même texte sont moyennées (pondérées par leur nombre de tokens).
+        `model` permet d'évaluer un autre modèle (ex: référence fp32) avec le même tokenizer.
+        Yields: (indices, labels étoiles, confiances) des textes terminés à chaque batch, indices dans `texts`
+        """
+        model = model if model is not None else self.model
+        device = next(model.parameters()).device
+        chunks = self.tokenize_chunks(texts)
+        remaining = np.bincount([i for i, _ in chunks], minlength=len(texts))
+        # Tri par longueur pour limiter le padding à l'intérieur de chaque batch
+        order = sorted(range(len(chunks)), key=lambda c: len(chunks[c][1]))
+        id2label = model.config.id2label
+        partial = {}
+
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            features = [{'input_ids': chunks[c][1]} for c in batch]
+            inputs = self.tokenizer.pad(features, padding=True, return_tensors='pt').to(device)
+            with torch.inference_mode():
+                logits = model(**inputs).logits
+            probabilities = torch.softmax(logits.float(), dim=-1)
+            confidences, predictions = probabilities.max(dim=-1)
+
+            indices, labels, batch_confidences = [], [], []
+            for row, c in enumerate(batch):
+                i, chunk_ids = chunks[c]
+                remaining[i] -= 1
+                if remaining[i] == 0 and i not in partial:
+                    # Texte court : une seule fenêtre
+                    prediction, confidence = int(predictions[row]), float(confidences[row])
+                else:
+                    weight = max(1, len(chunk_ids) - self.tokenizer.num_special_tokens_to_add())
+                    weighted, total_weight = partial.get(i, (0.0, 0))
+                    partial[i] = (weighted + weight * probabilities[row].cpu().numpy(), total_weight + weight)
+                    if remaining[i] > 0:
+                        continue
+                    weighted, total_weight = partial.pop(i)
+                    averaged = weighted / total_weight
+                    prediction, confidence = int(averaged.argmax()), float(averaged.max())
+                indices.append(i)
+                labels.append(id2label[prediction])
+                batch_confidences.append(confidence)
+            if indices:
+                yield indices, labels, batch_confidences
+
+    def apply_context_rules(self, text: str, label: str) -> Tuple[str, float]:
+        """
+        Ajustement du score du modèle selon le contexte métier (mots-clés, contrastes)
+        Version texte par texte, référence de apply_context_rules_batch
+        Returns: (sentiment_type, final_score)
+        """
+        # Score de base selon le label
+        base_score = self.star_mapping.get(label, 5.0)
+
+        # Ajustement contextuel avec mots-clés
+        text_lower = text.lower()
+        context_boost = 0
+
+        # Limiter le boost contextuel à ±1.0
+        context_boost = max(-1.0, min(1.0, context_boost))
+
+        # Détection de connecteurs de contraste
+        if any(word in text_lower for word in self.contrast_words):
+            context_boost -= 0.5
+
+        # Neutralisation si polarité mixte détectée
+        has_positive = any(word in text_lower for word in self.context_keywords['positive'])
+        has_negative = any(word in text_lower for word in self.context_keywords['negative'])
+        if has_positive and has_negative:
+            context_boost = 0
+
+        # Application du boost contextuel selon les mots-clés
+        for sentiment_type, keywords in self.context_keywords.items():
+            keyword_count = sum(1 for keyword in keywords if keyword in text_lower)
+            if keyword_count > 0:
+                if sentiment_type == 'very_positive':
+                    context_boost += keyword_count * 0.8
+                elif sentiment_type == 'positive':
+                    context_boost += keyword_count * 0.4
+                elif sentiment_type == 'negative':
+                    context_boost -= keyword_count * 0.4
+                elif sentiment_type == 'very_negative':
+                    context_boost -= keyword_count * 0.8
+
+        # Calcul du score final
+        final_score = base_score + context_boost
+        final_score = max(0, min(10, final_score))  # Clamp entre 0 et 10
+
+        # Détermination du label final
+        for sentiment_type, (min_val, max_val, _) in self.sentiment_scale.items():
+            if min_val <= final_score <= max_val:
+                return sentiment_type, final_score
+
+        return 'neutral', final_score
+
+    @staticmethod
+    def _count_keywords(lowered: pd.Series, keywords: List[str]) -> np.ndarray:
+        """Nombre de mots-clés distincts présents dans chaque texte (déjà en minuscules)"""
+        counts = np.zeros(len(lowered), dtype=int)
+        for keyword in keywords:
+            counts += lowered.str.contains(keyword, regex=False).to_numpy(dtype=bool)
+        return counts
+    
+    def apply_context_rules_batch(self, texts: List[str], labels: Optional[List[str]] = None,
+                                  base_scores: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Version vectorisée de apply_context_rules sur un lot de textes :
+        comptage des mots-clés par colonne, boost, clamp et classement calculés avec NumPy.
+        Le score de base vient des labels étoiles (modèle ou tri cascade), ou de `base_scores`.
+        Returns: (sentiment_types, final_scores) en tableaux alignés sur `texts`
+        """
+        lowered = pd.Series(list(texts), dtype=object).str.lower()
+        if base_scores is None:
+            base_scores = np.array([self.star_mapping.get(label, 5.0) for label in labels], dtype=float)
+        
+        keyword_counts = {sentiment_type: self._count_keywords(lowered, keywords)
+                          for sentiment_type, keywords in self.context_keywords.items()}
+        
+        # Connecteurs de contraste, puis neutralisation si polarité mixte
+        context_boost = np.where(self._count_keywords(lowered, self.contrast_words) > 0, -0.5, 0.0)
+        mixed = (keyword_counts['positive'] > 0) & (keyword_counts['negative'] > 0)
+        context_boost = np.where(mixed, 0.0, context_boost)
+        
+        # Boost des mots-clés, dans le même ordre d'accumulation que la version texte par texte
+        for sentiment_type, counts in keyword_counts.items():
+            context_boost = context_boost + counts * self.keyword_weights[sentiment_type]
+        
+        final_scores = np.clip(base_scores + context_boost, 0, 10)
+        
+        # Premier intervalle [min, max] contenant le score (les bornes vont à l'intervalle inférieur)
+        conditions = [(final_scores >= min_val) & (final_scores <= max_val)
+                      for min_val, max_val, _ in self.sentiment_scale.values()]
+        sentiment_types = np.select(conditions, list(self.sentiment_scale), default='neutral')
+        return sentiment_types, final_scores
+    
+    def score_labels(self, texts: List[str], labels: Optional[List[str]] = None,
+                     base_scores: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Résultats finaux (label français, score arrondi) d'un lot de textes et de leurs prédictions"""
+        if not texts:
+            return []
+        sentiment_types, final_scores = self.apply_context_rules_batch(texts, labels, base_scores)
+        return [(self.label_mapping.get(sentiment_type, 'NEUTRE'), round(float(score), 1))
+                for sentiment_type, score in zip(sentiment_types, final_scores)]
+    
+    def triage(self, texts: List[str]) -> Tuple[List[str], Dict[str, Tuple[str, float]], Dict[str, int]]:
+        """
+        Tri du mode cascade sur un signal français : réponse fermée connue, sinon mots-clés
+        contextuels (étoiles équivalentes au plus fort niveau trouvé). Sont envoyés au modèle
+        les textes longs, avec contraste ou négation, de polarité mixte, ou sans aucun mot-clé.
+        Les autres sont notés directement (étoiles équivalentes + mêmes règles contextuelles).
+        Limite : pas d'envoi des textes proches d'une borne de sentiment_scale. Le signal est discret
+        (un niveau d'étoiles, pas un score continu), la proximité d'une borne n'y a pas de sens ;
+        les cas douteux passent par les motifs négation, polarité mixte et absence de signal.
+        Returns: (textes à envoyer au modèle, résultats des textes triés, compteurs par motif)
+        """
+        thresholds = self.cascade_thresholds
+        lowered = pd.Series(list(texts), dtype=object).str.lower()
+        closed = lowered.str.strip(' .!').map(self.closed_answers).to_numpy()
+        is_closed = pd.notna(closed)
+        
+        # Mots-clés en début de mot ('nul' ne doit pas signaler 'annulation')
+        hits = {sentiment_type: self._match_words(lowered, keywords)
+                for sentiment_type, keywords in self.context_keywords.items()}
+        positive = hits['positive'] | hits['very_positive']
+        negative = hits['negative'] | hits['very_negative']
+        labels = np.select(
+            [is_closed, hits['very_positive'], hits['positive'], hits['very_negative'], hits['negative']],
+            [closed, '5 stars', '4 stars', '1 star', '2 stars'], default='3 stars'
+        )
+        
+        is_long = (lowered.str.len() > thresholds['max_chars']).to_numpy() & ~is_closed
+        has_contrast = (self._count_keywords(lowered, self.contrast_words) > 0) & ~is_closed
+        if not thresholds['escalate_on_contrast']:
+            has_contrast = np.zeros(len(texts), dtype=bool)
+        # Une négation inverse le mot-clé qu'elle porte ("pas satisfait") : le modèle tranche
+        has_negation = lowered.str.contains(_NEGATION_RE).to_numpy(dtype=bool) & ~is_closed
+        is_mixed = positive & negative & ~is_closed
+        no_signal = ~(positive | negative | hits['neutral'] | is_closed)
+        escalate = is_long | has_contrast | has_negation | is_mixed | no_signal
+        
+        kept = np.flatnonzero(~escalate)
+        kept_texts = [texts[i] for i in kept]
+        triaged = dict(zip(kept_texts, self.score_labels(kept_texts, [labels[i] for i in kept])))
+        escalated = [texts[i] for i in np.flatnonzero(escalate)]
+        reasons = {
+            'long': int(is_long.sum()),
+            'contrast': int(has_contrast.sum()),
+            'negation': int(has_negation.sum()),
+            'mixed': int(is_mixed.sum()),
+            'no_signal': int(no_signal.sum()),
+        }
+        return escalated, triaged, reasons
+    
+    @staticmethod
+    def _match_words(lowered: pd.Series, keywords: List[str]) -> np.ndarray:
+        """Présence d'au moins un mot-clé en début de mot dans chaque texte (déjà en minuscules)"""
+        pattern = r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + ')'
+        return lowered.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+    
+    def rules_equivalence_report(self, texts: Optional[List[str]] = None) -> dict:
+        """
+        Vérifie que le prétraitement et les règles vectorisés donnent exactement les résultats
+        de la version texte par texte, pour chaque texte et chaque label du modèle
+        """
+        texts = list(texts) if texts is not None else REFERENCE_VERBATIMS
+        mismatches = []
+        
+        prepared = self.prepare_series(texts)
+        for text, clean_text in zip(texts, prepared):
+            if self.prepare_text(text) != clean_text:
+                mismatches.append({'stage': 'preprocess', 'text': str(text)[:100]})
+        
+        clean_texts = [clean_text for clean_text in prepared if clean_text]
+        cases = 0
+        for label in self.star_mapping:
+            batch_results = self.score_labels(clean_texts, [label] * len(clean_texts))
+            for clean_text, batch_result in zip(clean_texts, batch_results):
+                cases += 1
+                if self.score_label(clean_text, label) != batch_result:
+                    mismatches.append({'stage': 'rules', 'label': label, 'text': clean_text[:100]})
         
-        return text[:self.max_length * 3]  # Sécurité supplémentaire
+        return {'texts': len(texts), 'rule_cases': cases, 'mismatches': mismatches}
+    
+    def score_label(self, clean_text: str, label: str) -> Tuple[str, float]:
+        """Résultat final (label français, score arrondi) d'un texte et de sa prédiction en étoiles"""
+        sentiment_type, score = self.apply_context_rules(clean_text, label)
+        return self.label_mapping.get(sentiment_type, 'NEUTRE'), round(score, 1)
+    
+    def _score_batches(self, texts: List[str], batch_size: int):
+        """Générateur (indices, résultats) par batch, dans le processus courant"""
+        for indices, labels, _ in self.predict_batch(texts, batch_size=batch_size):
+            yield indices, self.score_labels([texts[i] for i in indices], labels)
+        self.last_run_stats['truncated_texts'] = self.last_run_stats.get('truncated_texts', 0) + self.last_truncated_texts
     
     def analyze_with_context(self, text: str) -> Tuple[str, float, float]:
         """
@@ -135,83 +585,30 @@ class CamemBERTSentimentAnalyzer:
         """
         try:
             # Prédiction du modèle multilingue
-            result = self.pipeline(text)[0]
-            base_confidence = result['score']
-            label = result['label']
-
-            # Mapping des labels du modèle nlptown (1-5 stars) vers scores 0-10
-            star_mapping = {
-                '1 star': 1.0,   # Très négatif
-                '2 stars': 3.0,  # Négatif
-                '3 stars': 5.0,  # Neutre
-                '4 stars': 7.5,  # Positif
-                '5 stars': 9.0   # Très positif
-            }
-
-            # Score de base selon le label
-            base_score = star_mapping.get(label, 5.0)
-
-            # Ajustement contextuel avec mots-clés
-            text_lower = text.lower()
-            context_boost = 0
-
-            # Limiter le boost contextuel à ±1.0
-            context_boost = max(-1.0, min(1.0, context_boost))
-
-            # Détection de connecteurs de contraste
-            contrast_words = ['mais', 'cependant', 'toutefois', 'malgré', 'en revanche']
-            if any(word in text_lower for word in contrast_words):
-                context_boost -= 0.5
-
-            # Neutralisation si polarité mixte détectée
-            has_positive = any(word in text_lower for word in self.context_keywords['positive'])
-            has_negative = any(word in text_lower for word in self.context_keywords['negative'])
-            if has_positive and has_negative:
-                context_boost = 0
-
-            # Application du boost contextuel selon les mots-clés
-            for sentiment_type, keywords in self.context_keywords.items():
-                keyword_count = sum(1 for keyword in keywords if keyword in text_lower)
-                if keyword_count > 0:
-                    if sentiment_type == 'very_positive':
-                        context_boost += keyword_count * 0.8
-                    elif sentiment_type == 'positive':
-                        context_boost += keyword_count * 0.4
-                    elif sentiment_type == 'negative':
-                        context_boost -= keyword_count * 0.4
-                    elif sentiment_type == 'very_negative':
-                        context_boost -= keyword_count * 0.8
-
-            # Calcul du score final
-            final_score = base_score + context_boost
-            final_score = max(0, min(10, final_score))  # Clamp entre 0 et 10
-
-            # Détermination du label final
-            for sentiment_type, (min_val, max_val, _) in self.sentiment_scale.items():
-                if min_val <= final_score <= max_val:
-                    return sentiment_type, final_score, base_confidence
-
-            return 'neutral', final_score, base_confidence
+            _, labels, confidences = next(self.predict_batch([text], batch_size=1))
+            sentiment_type, final_score = self.apply_context_rules(text, labels[0])
+            return sentiment_type, final_score, confidences[0]
 
         except Exception as e:
             logging.error(f"Erreur analyse contextuelle: {e}")
             return 'neutral', 5.0, 0.5
-    
-    def analyze_sentiment_advanced(self, text: str) -> Tuple[str, float]:
+
+    def prepare_text(self, text) -> str:
         """
-        Méthode principale d'analyse de sentiment
-        Optimisée pour les commentaires longs de recommandation
+        Normalise une entrée brute avant analyse.
+        Retourne une chaîne vide pour les cas sans contenu (None, NaN, 'Pas de réponse'...),
+        qui sont notés NEUTRE sans passer par le modèle.
         """
         # Cas spéciaux - gérer les types non-string
         if text is None:
-            return 'NEUTRE', 5.0
+            return ''
             
         # Gérer les listes/tuples
         if isinstance(text, (list, tuple)):
             if len(text) > 0:
                 text = str(text[0])  # Prendre le premier élément
             else:
-                return 'NEUTRE', 5.0
+                return ''
                 
         # Gérer les types pandas/numpy
         elif hasattr(text, 'iloc') or hasattr(text, '__array__'):  # Series ou array
@@ -220,7 +617,7 @@ class CamemBERTSentimentAnalyzer:
             elif hasattr(text, '__len__') and len(text) > 0:  # Array non vide
                 text = str(text[0])  # Prendre le premier élément
             else:
-                return 'NEUTRE', 5.0
+                return ''
         
         # Convertir en string et vérifier les cas spéciaux
         text_str = str(text) if text is not None else ''
@@ -230,26 +627,24 @@ class CamemBERTSentimentAnalyzer:
             text_str.strip() == '' or 
             text_str == 'Pas de réponse' or
             text_str == 'nan'):
-            return 'NEUTRE', 5.0
+            return ''
         
         # Préprocessing
-        clean_text = self.preprocess_text(text)
+        return self.preprocess_text(text)
+    
+    def analyze_sentiment_advanced(self, text: str) -> Tuple[str, float]:
+        """
+        Méthode principale d'analyse de sentiment
+        Optimisée pour les commentaires longs de recommandation
+        """
+        clean_text = self.prepare_text(text)
         if not clean_text:
             return 'NEUTRE', 5.0
         
         # Analyse principale
         sentiment_type, score, confidence = self.analyze_with_context(clean_text)
         
-        # Mapping vers les labels attendus
-        label_mapping = {
-            'very_negative': 'TRÈS NÉGATIF',
-            'negative': 'NÉGATIF', 
-            'neutral': 'NEUTRE',
-            'positive': 'POSITIF',
-            'very_positive': 'TRÈS POSITIF'
-        }
-        
-        final_label = label_mapping.get(sentiment_type, 'NEUTRE')
+        final_label = self.label_mapping.get(sentiment_type, 'NEUTRE')
         final_score = round(score, 1)
         
         # Log pour les analyses importantes (recommandations longues)
@@ -258,61 +653,407 @@ class CamemBERTSentimentAnalyzer:
         
         return final_label, final_score
     
-    def batch_analyze(self, texts: List[str], batch_size: int = 10, progress_callback=None) -> List[Tuple[str, float]]:
+    def batch_analyze(self, texts: List[str], batch_size: int = 32, progress_callback=None) -> List[Tuple[str, float]]:
         """
-        Analyse par batch optimisée pour éviter les timeouts
+        Analyse par batch : plusieurs textes par passe du modèle (padding dynamique,
+        textes regroupés par longueur), puis ajustement contextuel sur tout le batch.
+        Les textes identiques après normalisation ne sont notés qu'une fois.
         """
         if not texts:
             return []
             
-        results = []
         total = len(texts)
+        results = [('NEUTRE', 5.0)] * total
         
-        # Traitement par petits lots pour éviter la surcharge mémoire
-        for i in range(0, total, batch_size):
-            batch = texts[i:i + batch_size]
-            batch_results = []
-            
-            for text in batch:
-                try:
-                    sentiment, score = self.analyze_sentiment_advanced(text)
-                    batch_results.append((sentiment, score))
-                except Exception as e:
-                    logging.error(f"Erreur batch analysis: {e}")
-                    batch_results.append(('NEUTRE', 5.0))
-            
-            results.extend(batch_results)
-            
-            # Callback de progression
-            if progress_callback:
-                progress = min(100, int((len(results) / total) * 100))
-                progress_callback(progress, len(results), total)
-            
-            # Log de progression
-            if i % (batch_size * 5) == 0 or len(results) == total:
-                logging.info(f"🔄 Analyse sentiment: {len(results)}/{total} ({int((len(results)/total)*100)}%)")
+        # Prétraitement + déduplication : texte normalisé -> positions d'origine
+        # Les entrées vides / 'Pas de réponse' restent NEUTRE sans inférence
+        positions_by_text = {}
+        for position, clean_text in enumerate(self.prepare_series(texts)):
+            if clean_text:
+                positions_by_text.setdefault(clean_text, []).append(position)
+        unique_texts = list(positions_by_text)
+        valid_count = sum(len(positions) for positions in positions_by_text.values())
+        scored = {}
+        
+        # Consultation du cache persistant avant toute inférence
+        cache_hits = 0
+        keys = {}
+        if self.cache is not None and unique_texts:
+            keys = {clean_text: self.cache_key(clean_text) for clean_text in unique_texts}
+            try:
+                cached = self.cache.get_many(keys.values())
+            except Exception as e:
+                logging.warning(f"⚠️ Cache sentiment indisponible: {e}")
+                cached = {}
+            for clean_text, key in keys.items():
+                if key in cached:
+                    scored[clean_text] = tuple(cached[key])
+                    cache_hits += 1
+        to_infer = [clean_text for clean_text in unique_texts if clean_text not in scored]
+        
+        cache_misses = len(to_infer) if self.cache is not None else 0
         
+        # Mode cascade : seuls les textes longs / ambigus / avec contraste vont au modèle
+        new_entries = {}
+        cascade_stats = {}
+        if self.mode == 'cascade' and to_infer:
+            candidates = len(to_infer)
+            to_infer, triaged, reasons = self.triage(to_infer)
+            scored.update(triaged)
+            new_entries.update({keys[clean_text]: result for clean_text, result in triaged.items() if clean_text in keys})
+            cascade_stats = {
+                'triaged': len(triaged),
+                'escalated': len(to_infer),
+                'escalation_rate': round(len(to_infer) / candidates, 3),
+                'escalation_reasons': reasons,
+            }
+        
+        self.last_run_stats = {
+            'total': total,
+            'valid': valid_count,
+            'unique': len(unique_texts),
+            'dedup_ratio': round(valid_count / len(unique_texts), 2) if unique_texts else 1.0,
+            'cache_hits': cache_hits,
+            'cache_misses': cache_misses,
+            'inferred': len(to_infer),
+            'truncated_texts': 0,
+            **cascade_stats,
+        }
+        
+        processed = total - sum(len(positions_by_text[t]) for t in to_infer)
+        if to_infer:
+            try:
+                # Shards répartis sur plusieurs processus, ou batchs dans le processus courant
+                if pool_available(self, self.workers, len(to_infer)):
+                    batches = score_in_pool(self, to_infer, batch_size, self.workers, self.threads_per_worker)
+                else:
+                    batches = self._score_batches(to_infer, batch_size)
+                for batch_number, (indices, batch_results) in enumerate(batches):
+                    # Ajustement contextuel déjà appliqué sur l'ensemble du batch
+                    for i, result in zip(indices, batch_results):
+                        clean_text = to_infer[i]
+                        scored[clean_text] = result
+                        if clean_text in keys:
+                            new_entries[keys[clean_text]] = scored[clean_text]
+                        processed += len(positions_by_text[clean_text])
+                    
+                    # Callback de progression
+                    if progress_callback:
+                        progress = min(100, int((processed / total) * 100))
+                        progress_callback(progress, processed, total)
+                    
+                    # Log de progression
+                    if batch_number % 5 == 0 or processed == total:
+                        logging.info(f"🔄 Analyse sentiment: {processed}/{total} ({int((processed/total)*100)}%)")
+            except Exception as e:
+                # Repli texte par texte pour ne pas perdre tout le lot sur une erreur
+                logging.error(f"Erreur batch analysis: {e}")
+                for clean_text in to_infer:
+                    if clean_text in scored:
+                        continue
+                    sentiment_type, score, _ = self.analyze_with_context(clean_text)
+                    scored[clean_text] = (self.label_mapping.get(sentiment_type, 'NEUTRE'), round(score, 1))
+        elif progress_callback:
+            progress_callback(100, total, total)
+        
+        # Redistribution des résultats sur toutes les lignes d'origine
+        for clean_text, positions in positions_by_text.items():
+            result = scored.get(clean_text, ('NEUTRE', 5.0))
+            for position in positions:
+                results[position] = result
+        
+        if self.cache is not None and new_entries:
+            try:
+                self.cache.put_many(new_entries)
+            except Exception as e:
+                logging.warning(f"⚠️ Écriture du cache sentiment impossible: {e}")
+        
+        self._log_run_stats()
+        return results
+    
+    def build_lookup_table(self, values) -> Tuple[Dict, Dict]:
+        """
+        Construit la table valeur -> (label, score) pour les valeurs distinctes d'une colonne
+        qui n'ont pas besoin du modèle : cellules vides et réponses fermées connues.
+        Returns: (table des résultats, table valeur -> chemin 'empty' / 'lookup')
+        """
+        table = {}
+        paths = {}
+        values = list(values)
+        for value, clean_text in zip(values, self.prepare_series(values)):
+            if not clean_text:
+                table[value] = ('NEUTRE', 5.0)
+                paths[value] = 'empty'
+                continue
+            star_label = self.closed_answers.get(clean_text.lower().strip(' .!'))
+            if star_label is not None:
+                table[value] = self.score_label(clean_text, star_label)
+                paths[value] = 'lookup'
+        return table, paths
+
+    def analyze_columns(self, columns: Dict[str, List], batch_size: int = 32, progress_callback=None) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Analyse plusieurs colonnes textuelles en une seule passe.
+        Les réponses fermées connues sont résolues par une table de correspondance construite
+        sur les valeurs distinctes de chaque colonne ; seules les cellules en texte libre de
+        toutes les colonnes sont aplaties en un flux unique (déduplication, cache et batchs
+        communs) envoyé au modèle, puis les résultats sont redécoupés par colonne.
+        """
+        flat_texts = []
+        resolved = {}
+        free_positions = {}
+        self.last_column_stats = {}
+        for name, values in columns.items():
+            series = pd.Series(list(values), dtype=object)
+            table, paths = self.build_lookup_table(series.unique())
+            known = series.map(table)
+            cell_paths = series.map(paths).fillna('model')
+            is_free = (cell_paths == 'model').to_numpy()
+
+            resolved[name] = known.tolist()
+            positions = np.flatnonzero(is_free)
+            free_positions[name] = (positions, len(flat_texts))
+            flat_texts.extend(series.iloc[positions].tolist())
+
+            path_counts = cell_paths.value_counts()
+            self.last_column_stats[name] = {
+                'lookup': int(path_counts.get('lookup', 0)),
+                'model': int(path_counts.get('model', 0)),
+                'empty': int(path_counts.get('empty', 0)),
+            }
+            logging.info(f"📋 {name}: {self.last_column_stats[name]}")
+
+        flat_results = self.batch_analyze(flat_texts, batch_size=batch_size, progress_callback=progress_callback)
+
+        results = {}
+        for name, (positions, start) in free_positions.items():
+            column_results = resolved[name]
+            for offset, position in enumerate(positions):
+                column_results[position] = flat_results[start + offset]
+            results[name] = column_results
         return results
+
+    def cache_key(self, clean_text: str) -> str:
+        """Clé de cache d'un texte normalisé pour le modèle, la précision, le mode et les règles courants"""
+        model_key = self.model_name if self.precision == 'fp32' else f"{self.model_name}@{self.precision}"
+        if self.mode == 'cascade':
+            thresholds = self.cascade_thresholds
+            model_key += (f"+cascade{CASCADE_TRIAGE_VERSION}:{thresholds['max_chars']}"
+                          f":{int(bool(thresholds['escalate_on_contrast']))}")
+        if self.max_chunks_per_text != DEFAULT_MAX_CHUNKS_PER_TEXT:
+            model_key += f"+chunks:{self.max_chunks_per_text}"
+        return SentimentCache.make_key(clean_text, model_key, SCORING_RULES_VERSION)
+    
+    def _log_run_stats(self):
+        stats = self.last_run_stats
+        logging.info(
+            f"🧮 Déduplication sentiment: {stats['valid']} textes → {stats['unique']} uniques "
+            f"(ratio {stats['dedup_ratio']})"
+        )
+        if 'escalated' in stats:
+            logging.info(
+                f"🪜 Cascade: {stats['triaged']} textes notés par les mots-clés, {stats['escalated']} envoyés au modèle "
+                f"(taux {stats['escalation_rate']}, motifs {stats['escalation_reasons']})"
+            )
+        if stats.get('truncated_texts'):
+            logging.warning(
+                f"✂️ {stats['truncated_texts']} textes notés sur leurs {self.max_chunks_per_text} premières fenêtres seulement"
+            )
+        if self.cache is not None:
+            logging.info(
+                f"🗄️ Cache sentiment: {stats['cache_hits']} hits / {stats['cache_misses']} misses, "
+                f"{stats['inferred']} textes envoyés au modèle"
+            )
+    
+    def precision_agreement_report(self, texts: Optional[List[str]] = None, batch_size: int = 32) -> dict:
+        """
+        Compare la précision courante au modèle fp32 de référence sur un jeu de verbatims
+        (REFERENCE_VERBATIMS par défaut) : accord des labels, écart de score et gain de temps
+        """
+        clean_texts = list(dict.fromkeys(
+            clean_text for clean_text in (self.prepare_text(t) for t in (texts or REFERENCE_VERBATIMS)) if clean_text
+        ))
+        if not clean_texts:
+            return {'texts': 0}
+
+        reference_model = AutoModelForSequenceClassification.from_pretrained(self.model_name).to(self.device)
+        reference_model.eval()
+
+        def score_all(model):
+            start = time.time()
+            stars = [None] * len(clean_texts)
+            for indices, labels, _ in self.predict_batch(clean_texts, batch_size=batch_size, model=model):
+                for i, label in zip(indices, labels):
+                    stars[i] = label
+            elapsed = time.time() - start
+            scored = [self.apply_context_rules(text, star) for text, star in zip(clean_texts, stars)]
+            return stars, scored, elapsed
+
+        reference_stars, reference_scored, reference_time = score_all(reference_model)
+        candidate_stars, candidate_scored, candidate_time = score_all(self.model)
+
+        deltas = np.abs(np.array([s for _, s in candidate_scored], dtype=float) -
+                        np.array([s for _, s in reference_scored], dtype=float))
+        report = {
+            'precision': self.precision,
+            'texts': len(clean_texts),
+            'label_agreement': round(float(np.mean([c[0] == r[0] for c, r in zip(candidate_scored, reference_scored)])), 4),
+            'star_agreement': round(float(np.mean([c == r for c, r in zip(candidate_stars, reference_stars)])), 4),
+            'mean_score_delta': round(float(deltas.mean()), 4),
+            'max_score_delta': round(float(deltas.max()), 4),
+            'fp32_seconds': round(reference_time, 3),
+            'candidate_seconds': round(candidate_time, 3),
+            'speedup': round(reference_time / candidate_time, 2) if candidate_time > 0 else None,
+        }
+        logging.info(f"📐 Rapport d'accord {self.precision} vs fp32: {report}")
+        return report
+    
+    def cascade_agreement_report(self, texts: Optional[List[str]] = None, batch_size: int = 32) -> dict:
+        """
+        Compare le mode cascade au passage de tous les textes dans le modèle
+        (REFERENCE_VERBATIMS par défaut) : accord des labels, écart de score, taux d'envoi et gain de temps
+        """
+        clean_texts = list(dict.fromkeys(
+            clean_text for clean_text in (self.prepare_text(t) for t in (texts or REFERENCE_VERBATIMS)) if clean_text
+        ))
+        if not clean_texts:
+            return {'texts': 0}
+        
+        start = time.time()
+        reference = dict(zip(clean_texts, [None] * len(clean_texts)))
+        for indices, batch_results in self._score_batches(clean_texts, batch_size):
+            for i, result in zip(indices, batch_results):
+                reference[clean_texts[i]] = result
+        reference_time = time.time() - start
+        
+        start = time.time()
+        escalated, cascade, reasons = self.triage(clean_texts)
+        for indices, batch_results in self._score_batches(escalated, batch_size):
+            for i, result in zip(indices, batch_results):
+                cascade[escalated[i]] = result
+        cascade_time = time.time() - start
+        
+        deltas = np.abs(np.array([cascade[t][1] for t in clean_texts], dtype=float) -
+                        np.array([reference[t][1] for t in clean_texts], dtype=float))
+        report = {
+            'thresholds': dict(self.cascade_thresholds),
+            'texts': len(clean_texts),
+            'escalation_rate': round(len(escalated) / len(clean_texts), 4),
+            'escalation_reasons': reasons,
+            'label_agreement': round(float(np.mean([cascade[t][0] == reference[t][0] for t in clean_texts])), 4),
+            'mean_score_delta': round(float(deltas.mean()), 4),
+            'max_score_delta': round(float(deltas.max()), 4),
+            'bert_seconds': round(reference_time, 3),
+            'cascade_seconds': round(cascade_time, 3),
+            'speedup': round(reference_time / cascade_time, 2) if cascade_time > 0 else None,
+        }
+        logging.info(f"📐 Rapport d'accord cascade vs modèle seul: {report}")
+        return report
     
     def get_model_info(self) -> dict:
         """Retourne les informations du modèle"""
         return {
             'model_name': self.model_name,
             'max_length': self.max_length,
-            'device': 'GPU' if torch.cuda.is_available() else 'CPU',
+            'device': 'GPU' if self.device is not None and self.device.type == 'cuda' else 'CPU',
+            'precision': self.precision,
+            'workers': self.workers,
+            'mode': self.mode,
             'sentiment_scale': self.sentiment_scale
         }
 
+def _cpu_supports_bf16() -> bool:
+    """Vrai si le CPU exécute nativement le bf16 (AVX512-BF16 / AMX)"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
 # Instance globale pour réutilisation
 _analyzer_instance = None
+_analyzer_lock = threading.Lock()
+_warmup_thread = None
 
 def get_sentiment_analyzer():
     """Factory pour obtenir l'instance du sentiment analyzer"""
     global _analyzer_instance
     if _analyzer_instance is None:
-        _analyzer_instance = CamemBERTSentimentAnalyzer()
+        # Verrou : une requête arrivant pendant le préchauffage attend le même chargement
+        with _analyzer_lock:
+            if _analyzer_instance is None:
+                model_status.set_state('loading')
+                try:
+                    _analyzer_instance = CamemBERTSentimentAnalyzer(
+                        cache=_build_cache(),
+                        precision=os.getenv('SENTIMENT_PRECISION', 'fp32'),
+                        workers=int(os.getenv('SENTIMENT_WORKERS', '1')),
+                        threads_per_worker=int(os.getenv('SENTIMENT_WORKER_THREADS', '1')),
+                        mode=os.getenv('SENTIMENT_MODE', 'bert'),
+                        cascade_thresholds=_cascade_thresholds_from_env(),
+                        max_chunks_per_text=int(os.getenv('SENTIMENT_MAX_CHUNKS', DEFAULT_MAX_CHUNKS_PER_TEXT))
+                    )
+                except Exception as e:
+                    model_status.set_state('error', str(e))
+                    raise
+                # Sans préchauffage, le modèle est utilisable dès son chargement
+                model_status.set_state('loaded' if _warmup_thread is not None else 'ready')
     return _analyzer_instance
 
+def warm_up(analyzer: CamemBERTSentimentAnalyzer, batch_sizes=(1, 8, 32)):
+    """
+    Passes d'inférence factices aux tailles de batch attendues
+    (hors cache et déduplication) pour absorber le coût de la première inférence
+    """
+    for batch_size in batch_sizes:
+        start = time.time()
+        texts = [f"Préchauffage {i} : service correct, agence réactive." for i in range(batch_size)]
+        for _ in analyzer.predict_batch(texts, batch_size=batch_size):
+            pass
+        logging.info(f"🔥 Préchauffage batch {batch_size}: {time.time() - start:.2f}s")
+
+def start_background_warmup(batch_sizes=(1, 8, 32)):
+    """Charge et préchauffe l'analyseur dans un thread d'arrière-plan (démarrage serveur)"""
+    global _warmup_thread
+    if _warmup_thread is not None:
+        return _warmup_thread
+
+    def _run():
+        try:
+            analyzer = get_sentiment_analyzer()
+            model_status.set_state('warming')
+            warm_up(analyzer, batch_sizes)
+            model_status.set_state('ready')
+            logging.info("✅ Modèle de sentiment prêt")
+        except Exception as e:
+            logging.error(f"❌ Échec du préchauffage du modèle de sentiment: {e}")
+            model_status.set_state('error', str(e))
+
+    _warmup_thread = threading.Thread(target=_run, name='sentiment-warmup', daemon=True)
+    _warmup_thread.start()
+    return _warmup_thread
+
+def _cascade_thresholds_from_env() -> dict:
+    """Seuils du mode cascade surchargés par SENTIMENT_CASCADE_MAX_CHARS / _CONTRAST"""
+    thresholds = {}
+    if os.getenv('SENTIMENT_CASCADE_MAX_CHARS'):
+        thresholds['max_chars'] = int(os.getenv('SENTIMENT_CASCADE_MAX_CHARS'))
+    if os.getenv('SENTIMENT_CASCADE_CONTRAST'):
+        thresholds['escalate_on_contrast'] = os.getenv('SENTIMENT_CASCADE_CONTRAST') != '0'
+    return thresholds
+
+def _build_cache() -> Optional[SentimentCache]:
+    """Cache persistant configuré par variables d'environnement (SENTIMENT_CACHE=0 pour désactiver)"""
+    if os.getenv('SENTIMENT_CACHE', '1') == '0':
+        return None
+    try:
+        return SentimentCache(
+            path=os.getenv('SENTIMENT_CACHE_PATH', DEFAULT_CACHE_PATH),
+            max_entries=int(os.getenv('SENTIMENT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        )
+    except Exception as e:
+        logging.warning(f"⚠️ Cache sentiment désactivé: {e}")
+        return None
+
 def analyze_sentiment_camembert(text: str) -> Tuple[str, float]:
     """
     Interface simplifiée pour l'analyse de sentiment
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de processus pour l'inférence de sentiment
+Les workers sont créés par fork après le chargement du modèle : les poids sont partagés
+en copy-on-write (aucune copie du modèle par worker), chaque worker tourne sur 1 thread torch.
+Fork uniquement (Linux) : sans fork (Windows, macOS par défaut), l'inférence reste en série.
+Le pool est créé une seule fois, à la première analyse volumineuse après la fin du
+préchauffage (aucun fork pendant qu'un autre thread fait tourner le modèle), puis réutilisé
+par toutes les requêtes jusqu'à l'arrêt du processus.
+"""
+
+import atexit
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import torch
+
+from . import model_status
+
+# Un shard trop petit coûte plus en communication qu'il ne rapporte
+MIN_SHARD_SIZE = 64
+# Plusieurs shards par worker pour équilibrer la charge (textes de longueurs variables)
+SHARDS_PER_WORKER = 4
+
+# Attente maximale de la fin du préchauffage avant de créer le pool (secondes)
+WARMUP_WAIT_SECONDS = 300
+
+# Analyseur hérité par les workers au fork (jamais sérialisé)
+_POOL_ANALYZER = None
+# Pool partagé et paramètres avec lesquels il a été créé (analyseur, workers, threads)
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def pool_available(analyzer, workers: int, text_count: int) -> bool:
+    """
+    Le mode multi-processus n'a de sens que sur CPU, avec fork, et sur un volume suffisant ;
+    avant la création du pool, attend la fin du chargement / préchauffage du modèle
+    """
+    if workers <= 1 or text_count < workers * MIN_SHARD_SIZE:
+        return False
+    if analyzer.device is not None and analyzer.device.type != 'cpu':
+        return False
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        logging.warning("⚠️ Fork indisponible sur cette plateforme (pool réservé à Linux): inférence sentiment en série")
+        return False
+    if _pool is None and not model_status.wait_until_idle(timeout=WARMUP_WAIT_SECONDS):
+        logging.warning("⚠️ Préchauffage du modèle toujours en cours: inférence sentiment en série")
+        return False
+    return True
+
+
+def _init_worker(threads: int):
+    # Le parallélisme interne des tokenizers n'est pas sûr après fork : un worker = un cœur
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    torch.set_num_threads(threads)
+
+
+def _get_pool(analyzer, workers: int, threads_per_worker: int):
+    """Pool partagé, créé (par fork) au premier appel ou si l'analyseur / le nombre de workers change"""
+    global _pool, _pool_key, _POOL_ANALYZER
+    key = (id(analyzer), workers, threads_per_worker)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _pool.terminate()
+            _POOL_ANALYZER = analyzer
+            context = multiprocessing.get_context('fork')
+            _pool = context.Pool(processes=workers, initializer=_init_worker, initargs=(threads_per_worker,))
+            _pool_key = key
+            logging.info(f"🧵 Pool sentiment créé: {workers} workers")
+        return _pool
+
+
+def shutdown_pool():
+    """Arrête les workers du pool partagé (appelé à la sortie du processus)"""
+    global _pool, _pool_key, _POOL_ANALYZER
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool.join()
+        _pool, _pool_key, _POOL_ANALYZER = None, None, None
+
+
+atexit.register(shutdown_pool)
+
+
+def _score_shard(shard: Tuple[int, List[str], int]):
+    """Note un shard dans le worker : (début, résultats (label, score), textes tronqués, durée, pid)"""
+    start, texts, batch_size = shard
+    started = time.time()
+    results = [None] * len(texts)
+    for indices, labels, _ in _POOL_ANALYZER.predict_batch(texts, batch_size=batch_size):
+        batch_results = _POOL_ANALYZER.score_labels([texts[i] for i in indices], labels)
+        for i, result in zip(indices, batch_results):
+            results[i] = result
+    return start, results, _POOL_ANALYZER.last_truncated_texts, time.time() - started, os.getpid()
+
+
+def score_in_pool(analyzer, texts: List[str], batch_size: int, workers: int, threads_per_worker: int = 1):
+    """
+    Répartit les textes en shards sur le pool partagé de workers forkés.
+    Générateur (indices, résultats) au fil des shards terminés ; les indices
+    permettent de réassembler dans l'ordre d'origine. Les statistiques de débit
+    par worker sont écrites dans analyzer.last_run_stats['workers'], les textes
+    tronqués des shards ajoutés à analyzer.last_run_stats['truncated_texts'].
+    """
+    shard_size = max(MIN_SHARD_SIZE, math.ceil(len(texts) / (workers * SHARDS_PER_WORKER)))
+    shards = [(start, texts[start:start + shard_size], batch_size) for start in range(0, len(texts), shard_size)]
+
+    pool = _get_pool(analyzer, workers, threads_per_worker)
+    worker_stats: Dict[int, dict] = {}
+    started = time.time()
+    logging.info(f"🧵 Pool sentiment: {workers} workers, {len(shards)} shards de {shard_size} textes max")
+    for start, results, truncated_texts, seconds, pid in pool.imap_unordered(_score_shard, shards):
+        analyzer.last_run_stats['truncated_texts'] = analyzer.last_run_stats.get('truncated_texts', 0) + truncated_texts
+        stats = worker_stats.setdefault(pid, {'texts': 0, 'seconds': 0.0})
+        stats['texts'] += len(results)
+        stats['seconds'] += seconds
+        yield range(start, start + len(results)), results
+
+    elapsed = time.time() - started
+    for pid, stats in worker_stats.items():
+        stats['seconds'] = round(stats['seconds'], 2)
+        stats['texts_per_second'] = round(stats['texts'] / stats['seconds'], 1) if stats['seconds'] else 0.0
+        logging.info(f"🧵 Worker {pid}: {stats['texts']} textes en {stats['seconds']}s ({stats['texts_per_second']} textes/s)")
+    analyzer.last_run_stats['workers'] = worker_stats
+    analyzer.last_run_stats['pool_texts_per_second'] = round(len(texts) / elapsed, 1) if elapsed else 0.0
@@ -1,9 +1,59 @@
+import numpy as np
 import pandas as pd
 
+SIRET_LENGTH = 14
+
+
 def clean_siret(siret):
+    """SIRET d'une valeur isolée : 14 caractères, sans décimale ('' si manquant)"""
     if pd.isnull(siret):
         return ''
-    s = str(siret).strip()
-    if len(s) < 14:
-        s = s.zfill(14)
-    return s 
\ No newline at end of file
+    return str(siret).strip().split('.')[0].zfill(SIRET_LENGTH)
+
+
+def _normalize_value(value):
+    return str(value).split('.')[0].zfill(SIRET_LENGTH)
+
+
+def normalize_siret(series):
+    """
+    SIRET d'une colonne entière sur 14 caractères, sans décimale : même résultat que
+    str(x).split('.')[0].zfill(14) sur chaque valeur, mais calculé une seule fois par
+    valeur distincte (un SIRET revient sur chaque mois du fichier performance)
+    """
+    codes, uniques = pd.factorize(series)
+    normalized = np.array([_normalize_value(value) for value in uniques], dtype=object)
+    result = normalized[codes] if len(normalized) else np.empty(len(codes), dtype=object)
+    # Valeurs manquantes traitées une à une : None, NaN et NA ne s'écrivent pas de la même façon
+    missing = codes == -1
+    if missing.any():
+        result[missing] = [_normalize_value(value) for value in series.to_numpy()[missing]]
+    return pd.Series(result, index=series.index, name=series.name, dtype=object)
+
+
+def siret_index(codes, sirets):
+    """
+    Index code agence -> SIRET du premier établissement de l'agence (ordre du fichier).
+    Les codes manquants sont ignorés (ils ne correspondent à aucune agence).
+    """
+    index = pd.Series(sirets.to_numpy(), index=codes.to_numpy())
+    index = index[index.index.notna()]
+    return index[~index.index.duplicated(keep='first')]
+
+
+def combine_siret_indexes(indexes):
+    """Index construits morceau par morceau (lecture en flux) : le premier morceau l'emporte"""
+    indexes = [index for index in indexes if len(index)]
+    if not indexes:
+        return pd.Series(dtype=object)
+    index = pd.concat(indexes)
+    return index[~index.index.duplicated(keep='first')]
+
+
+def backfill_siret(sirets, codes, index):
+    """SIRET vides (NaN ou '') complétés par celui de leur agence, en une seule recherche"""
+    empty = sirets.isnull() | (sirets == '')
+    if not empty.any():
+        return sirets
+    found = codes.map(index)
+    return sirets.where(~(empty & found.notna()).to_numpy(), found.to_numpy())
@@ -0,0 +1,72 @@
+"""
+Équivalence des versions vectorisées et texte par texte du prétraitement et des règles contextuelles
+(prepare_series / prepare_text, apply_context_rules_batch / apply_context_rules)
+"""
+
+import numpy as np
+import pytest
+
+from src.modules.ai.sentiment_camembert import CamemBERTSentimentAnalyzer, REFERENCE_VERBATIMS
+
+# Entrées brutes : cas vides, contraste, plusieurs mots-clés, polarité mixte, types non-texte
+RAW_TEXTS = [
+    '', '   ', None, np.nan, float('nan'), 'nan', 'Pas de réponse',
+    '  Très   bien,\tservice\nréactif !!! 😀 ',
+    'Bon partenaire mais des difficultés sur les délais.',
+    'Satisfait, cependant les relevés arrivent en retard ; toutefois correct malgré tout.',
+    'Excellent, parfait et remarquable : je recommande, très bon contact, content.',
+    'Problème récurrent, décevant et insuffisant, mais bon accueil.',
+    'Très mauvais, catastrophique, inacceptable et nul.',
+    'Moyen, correct, acceptable, normal.',
+    'BON SERVICE, EXCELLENT SUIVI',
+    'Réponse « entre guillemets » & symboles #@%',
+    ' '.join(['Agence disponible, bonne connaissance de notre entreprise.'] * 200),
+    42, 7.5, ['Premier élément bon', 'second'], (), ('Tuple parfait',),
+    *REFERENCE_VERBATIMS,
+]
+
+# Labels du modèle, plus un label inconnu (score de base neutre)
+LABELS = ['1 star', '2 stars', '3 stars', '4 stars', '5 stars', 'label inconnu']
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    """Analyseur sans modèle : seuls le prétraitement et les règles sont testés"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(CamemBERTSentimentAnalyzer, 'setup_model', lambda self: None)
+        yield CamemBERTSentimentAnalyzer(cache=None)
+
+
+@pytest.fixture(scope='module')
+def clean_texts(analyzer):
+    return list(analyzer.prepare_series(RAW_TEXTS))
+
+
+def test_prepare_series_matches_prepare_text(analyzer, clean_texts):
+    expected = [analyzer.prepare_text(text) for text in RAW_TEXTS]
+    mismatches = [(repr(text)[:60], batch, single)
+                  for text, batch, single in zip(RAW_TEXTS, clean_texts, expected) if batch != single]
+    assert not mismatches
+
+
+@pytest.mark.parametrize('label', LABELS)
+def test_context_rules_batch_matches_per_text(analyzer, clean_texts, label):
+    sentiment_types, final_scores = analyzer.apply_context_rules_batch(clean_texts, [label] * len(clean_texts))
+    mismatches = []
+    for text, sentiment_type, final_score in zip(clean_texts, sentiment_types, final_scores):
+        expected = analyzer.apply_context_rules(text, label)
+        if (str(sentiment_type), float(final_score)) != expected:
+            mismatches.append((text[:60], (str(sentiment_type), float(final_score)), expected))
+    assert not mismatches
+
+
+@pytest.mark.parametrize('label', LABELS)
+def test_score_labels_matches_score_label(analyzer, clean_texts, label):
+    batch = analyzer.score_labels(clean_texts, [label] * len(clean_texts))
+    assert batch == [analyzer.score_label(text, label) for text in clean_texts]
+
+
+def test_rules_equivalence_report_has_no_mismatch(analyzer):
+    report = analyzer.rules_equivalence_report(RAW_TEXTS)
+    assert report['rule_cases'] > 0
+    assert report['mismatches'] == []
@@ -0,0 +1,192 @@
+"""
+Équivalence de HeaderResolver avec l'ancienne résolution des en-têtes du contrôleur
+(boucle sur RENAME_MAP, repli sur le numéro de question, recherches Q11 / Q12 / concurrent)
+et invariance de RENAME_MAP après un traitement complet
+"""
+
+import copy
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+from src.api.controllers import data_controller
+from src.api.controllers.data_controller import RENAME_MAP, PERFORMANCE_COLS
+from src.api.services.header_resolver import HeaderResolver
+from src.api.services.ingestion import fix_column_encoding
+from src.core import db
+
+# En-tête interview de référence (export du questionnaire)
+INTERVIEW_COLS = [
+    "Campagne d'appels", 'CODE_AGENC', 'SIRET', 'Satisf.\n\nGlobale',
+    'Pouvez-vous me dire pourquoi vous donnez cette note de satisfaction ?',
+    'Quelle est LA société de travail temporaire à laquelle vous faites appel le plus souvent (en dehors de Manpower) ? ',
+    'Q5 - Amabilité et disponibilité de votre partenaire Manpower',
+    'Q6 - Connaissance de votre entreprise, vos besoins, vos attentes, vos objectifs',
+    "Q7 - Contribution à votre performance et à l'atteinte de vos objectifs",
+    'Q8 - Diriez-vous que votre collaboration avec MANPOWER est :',
+    'Q9 - Conformité du nombre de candidatures proposées par rapport à vos attentes',
+    'Q10 - Qualité et pertinence des profils proposés',
+    "Q11 - Diriez-vous que l'adéquation entre les candidats proposés par MANPOWER et votre demande est :",
+    'Q12 - Réactivité pour répondre à vos besoins,',
+    'Q13 - Efficacité à agir en cas de dysfonctionnements ou de réclamations',
+    'Q14 - Diriez-vous que la réactivité de MANPOWER est :',
+    'Q15 - Production des contrats, au suivi de leurs prestations, et leur gestion de fins de contrats',
+    "Q16 - Prestation administrative, c'est-à-dire les relevés d'activités et la facturation",
+    'Q17 - Diriez-vous que le suivi de mission et la gestion administrative de MANPOWER est :',
+    'Q18 - Proactivité dans la poposition de candidatures spontanées',
+    'Q19 - Qualité des informations fournies sur la réglementation du travail temporaire',
+    'Q20 - Actions en matière de prévention sécurité au travail',
+    "Q21 - Diriez-vous que l'expertise de MANPOWER est :",
+    'Q21bis - Sur une échelle de 0 à 10, recommanderiez-vous [CONCURRENT PRINCIPAL CITE] pour du TRAVAIL TEMPORAIRE ? ',
+    'Recommandation',
+    'Pouvez-vous me dire pourquoi vous donner cette note de recommandation?  ',
+]
+
+# Variante avec des intitulés abrégés : résolus par numéro de question
+Q_PREFIXED_COLS = [
+    "Campagne d'appels", 'CODE_AGENC', 'SIRET', 'Satisf. Globale',
+    'Q5 - Amabilité', 'Q6 - Connaissance', 'Q7 - Contribution', 'Q8 - Collaboration',
+    'Q9 - Candidatures', 'Q10 - Profils', 'Q11 - Adéquation candidats',
+    'Q12 - Réactivité pour répondre à vos besoins', 'Q12 - Réactivité (D.R.)',
+    'Q13 - Efficacité', 'Q14 - Réactivité', 'Q15 - Contrats', 'Q16 - Administratif',
+    'Q17 - Suivi de mission', 'Q18 - Proactivité', 'Q19 - Réglementation',
+    'Q20 - Sécurité', 'Q21 - Expertise', 'Q21bis - Recommandation concurrent', 'Recommandation',
+]
+
+# Variante avec la colonne concurrent sous un autre intitulé
+CONCURRENT_COLS = [col for col in INTERVIEW_COLS if 'société de travail temporaire' not in col] + ['Concurrent principal cité']
+
+
+def _encoding_broken(columns):
+    # UTF-8 relu en Windows-1252, comme dans les exports CSV mal décodés
+    return [col.encode('utf-8').decode('cp1252', errors='replace') for col in columns]
+
+
+HEADER_VARIANTS = {
+    'reference': INTERVIEW_COLS,
+    'encoding_broken': list(fix_column_encoding(_encoding_broken(INTERVIEW_COLS))),
+    'q_prefixed': Q_PREFIXED_COLS,
+    'concurrent': CONCURRENT_COLS,
+    'concurrent_renamed': [col if 'société de travail temporaire' not in col else 'Concurrent OnSite' for col in INTERVIEW_COLS],
+    'merged': PERFORMANCE_COLS + INTERVIEW_COLS + ['siret_agence'],
+}
+
+
+# --- Ancienne logique du contrôleur (référence) ---
+
+def baseline_rename_plan(columns, rename_map):
+    columns_to_rename = {}
+    processed_columns = set()
+    for old_name, new_name in rename_map.items():
+        if old_name in columns and old_name not in processed_columns:
+            columns_to_rename[old_name] = new_name
+            processed_columns.add(old_name)
+        else:
+            matching_cols = [col for col in columns
+                             if col not in processed_columns and
+                             (old_name.lower() in str(col).lower() or str(col).lower() in old_name.lower())]
+            if matching_cols:
+                columns_to_rename[matching_cols[0]] = new_name
+                processed_columns.add(matching_cols[0])
+            elif old_name.startswith('Q') and ' - ' in old_name:
+                q_num = old_name.split(' - ')[0]
+                matching_q_cols = [col for col in columns if col not in processed_columns and q_num in str(col)]
+                if matching_q_cols:
+                    columns_to_rename[matching_q_cols[0]] = new_name
+                    processed_columns.add(matching_q_cols[0])
+    return columns_to_rename
+
+
+def baseline_q11_candidates(columns):
+    return [col for col in columns if 'Q11' in str(col)]
+
+
+def baseline_q12_candidates(columns):
+    return [col for col in columns if 'Q12' in str(col) and 'Réactivit' in str(col)]
+
+
+def baseline_concurrent_col(columns):
+    if 'Concurrent OnSite' in columns:
+        return 'Concurrent OnSite'
+    candidates = [col for col in columns
+                  if 'société de travail temporaire' in str(col).lower() or 'concurrent' in str(col).lower()]
+    return candidates[0] if candidates else None
+
+
+@pytest.fixture
+def resolver():
+    return HeaderResolver(RENAME_MAP)
+
+
+@pytest.mark.parametrize('variant', HEADER_VARIANTS)
+def test_rename_plan_matches_baseline(resolver, variant):
+    columns = HEADER_VARIANTS[variant]
+    assert resolver.rename_plan(columns) == baseline_rename_plan(columns, RENAME_MAP)
+    # Deuxième résolution du même en-tête : servie par le cache, même résultat
+    assert resolver.rename_plan(list(columns)) == baseline_rename_plan(columns, RENAME_MAP)
+    assert resolver.get_stats()['hits'] == 1
+
+
+@pytest.mark.parametrize('variant', HEADER_VARIANTS)
+def test_pattern_scans_match_baseline(resolver, variant):
+    columns = HEADER_VARIANTS[variant]
+    assert resolver.containing_all(columns, 'Q11') == baseline_q11_candidates(columns)
+    assert resolver.containing_all(columns, 'Q12', 'Réactivit') == baseline_q12_candidates(columns)
+    concurrent = 'Concurrent OnSite' if 'Concurrent OnSite' in columns else \
+        resolver.first_containing_any(columns, 'société de travail temporaire', 'concurrent')
+    assert concurrent == baseline_concurrent_col(columns)
+
+
+def _performance_frame():
+    rows = []
+    for agency in range(3):
+        for month in range(1, 4):
+            row = {col: 0.0 for col in PERFORMANCE_COLS}
+            row.update({'Année': 2024, 'Mois': month, 'type entité': 'Agence', 'Code DR': 'D1', 'DR': 'D.R. 1',
+                        'code agence': f'A{agency:03d}', 'agence': f'Ville {agency}', 'Ouvert / Fermé': 'Ouvert',
+                        'No Siret': f'{10000000000000 + agency}', 'raison sociale': f'SOC {agency}'})
+            rows.append(row)
+    return pd.DataFrame(rows, columns=PERFORMANCE_COLS)
+
+
+def _interview_frame():
+    rows = []
+    for agency in range(3):
+        row = {col: 7 for col in INTERVIEW_COLS}
+        row.update({"Campagne d'appels": 2023, 'CODE_AGENC': f'A{agency:03d}', 'SIRET': f'{10000000000000 + agency}',
+                    'Pouvez-vous me dire pourquoi vous donnez cette note de satisfaction ?': 'Très bien',
+                    'Quelle est LA société de travail temporaire à laquelle vous faites appel le plus souvent (en dehors de Manpower) ? ': 'Adecco',
+                    'Q8 - Diriez-vous que votre collaboration avec MANPOWER est :': 'Bonne',
+                    "Q11 - Diriez-vous que l'adéquation entre les candidats proposés par MANPOWER et votre demande est :": 'Bonne',
+                    'Pouvez-vous me dire pourquoi vous donner cette note de recommandation?  ': 'RAS'})
+        rows.append(row)
+    # La variante sans virgule de Q12 : l'ancien contrôleur l'ajoutait alors à RENAME_MAP
+    return pd.DataFrame(rows, columns=INTERVIEW_COLS).rename(
+        columns={'Q12 - Réactivité pour répondre à vos besoins,': 'Q12 - Réactivité pour répondre à vos besoins'})
+
+
+def test_process_excel_files_leaves_rename_map_unchanged(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('STAGE_CACHE', '0')
+    monkeypatch.setenv('WORKBOOK_CACHE', '0')
+    # Pas de modèle de sentiment ici : seule la résolution des en-têtes est testée
+    monkeypatch.setattr(data_controller, 'apply_camembert_sentiment_analysis', lambda df_main: (df_main, True))
+    (tmp_path / 'data' / 'output').mkdir(parents=True)
+    performance_path, interview_path = tmp_path / 'performance.csv', tmp_path / 'interview.csv'
+    _performance_frame().to_csv(performance_path, index=False, sep=';', decimal=',', encoding='utf-8-sig')
+    _interview_frame().to_csv(interview_path, index=False, sep=';', decimal=',', encoding='utf-8-sig')
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.sqlite3'}"
+    db.init_app(app)
+    rename_map_before = copy.deepcopy(RENAME_MAP)
+    entries_before = data_controller.HEADER_RESOLVER.entries
+    with app.app_context():
+        db.create_all()
+        df_main = data_controller.process_excel_files(str(performance_path), str(interview_path), mode='full')
+    assert not df_main.empty
+    assert 'Q12 - Réactivité (depuis interview)' in df_main.columns
+    assert RENAME_MAP == rename_map_before
+    assert list(RENAME_MAP) == list(rename_map_before)
+    assert data_controller.HEADER_RESOLVER.entries == entries_before
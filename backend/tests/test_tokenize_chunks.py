@@ -0,0 +1,56 @@
+"""
+Découpage des textes longs en fenêtres de tokens (tokenize_chunks) : limite de fenêtres
+par texte et comptage des textes tronqués
+"""
+
+import pytest
+
+from src.modules.ai.sentiment_camembert import CamemBERTSentimentAnalyzer, DEFAULT_MAX_CHUNKS_PER_TEXT
+
+
+class WordTokenizer:
+    """Tokenizer minimal : un token par mot, un token spécial de chaque côté"""
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, texts, **kwargs):
+        return {'input_ids': [list(range(len(text.split()))) for text in texts]}
+
+    def build_inputs_with_special_tokens(self, ids):
+        return [-1, *ids, -2]
+
+
+def make_analyzer(monkeypatch, **kwargs):
+    monkeypatch.setattr(CamemBERTSentimentAnalyzer, 'setup_model', lambda self: None)
+    analyzer = CamemBERTSentimentAnalyzer(cache=None, **kwargs)
+    analyzer.tokenizer = WordTokenizer()
+    analyzer.max_length = 12  # fenêtres de 10 tokens
+    return analyzer
+
+
+def chunk_counts(chunks, text_count):
+    return [sum(1 for i, _ in chunks if i == position) for position in range(text_count)]
+
+
+def test_windows_beyond_the_limit_are_counted(monkeypatch):
+    analyzer = make_analyzer(monkeypatch, max_chunks_per_text=3)
+    texts = ['court', ' '.join(['mot'] * 30), ' '.join(['mot'] * 31), ' '.join(['mot'] * 95)]
+    chunks = analyzer.tokenize_chunks(texts)
+    assert chunk_counts(chunks, len(texts)) == [1, 3, 3, 3]
+    assert analyzer.last_truncated_texts == 2
+
+
+def test_no_limit(monkeypatch):
+    analyzer = make_analyzer(monkeypatch, max_chunks_per_text=0)
+    chunks = analyzer.tokenize_chunks([' '.join(['mot'] * 95)])
+    assert chunk_counts(chunks, 1) == [10]
+    assert analyzer.last_truncated_texts == 0
+
+
+def test_limit_is_part_of_the_cache_key(monkeypatch):
+    default = make_analyzer(monkeypatch)
+    assert default.max_chunks_per_text == DEFAULT_MAX_CHUNKS_PER_TEXT
+    assert default.cache_key('texte') != make_analyzer(monkeypatch, max_chunks_per_text=2).cache_key('texte')
+    with pytest.raises(ValueError):
+        make_analyzer(monkeypatch, max_chunks_per_text=-1)
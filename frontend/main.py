@@ -5,6 +5,7 @@ import numpy as np
 from io import StringIO, BytesIO
 import sys
 import os
+import time
 
 # Ajouter le chemin vers les modules backend
 backend_modules_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'src', 'modules', 'ai')
@@ -14,15 +15,27 @@ if backend_modules_path not in sys.path:
 try:
     from siret_cleaner import clean_siret
 except ImportError:
-    # Fonction de fallback si le module n'est pas disponible
+    # Fonction de fallback si le module n'est pas disponible (mêmes règles que le backend)
     def clean_siret(siret):
-        """Fonction de nettoyage SIRET simplifiée"""
+        """SIRET sur 14 caractères, sans décimale ('' si manquant)"""
         if pd.isna(siret) or siret == '':
             return ''
-        return str(siret).strip().replace(' ', '').replace('-', '')[:14]
+        return str(siret).strip().split('.')[0].zfill(14)
 
 API_URL = 'http://localhost:4000'
 
+# Formats d'entrée acceptés par le backend (pour l'un ou l'autre fichier)
+INPUT_TYPES = ["xlsx", "csv", "parquet"]
+INPUT_MIME_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def mime_type(filename):
+    """Type MIME d'un fichier uploadé d'après son extension"""
+    return INPUT_MIME_TYPES.get(filename.rsplit('.', 1)[-1].lower(), 'application/octet-stream')
+
 # Fonctions globales pour formater les DataFrames pour Excel français
 def format_dataframe_for_french_excel(df):
     """Formate le DataFrame pour Excel français avec virgules décimales"""
@@ -77,20 +90,23 @@ def apply_french_formatting_to_worksheet(writer, sheet_name, df, numeric_cols):
 st.set_page_config(page_title="Analytics MOS", layout="wide")
 st.title("Analytics MOS - Interface Utilisateur")
 
-st.header("1. Upload des fichiers Excel")
+st.header("1. Upload des fichiers (Excel, CSV ou Parquet)")
 col1, col2 = st.columns(2)
 with col1:
-    perf_file = st.file_uploader("Fichier de performance (Suivi MOS)", type=["xlsx"], key="perf")
+    perf_file = st.file_uploader("Fichier de performance (Suivi MOS)", type=INPUT_TYPES, key="perf")
 with col2:
-    interview_file = st.file_uploader("Fichier d'interview (NATIONAL MOS)", type=["xlsx"], key="interview")
+    interview_file = st.file_uploader("Fichier d'interview (NATIONAL MOS)", type=INPUT_TYPES, key="interview")
+
+full_rebuild = st.checkbox("Reconstruction complète", value=False,
+                           help="Par défaut, seuls les mois et SIRET nouveaux ou modifiés sont retraités")
 
 if st.button("Lancer le traitement"):
     if not perf_file or not interview_file:
-        st.error("Veuillez uploader les deux fichiers Excel.")
+        st.error("Veuillez uploader les deux fichiers.")
     else:
         files = {
-            'performance': (perf_file.name, perf_file, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
-            'interview': (interview_file.name, interview_file, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            'performance': (perf_file.name, perf_file, mime_type(perf_file.name)),
+            'interview': (interview_file.name, interview_file, mime_type(interview_file.name))
         }
         
         # Créer une barre de progression
@@ -107,6 +123,14 @@ if st.button("Lancer le traitement"):
                 st.error("❌ Backend non accessible. Vérifiez que le serveur backend est démarré.")
                 st.stop()
             
+            # Attendre la fin du préchauffage du modèle s'il est en cours (démarrage avec SENTIMENT_WARMUP=1)
+            for _ in range(60):
+                ready_resp = requests.get(f"{API_URL}/ready", timeout=5)
+                if ready_resp.status_code == 200 or ready_resp.json().get('state') not in ('loading', 'loaded', 'warming'):
+                    break
+                status_text.text("🔥 Préchauffage du modèle de sentiment en cours...")
+                time.sleep(2)
+            
             status_text.text("📤 Envoi des fichiers...")
             progress_bar.progress(20)
             
@@ -114,6 +138,7 @@ if st.button("Lancer le traitement"):
             resp = requests.post(
                 f"{API_URL}/process_excels", 
                 files=files,
+                data={'mode': 'full' if full_rebuild else 'incremental'},
                 timeout=300  # 5 minutes de timeout
             )
             
@@ -201,8 +226,8 @@ if perf_file and interview_file:
                 try:
                     # Envoyer les fichiers au backend pour obtenir le DataFrame nettoyé
                     files = {
-                        'performance': (perf_file.name, perf_file, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
-                        'interview': (interview_file.name, interview_file, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+                        'performance': (perf_file.name, perf_file, mime_type(perf_file.name)),
+                        'interview': (interview_file.name, interview_file, mime_type(interview_file.name))
                     }
                     resp = requests.post(f"{API_URL}/preview_performance", files=files)
                     if resp.status_code == 200:
@@ -233,8 +258,8 @@ if perf_file and interview_file:
                 try:
                     # Envoyer les fichiers au backend pour obtenir le DataFrame nettoyé
                     files = {
-                        'performance': (perf_file.name, perf_file, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
-                        'interview': (interview_file.name, interview_file, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+                        'performance': (perf_file.name, perf_file, mime_type(perf_file.name)),
+                        'interview': (interview_file.name, interview_file, mime_type(interview_file.name))
                     }
                     resp = requests.post(f"{API_URL}/preview_interview", files=files)
                     if resp.status_code == 200: